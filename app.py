@@ -1,5 +1,11 @@
-from flask import Flask, request, jsonify
-from scraper import VinnustundScraper
+from flask import Flask, Response, request, jsonify
+from scraper import VinnustundScraper, READY
+from retry_policy import Deadline, DeadlineExceeded
+from circuit_breaker import CircuitOpenError
+from background_leader import BackgroundLeader
+from job_manager import JobManager, JobQueueFull, SUCCEEDED, INTERRUPTED
+from job_store import JobStore
+from shift_cache import normalize_range
 import logging
 import os
 import atexit
@@ -42,6 +48,59 @@ try:
 except ImportError as e:
     logger.warning("Could not import config: %s. Using default settings.", e)
 
+
+def optional_setting(name, default):
+    """Read an optional setting from config.py, falling back to default when absent."""
+    try:
+        import config
+    except ImportError:
+        return default
+    return getattr(config, name, default)
+
+
+parser_backend = optional_setting("PARSER_BACKEND", "bs4")
+shift_cache_ttl_seconds = float(optional_setting("SHIFT_CACHE_TTL_SECONDS", 0))
+shift_cache_settled_ttl_seconds = float(optional_setting("SHIFT_CACHE_SETTLED_TTL_SECONDS", 7 * 24 * 3600))
+shift_cache_max_days = int(optional_setting("SHIFT_CACHE_MAX_DAYS", 3660))
+shift_cache_merge_gap_days = int(optional_setting("SHIFT_CACHE_MERGE_GAP_DAYS", 3))
+approved_statuses = tuple(optional_setting("APPROVED_STATUSES", ("S",)))
+shift_archive_path = optional_setting("SHIFT_ARCHIVE_PATH", None)
+shift_archive_sync_interval_seconds = float(optional_setting("SHIFT_ARCHIVE_SYNC_INTERVAL_SECONDS", 3600))
+shift_archive_sync_recent_days = int(optional_setting("SHIFT_ARCHIVE_SYNC_RECENT_DAYS", 14))
+shift_archive_sync_pay_periods = int(optional_setting("SHIFT_ARCHIVE_SYNC_PAY_PERIODS", 2))
+session_pool_size = int(optional_setting("SESSION_POOL_SIZE", 1))
+session_checkout_timeout_seconds = optional_setting("SESSION_CHECKOUT_TIMEOUT_SECONDS", 120)
+pacing_policy = optional_setting("PACING_POLICY", "random")
+pacing_rate_per_second = float(optional_setting("PACING_RATE_PER_SECOND", 0.5))
+pacing_burst = int(optional_setting("PACING_BURST", 5))
+request_deadline_seconds = float(optional_setting("REQUEST_DEADLINE_SECONDS", 60))
+retry_budget_ratio = float(optional_setting("RETRY_BUDGET_RATIO", 0.2))
+circuit_failure_rate_threshold = float(optional_setting("CIRCUIT_FAILURE_RATE_THRESHOLD", 0.5))
+circuit_window_size = int(optional_setting("CIRCUIT_WINDOW_SIZE", 20))
+circuit_min_calls = int(optional_setting("CIRCUIT_MIN_CALLS", 5))
+circuit_slow_call_seconds = float(optional_setting("CIRCUIT_SLOW_CALL_SECONDS", 20))
+circuit_open_seconds = float(optional_setting("CIRCUIT_OPEN_SECONDS", 60))
+cookie_jar_path = optional_setting("COOKIE_JAR_PATH", None)
+warm_up_on_startup = bool(optional_setting("WARM_UP_ON_STARTUP", False))
+proactive_relogin = bool(optional_setting("PROACTIVE_RELOGIN", False))
+proactive_relogin_margin_seconds = float(optional_setting("PROACTIVE_RELOGIN_MARGIN_SECONDS", 300))
+keep_alive_mode = optional_setting("KEEP_ALIVE_MODE", "page")
+pay_period_start_day = int(optional_setting("PAY_PERIOD_START_DAY", 1))
+fetch_chunk_days = int(optional_setting("FETCH_CHUNK_DAYS", 0))
+fetch_concurrency = optional_setting("FETCH_CONCURRENCY", None)
+parse_processes = int(optional_setting("PARSE_PROCESSES", 0))
+parse_process_min_bytes = int(optional_setting("PARSE_PROCESS_MIN_BYTES", 256 * 1024))
+base_url = optional_setting("BASE_URL", None)
+background_lock_path = optional_setting("BACKGROUND_LOCK_PATH", None)
+job_workers = int(optional_setting("JOB_WORKERS", 2))
+job_queue_size = int(optional_setting("JOB_QUEUE_SIZE", 20))
+job_result_retention_seconds = float(optional_setting("JOB_RESULT_RETENTION_SECONDS", 3600))
+job_deadline_seconds = float(optional_setting("JOB_DEADLINE_SECONDS", 900))
+job_max_retained = int(optional_setting("JOB_MAX_RETAINED", 100))
+job_store_path = optional_setting("JOB_STORE_PATH", None)
+batch_max_ranges = int(optional_setting("BATCH_MAX_RANGES", 100))
+batch_concurrency = optional_setting("BATCH_CONCURRENCY", None)
+
 # Initialize scraper (session is obtained via login; relogin on expiry or on schedule)
 scraper = VinnustundScraper(
     username=username,
@@ -52,15 +111,105 @@ scraper = VinnustundScraper(
     cookie_expiration_years=70,
     refresh_automatically=refresh_automatically,
     automatic_refresh_period_hours=automatic_refresh_period_hours,
+    parser_backend=parser_backend,
+    cache_ttl_seconds=shift_cache_ttl_seconds,
+    cache_settled_ttl_seconds=shift_cache_settled_ttl_seconds,
+    cache_max_days=shift_cache_max_days,
+    approved_statuses=approved_statuses,
+    cache_merge_gap_days=shift_cache_merge_gap_days,
+    archive_path=shift_archive_path,
+    archive_sync_interval_seconds=shift_archive_sync_interval_seconds,
+    archive_sync_recent_days=shift_archive_sync_recent_days,
+    archive_sync_pay_periods=shift_archive_sync_pay_periods,
+    pool_size=session_pool_size,
+    session_checkout_timeout=session_checkout_timeout_seconds,
+    pacing_policy=pacing_policy,
+    pacing_rate_per_second=pacing_rate_per_second,
+    pacing_burst=pacing_burst,
+    retry_budget_ratio=retry_budget_ratio,
+    circuit_failure_rate_threshold=circuit_failure_rate_threshold,
+    circuit_window_size=circuit_window_size,
+    circuit_min_calls=circuit_min_calls,
+    circuit_slow_call_seconds=circuit_slow_call_seconds,
+    circuit_open_seconds=circuit_open_seconds,
+    cookie_jar_path=cookie_jar_path,
+    proactive_relogin=proactive_relogin,
+    proactive_relogin_margin_seconds=proactive_relogin_margin_seconds,
+    keep_alive_mode=keep_alive_mode,
+    pay_period_start_day=pay_period_start_day,
+    fetch_chunk_days=fetch_chunk_days,
+    fetch_concurrency=int(fetch_concurrency) if fetch_concurrency else None,
+    parse_processes=parse_processes,
+    parse_process_min_bytes=parse_process_min_bytes,
+    base_url=base_url,
+    # Every worker maintains its own sessions; with a lock file, only the worker holding it runs archive sync
+    shared_tasks=not background_lock_path,
+)
+background_leader = None
+if background_lock_path:
+    background_leader = BackgroundLeader(background_lock_path, scraper.start_shared_tasks)
+    background_leader.start()
+if warm_up_on_startup and username and password:
+    scraper.start_warm_up()
+
+
+def run_job(job):
+    """Fetch the shifts of a /jobs request, reporting per-chunk progress on the job."""
+    return scraper.get_shifts(job.date_from, job.date_to, use_cache=job.use_cache,
+                              deadline=Deadline(job_deadline_seconds), progress=job.update_progress)
+
+
+job_manager = JobManager(
+    run_job, workers=job_workers, queue_size=job_queue_size,
+    retention_seconds=job_result_retention_seconds, max_retained=job_max_retained,
+    # Shared by the worker processes, so a job can be polled from any of them
+    store=JobStore(job_store_path, retention_seconds=job_result_retention_seconds,
+                   max_finished=job_max_retained) if job_store_path else None,
 )
 
 
 def cleanup():
+    if background_leader:
+        background_leader.stop()
     scraper.stop_keep_alive()
     scraper._stop_automatic_refresh()
+    scraper._stop_archive_sync()
+    scraper._stop_warm_up()
+    scraper._stop_proactive_relogin()
+    job_manager.shutdown()
+    scraper._stop_executors()
+    scraper.save_cookie_jar()
 
 atexit.register(cleanup)
 
+
+def request_param(name):
+    """Return a parameter from the query string (GET) or from a JSON / form body (POST)."""
+    if request.method == 'POST':
+        if request.is_json:
+            body = request.get_json(silent=True) or {}
+            return body.get(name)
+        return request.form.get(name)
+    return request.args.get(name)
+
+
+def is_true(value):
+    """Interpret a request parameter as a boolean flag."""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def request_deadline():
+    """
+    Deadline for the upstream work of this request: the client's timeout parameter
+    (seconds), capped by REQUEST_DEADLINE_SECONDS.
+    """
+    seconds = request_deadline_seconds
+    try:
+        seconds = min(seconds, float(request_param('timeout')))
+    except (TypeError, ValueError):
+        pass
+    return Deadline(max(seconds, 0))
+
 @app.route('/retrieve_shifts', methods=['GET', 'POST'])
 def retrieve_shifts():
     """
@@ -69,17 +218,19 @@ def retrieve_shifts():
     Accepts:
     - dateFrom: Date in format dd.MM.yyyy (e.g., "01.01.2026")
     - dateTo: Date in format dd.MM.yyyy (e.g., "25.01.2026")
+    - noCache: Optional; "true" bypasses the result cache and fetches upstream
+    - timeout: Optional; seconds to wait for upstream (at most REQUEST_DEADLINE_SECONDS)
+    - format: Optional; "ndjson" streams one JSON object per shift (see stream_shifts)
     
-    Returns JSON with all found shifts in the table.
+    Returns JSON with all found shifts in the table, or 504 if the deadline passes first.
+    While the upstream circuit is open, cached shifts are served if they cover the range;
+    otherwise 503 is returned immediately.
     """
     try:
         # Get parameters from request
-        if request.method == 'POST':
-            date_from = request.form.get('dateFrom') or request.json.get('dateFrom') if request.is_json else None
-            date_to = request.form.get('dateTo') or request.json.get('dateTo') if request.is_json else None
-        else:
-            date_from = request.args.get('dateFrom')
-            date_to = request.args.get('dateTo')
+        date_from = request_param('dateFrom')
+        date_to = request_param('dateTo')
+        use_cache = not is_true(request_param('noCache'))
         
         # Validate input
         if not date_from or not date_to:
@@ -88,7 +239,10 @@ def retrieve_shifts():
                 'message': 'Both dateFrom and dateTo are required (format: dd.MM.yyyy)'
             }), 400
         
-        shifts = scraper.get_shifts(date_from, date_to)
+        if request_param('format') == 'ndjson':
+            return stream_shifts(date_from, date_to, use_cache, request_deadline())
+        
+        shifts = scraper.get_shifts(date_from, date_to, use_cache=use_cache, deadline=request_deadline())
         
         return jsonify({
             'success': True,
@@ -98,6 +252,18 @@ def retrieve_shifts():
             'count': len(shifts)
         })
         
+    except DeadlineExceeded as e:
+        logger.warning(f"Retrieving shifts timed out: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+    except CircuitOpenError as e:
+        logger.warning(f"Retrieving shifts failed fast: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(scraper.circuit_breaker.retry_after())}
     except Exception as e:
         logger.error(f"Error retrieving shifts: {str(e)}", exc_info=True)
         return jsonify({
@@ -105,6 +271,162 @@ def retrieve_shifts():
             'error': str(e)
         }), 500
 
+def stream_shifts(date_from, date_to, use_cache, deadline):
+    """
+    Stream the shifts of the range as NDJSON: one JSON object per line, written as rows
+    are parsed, so a year-long export is never built as one list or one JSON document.
+    The first shift is retrieved before the response starts, so errors up to then keep
+    the status codes of retrieve_shifts; a later error ends the stream with a line
+    {"success": false, "error": ...}.
+    """
+    shifts = scraper.iter_shifts(date_from, date_to, use_cache=use_cache, deadline=deadline)
+    first = next(shifts, None)
+    
+    def generate():
+        if first is None:
+            return
+        count = 1
+        yield app.json.dumps(first) + '\n'
+        try:
+            for shift in shifts:
+                count += 1
+                yield app.json.dumps(shift) + '\n'
+        except Exception as e:
+            logger.error(f"Error streaming shifts after {count} rows: {str(e)}", exc_info=True)
+            yield app.json.dumps({'success': False, 'error': str(e)}) + '\n'
+            return
+        logger.info("Streamed %d shifts (%s to %s)", count, date_from, date_to)
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/retrieve_shifts_batch', methods=['POST'])
+def retrieve_shifts_batch():
+    """
+    Retrieve shifts for many date ranges in one call.
+    
+    Accepts a JSON body with:
+    - ranges: List of {"dateFrom": "dd.MM.yyyy", "dateTo": "dd.MM.yyyy"} (at most BATCH_MAX_RANGES)
+    - noCache, timeout: As for /retrieve_shifts (timeout applies to the whole batch)
+    
+    Overlapping and adjacent ranges are merged into as few upstream fetches as possible.
+    Returns the shifts per requested range, in request order, with the number of merged
+    ranges and of upstream fetches made. Error status codes are those of /retrieve_shifts.
+    """
+    body = request.get_json(silent=True) or {}
+    ranges = body.get('ranges') if isinstance(body, dict) else None
+    if not isinstance(ranges, list) or not ranges:
+        return jsonify({
+            'error': 'Missing required parameters',
+            'message': 'Send a JSON body with a non-empty "ranges" list of {"dateFrom", "dateTo"} (format: dd.MM.yyyy)'
+        }), 400
+    if len(ranges) > batch_max_ranges:
+        return jsonify({
+            'error': 'Too many ranges',
+            'message': f"At most {batch_max_ranges} ranges per batch"
+        }), 400
+    
+    date_ranges = []
+    for index, item in enumerate(ranges):
+        key = normalize_range(item.get('dateFrom'), item.get('dateTo')) if isinstance(item, dict) else None
+        if key is None:
+            return jsonify({
+                'error': 'Invalid range',
+                'message': f"ranges[{index}] needs dateFrom <= dateTo, both in format dd.MM.yyyy"
+            }), 400
+        date_ranges.append(key)
+    
+    try:
+        per_range, merged_ranges, upstream_fetches = scraper.get_shifts_batch(
+            date_ranges,
+            use_cache=not is_true(request_param('noCache')),
+            deadline=request_deadline(),
+            concurrency=int(batch_concurrency) if batch_concurrency else None,
+        )
+        return jsonify({
+            'success': True,
+            'ranges': [
+                {'dateFrom': item['dateFrom'], 'dateTo': item['dateTo'], 'shifts': shifts, 'count': len(shifts)}
+                for item, shifts in zip(ranges, per_range)
+            ],
+            'requestedRanges': len(ranges),
+            'mergedRanges': merged_ranges,
+            'upstreamFetches': upstream_fetches,
+        })
+    except DeadlineExceeded as e:
+        logger.warning(f"Retrieving shift batch timed out: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 504
+    except CircuitOpenError as e:
+        logger.warning(f"Retrieving shift batch failed fast: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(scraper.circuit_breaker.retry_after())}
+    except Exception as e:
+        logger.error(f"Error retrieving shift batch: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Start retrieving shifts in the background and return a job id right away (202).
+    
+    Accepts dateFrom, dateTo and noCache like /retrieve_shifts. Poll GET /jobs/<job_id>
+    for status and progress and fetch the shifts from GET /jobs/<job_id>/result.
+    Returns 429 while every job worker is busy and JOB_QUEUE_SIZE jobs are waiting.
+    """
+    date_from = request_param('dateFrom')
+    date_to = request_param('dateTo')
+    if not date_from or not date_to:
+        return jsonify({
+            'error': 'Missing required parameters',
+            'message': 'Both dateFrom and dateTo are required (format: dd.MM.yyyy)'
+        }), 400
+    try:
+        job = job_manager.submit(date_from, date_to, use_cache=not is_true(request_param('noCache')))
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429, {'Retry-After': '30'}
+    
+    status_url = f"/jobs/{job.id}"
+    return jsonify({
+        'success': True,
+        **job.info(),
+        'status_url': status_url,
+        'result_url': f"{status_url}/result",
+    }), 202, {'Location': status_url}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress (chunks fetched, rows retrieved) of a job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f"Unknown or expired job {job_id}"}), 404
+    return jsonify({'success': True, **job.info()})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Shifts of a finished job, in the /retrieve_shifts response format. Returns 202 with
+    the job status while it is still queued or running, and the error status of
+    /retrieve_shifts (504, 503 or 500) if it failed; 503 if the server stopped before it finished.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f"Unknown or expired job {job_id}"}), 404
+    if not job.done:
+        return jsonify({'success': True, **job.info()}), 202
+    if job.status != SUCCEEDED:
+        status_code = {DeadlineExceeded.__name__: 504, CircuitOpenError.__name__: 503,
+                       INTERRUPTED: 503}.get(job.error_type, 500)
+        return jsonify({'success': False, **job.info()}), status_code
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'dateFrom': job.date_from,
+        'dateTo': job.date_to,
+        'shifts': job.result,
+        'count': len(job.result)
+    })
+
 @app.route('/test_auth', methods=['GET'])
 def test_auth():
     """Test authentication endpoint"""
@@ -132,6 +454,9 @@ def trigger_login():
             "success": success,
             "message": "Login successful; session cookies updated" if success else "Login failed - check USERNAME/PASSWORD in config",
         })
+    except CircuitOpenError as e:
+        logger.warning(f"Login failed fast: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 503, {'Retry-After': str(scraper.circuit_breaker.retry_after())}
     except Exception as e:
         logger.error(f"Error during login: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -180,20 +505,44 @@ def health():
     last_login = getattr(scraper, "_last_login_at", None)
     return jsonify({
         'status': 'healthy',
+        'readiness': scraper.readiness,
+        'pid': os.getpid(),
+        'background_leader': background_leader.is_leader if background_leader else True,
         'keep_alive_enabled': scraper.enable_keep_alive,
         'keep_alive_interval': scraper.keep_alive_interval,
+        'keep_alive_mode': scraper.keep_alive_mode,
         'keep_alive_running': getattr(scraper, 'keep_alive_running', False),
         'refresh_automatically': getattr(scraper, 'refresh_automatically', False),
         'automatic_refresh_period_hours': getattr(scraper, 'automatic_refresh_period_hours', None),
         'cookie_expiration_years': scraper.cookie_expiration_years,
+        'parser_backend': scraper.parser.name,
+        'parsing': scraper.get_parse_info(),
+        'shift_cache': scraper.shift_cache.stats(),
+        'shift_archive': scraper.shift_archive.stats() if scraper.shift_archive else None,
+        'fetch_coalescing': scraper.get_coalescing_info(),
+        'fetch_chunking': scraper.get_chunk_info(),
+        'jobs': job_manager.stats(),
+        'session_pool': scraper.session_pool.stats(),
+        'pacing': scraper.pacer.stats(),
+        'retries': scraper.retry_budget.stats(),
+        'circuit_breaker': scraper.circuit_breaker.stats(),
         'session_status': {
             'last_successful_request': last_success.isoformat() if last_success else None,
             'last_login_at': last_login.isoformat() if last_login else None,
             'hours_since_last_success': round(time_since_success / 3600, 2),
             'consecutive_failures': consecutive_failures,
+            'shared_relogins': scraper.shared_relogins,
+            'proactive_relogins': scraper.proactive_relogins,
+            'session_lifetime': scraper.session_lifetime.stats(),
             'warning': consecutive_failures >= 3 or time_since_success > 3600 * 24
         }
     })
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe for load balancers: 200 once a session is warm, 503 before."""
+    is_ready = scraper.readiness == READY
+    return jsonify({'ready': is_ready, 'readiness': scraper.readiness}), 200 if is_ready else 503
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,252 @@
+"""
+asyncio variant of app.py on aiohttp.web, backed by AsyncVinnustundScraper.
+
+One event loop serves every request, so a single process holds many /retrieve_shifts
+calls in flight with a handful of threads (the upstream waits, pacing delays and retry
+backoff do not pin a thread each). Endpoints and JSON responses match app.py:
+/retrieve_shifts, /test_auth, /login, /keep_alive and /health.
+
+Run with:
+    python async_app.py
+or under gunicorn:
+    gunicorn async_app:app --worker-class aiohttp.GunicornWebWorker --bind 0.0.0.0:5000
+"""
+
+import logging
+import os
+from datetime import datetime
+
+from aiohttp import web
+
+from async_scraper import AsyncVinnustundScraper
+from retry_policy import Deadline, DeadlineExceeded
+from circuit_breaker import CircuitOpenError
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Credentials and settings from config.py, as in app.py
+username = None
+password = None
+headers = None
+try:
+    if os.path.exists("config.py"):
+        from config import USERNAME, PASSWORD, CUSTOM_HEADERS
+        username = USERNAME
+        password = PASSWORD
+        headers = CUSTOM_HEADERS
+    else:
+        logger.warning("config.py not found. Set USERNAME/PASSWORD for login.")
+except ImportError as e:
+    logger.warning("Could not import config: %s. Using default settings.", e)
+
+
+def optional_setting(name, default):
+    """Read an optional setting from config.py, falling back to default when absent."""
+    try:
+        import config
+    except ImportError:
+        return default
+    return getattr(config, name, default)
+
+
+request_deadline_seconds = float(optional_setting("REQUEST_DEADLINE_SECONDS", 60))
+
+scraper = AsyncVinnustundScraper(
+    username=username,
+    password=password,
+    headers=headers,
+    keep_alive_interval=180,
+    enable_keep_alive=True,
+    keep_alive_mode=optional_setting("KEEP_ALIVE_MODE", "page"),
+    pay_period_start_day=int(optional_setting("PAY_PERIOD_START_DAY", 1)),
+    parser_backend=optional_setting("PARSER_BACKEND", "bs4"),
+    cache_ttl_seconds=float(optional_setting("SHIFT_CACHE_TTL_SECONDS", 0)),
+    cache_settled_ttl_seconds=float(optional_setting("SHIFT_CACHE_SETTLED_TTL_SECONDS", 7 * 24 * 3600)),
+    cache_max_days=int(optional_setting("SHIFT_CACHE_MAX_DAYS", 3660)),
+    approved_statuses=tuple(optional_setting("APPROVED_STATUSES", ("S",))),
+    cache_merge_gap_days=int(optional_setting("SHIFT_CACHE_MERGE_GAP_DAYS", 3)),
+    pool_size=int(optional_setting("SESSION_POOL_SIZE", 1)),
+    session_checkout_timeout=optional_setting("SESSION_CHECKOUT_TIMEOUT_SECONDS", 120),
+    pacing_policy=optional_setting("PACING_POLICY", "random"),
+    pacing_rate_per_second=float(optional_setting("PACING_RATE_PER_SECOND", 0.5)),
+    pacing_burst=int(optional_setting("PACING_BURST", 5)),
+    retry_budget_ratio=float(optional_setting("RETRY_BUDGET_RATIO", 0.2)),
+    circuit_failure_rate_threshold=float(optional_setting("CIRCUIT_FAILURE_RATE_THRESHOLD", 0.5)),
+    circuit_window_size=int(optional_setting("CIRCUIT_WINDOW_SIZE", 20)),
+    circuit_min_calls=int(optional_setting("CIRCUIT_MIN_CALLS", 5)),
+    circuit_slow_call_seconds=float(optional_setting("CIRCUIT_SLOW_CALL_SECONDS", 20)),
+    circuit_open_seconds=float(optional_setting("CIRCUIT_OPEN_SECONDS", 60)),
+    base_url=optional_setting("BASE_URL", None),
+)
+
+
+async def request_params(request: web.Request) -> dict:
+    """Parameters from the query string (GET) or from a JSON / form body (POST)."""
+    if request.method == 'POST':
+        if request.content_type == 'application/json':
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            return body if isinstance(body, dict) else {}
+        return dict(await request.post())
+    return dict(request.query)
+
+
+def is_true(value):
+    """Interpret a request parameter as a boolean flag."""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def request_deadline(params: dict) -> Deadline:
+    """The client's timeout parameter (seconds), capped by REQUEST_DEADLINE_SECONDS."""
+    seconds = request_deadline_seconds
+    try:
+        seconds = min(seconds, float(params.get('timeout')))
+    except (TypeError, ValueError):
+        pass
+    return Deadline(max(seconds, 0))
+
+
+async def retrieve_shifts(request: web.Request) -> web.Response:
+    """Same parameters and responses as /retrieve_shifts in app.py."""
+    try:
+        params = await request_params(request)
+        date_from = params.get('dateFrom')
+        date_to = params.get('dateTo')
+        use_cache = not is_true(params.get('noCache'))
+
+        if not date_from or not date_to:
+            return web.json_response({
+                'error': 'Missing required parameters',
+                'message': 'Both dateFrom and dateTo are required (format: dd.MM.yyyy)'
+            }, status=400)
+
+        shifts = await scraper.get_shifts(date_from, date_to, use_cache=use_cache,
+                                          deadline=request_deadline(params))
+        return web.json_response({
+            'success': True,
+            'dateFrom': date_from,
+            'dateTo': date_to,
+            'shifts': shifts,
+            'count': len(shifts)
+        })
+    except DeadlineExceeded as e:
+        logger.warning(f"Retrieving shifts timed out: {str(e)}")
+        return web.json_response({'success': False, 'error': str(e)}, status=504)
+    except CircuitOpenError as e:
+        logger.warning(f"Retrieving shifts failed fast: {str(e)}")
+        return web.json_response({'success': False, 'error': str(e)}, status=503,
+                                 headers={'Retry-After': str(scraper.circuit_breaker.retry_after())})
+    except Exception as e:
+        logger.error(f"Error retrieving shifts: {str(e)}", exc_info=True)
+        return web.json_response({'success': False, 'error': str(e)}, status=500)
+
+
+async def test_auth(request: web.Request) -> web.Response:
+    """Test authentication endpoint"""
+    try:
+        auth_success = await scraper.test_authentication()
+        return web.json_response({
+            'success': auth_success,
+            'authenticated': auth_success,
+            'message': 'Authentication successful' if auth_success else 'Authentication failed - check credentials or run relogin'
+        })
+    except CircuitOpenError as e:
+        logger.warning(f"Testing auth failed fast: {str(e)}")
+        return web.json_response({'success': False, 'authenticated': False, 'error': str(e)}, status=503,
+                                 headers={'Retry-After': str(scraper.circuit_breaker.retry_after())})
+    except Exception as e:
+        logger.error(f"Error testing auth: {str(e)}", exc_info=True)
+        return web.json_response({'success': False, 'authenticated': False, 'error': str(e)}, status=500)
+
+
+async def trigger_login(request: web.Request) -> web.Response:
+    """Manually trigger relogin of every pooled session."""
+    try:
+        success = await scraper.login()
+        return web.json_response({
+            "success": success,
+            "message": "Login successful; session cookies updated" if success else "Login failed - check USERNAME/PASSWORD in config",
+        })
+    except CircuitOpenError as e:
+        logger.warning(f"Login failed fast: {str(e)}")
+        return web.json_response({"success": False, "error": str(e)}, status=503,
+                                 headers={'Retry-After': str(scraper.circuit_breaker.retry_after())})
+    except Exception as e:
+        logger.error(f"Error during login: {str(e)}", exc_info=True)
+        return web.json_response({"success": False, "error": str(e)}, status=500)
+
+
+async def trigger_keep_alive(request: web.Request) -> web.Response:
+    """Manually trigger a keep-alive action"""
+    try:
+        success = await scraper.keep_alive()
+        return web.json_response({
+            'success': success,
+            'message': 'Keep-alive action completed successfully' if success else 'Keep-alive action failed'
+        })
+    except CircuitOpenError as e:
+        logger.warning(f"Keep-alive failed fast: {str(e)}")
+        return web.json_response({'success': False, 'error': str(e)}, status=503,
+                                 headers={'Retry-After': str(scraper.circuit_breaker.retry_after())})
+    except Exception as e:
+        logger.error(f"Error in keep-alive: {str(e)}", exc_info=True)
+        return web.json_response({'success': False, 'error': str(e)}, status=500)
+
+
+async def health(request: web.Request) -> web.Response:
+    """Health check endpoint"""
+    last_success = scraper.last_successful_request
+    time_since_success = (datetime.now() - last_success).total_seconds() if last_success else 0
+    last_login = scraper._last_login_at
+    return web.json_response({
+        'status': 'healthy',
+        'server': 'asyncio',
+        'pid': os.getpid(),
+        'keep_alive_enabled': scraper.enable_keep_alive,
+        'keep_alive_interval': scraper.keep_alive_interval,
+        'keep_alive_mode': scraper.keep_alive_mode,
+        'keep_alive_running': scraper.keep_alive_running,
+        'parser_backend': scraper.parser.name,
+        'shift_cache': scraper.shift_cache.stats(),
+        'fetch_coalescing': scraper.get_coalescing_info(),
+        'session_pool': scraper.get_pool_info(),
+        'pacing': scraper.pacer.stats(),
+        'retries': scraper.retry_budget.stats(),
+        'circuit_breaker': scraper.circuit_breaker.stats(),
+        'session_status': {
+            'last_successful_request': last_success.isoformat() if last_success else None,
+            'last_login_at': last_login.isoformat() if last_login else None,
+            'hours_since_last_success': round(time_since_success / 3600, 2),
+            'consecutive_failures': scraper.consecutive_failures,
+            'shared_relogins': scraper.shared_relogins,
+            'warning': scraper.consecutive_failures >= 3 or time_since_success > 3600 * 24
+        }
+    })
+
+
+async def start_scraper(app: web.Application):
+    await scraper.start()
+
+
+async def stop_scraper(app: web.Application):
+    await scraper.close()
+
+
+app = web.Application()
+for path, handler in (('/retrieve_shifts', retrieve_shifts), ('/login', trigger_login),
+                      ('/keep_alive', trigger_keep_alive)):
+    app.router.add_get(path, handler)
+    app.router.add_post(path, handler)
+app.router.add_get('/test_auth', test_auth)
+app.router.add_get('/health', health)
+app.on_startup.append(start_scraper)
+app.on_cleanup.append(stop_scraper)
+
+if __name__ == '__main__':
+    web.run_app(app, host='0.0.0.0', port=5000)
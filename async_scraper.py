@@ -0,0 +1,834 @@
+"""
+Asynchronous variant of VinnustundScraper on aiohttp.
+
+Every upstream request is awaited on one event loop instead of blocking a thread, and
+pacing and retry backoff wait with asyncio.sleep, so a single process can hold hundreds
+of /retrieve_shifts requests in flight (see async_app.py). Login, session expiry
+detection, detail_form caching, pacing, the retry budget, deadlines, the circuit breaker,
+the shift cache and the parsers are the same as in VinnustundScraper. Parsing runs on
+the event loop's default thread pool so a large page does not stall the loop.
+
+The shift archive, chunked fetching, parse processes, the cookie jar, warm-up and
+proactive relogin are only available on the threaded scraper.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from parsers import get_parser
+from shift_cache import ShiftCache, normalize_range, format_date, find_gaps, pay_period
+from pacing import get_pacer
+from circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN
+from retry_policy import Deadline, DeadlineExceeded, RetryBudget, RETRY_STATUS_CODES, retry_after_seconds
+from scraper import VinnustundScraper, DEFAULT_HEADERS, KEEP_ALIVE_MODES
+
+logger = logging.getLogger(__name__)
+
+# aiohttp counterparts of the connection errors the threaded scraper retries
+RETRYABLE_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class UpstreamResponse:
+    """
+    A fully read aiohttp response. Exposes the attributes of requests.Response that the
+    shared helpers use (status_code, url, headers, content, text), so session checks and
+    Retry-After handling are identical for both scrapers.
+    """
+
+    def __init__(self, status_code: int, url: str, headers, content: bytes, encoding: str):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"{self.status_code} Error for url: {self.url}")
+
+
+class AsyncPooledSession:
+    """An aiohttp.ClientSession plus the login state that belongs to it (see PooledSession)."""
+
+    def __init__(self, index: int, session: aiohttp.ClientSession):
+        self.index = index
+        self.session = session
+        self.login_lock = asyncio.Lock()
+        self.login_generation = 0
+        self.last_login_ok = False
+        self.last_login_at: Optional[datetime] = None
+        self.healthy = True
+        self.detail_form_fields: Optional[Dict[str, str]] = None
+        self.last_used_at: Optional[float] = None
+
+    def info(self) -> Dict:
+        return {
+            'index': self.index,
+            'logged_in': len(self.session.cookie_jar) > 0,
+            'healthy': self.healthy,
+            'form_fields_cached': self.detail_form_fields is not None,
+            'login_attempts': self.login_generation,
+            'last_login_at': self.last_login_at.isoformat() if self.last_login_at else None,
+        }
+
+
+class AsyncVinnustundScraper:
+    """
+    asyncio scraper for kopavogur.vinnustund.is with the session semantics of
+    VinnustundScraper. Call start() inside the event loop before use and close() at shutdown.
+    """
+
+    BASE_URL = VinnustundScraper.BASE_URL
+    TIMESHEET_URL = VinnustundScraper.TIMESHEET_URL
+    LOGIN_URL = VinnustundScraper.LOGIN_URL
+    BUSINESS_GROUP = VinnustundScraper.BUSINESS_GROUP
+    SESSION_COOKIE_NAMES = VinnustundScraper.SESSION_COOKIE_NAMES
+
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 keep_alive_interval: int = 180, enable_keep_alive: bool = True,
+                 keep_alive_mode: str = "page",
+                 pay_period_start_day: int = 1,
+                 parser_backend: str = "bs4",
+                 cache_ttl_seconds: float = 0,
+                 cache_settled_ttl_seconds: float = 7 * 24 * 3600,
+                 cache_max_days: int = 3660,
+                 approved_statuses: tuple = ("S",),
+                 cache_merge_gap_days: int = 3,
+                 pool_size: int = 1,
+                 session_checkout_timeout: Optional[float] = 120,
+                 pacing_policy: str = "random",
+                 pacing_rate_per_second: float = 0.5,
+                 pacing_burst: int = 5,
+                 retry_budget_ratio: float = 0.2,
+                 circuit_failure_rate_threshold: float = 0.5,
+                 circuit_window_size: int = 20,
+                 circuit_min_calls: int = 5,
+                 circuit_slow_call_seconds: float = 20,
+                 circuit_open_seconds: float = 60,
+                 connections_per_session: int = 10,
+                 base_url: Optional[str] = None):
+        """
+        Args:
+            username, password, headers, keep_alive_*, pay_period_start_day, parser_backend,
+            cache_*, approved_statuses, pool_size, session_checkout_timeout, pacing_*,
+            retry_budget_ratio, circuit_*, base_url: As for VinnustundScraper
+            connections_per_session: Connection limit of each session's aiohttp connector
+                                     (default: 10, like the threaded scraper's HTTPAdapter)
+        """
+        if base_url:
+            self.BASE_URL = base_url.rstrip("/")
+            self.TIMESHEET_URL = f"{self.BASE_URL}/VS_MX/starfsmadur/starfsm_timafaerslur_view.jsp"
+            self.LOGIN_URL = f"{self.BASE_URL}/VS_MX/VSLoginX.jsp"
+        if keep_alive_mode not in KEEP_ALIVE_MODES:
+            raise ValueError(f"Unknown keep-alive mode {keep_alive_mode!r}; expected one of {', '.join(KEEP_ALIVE_MODES)}")
+        self._username = username
+        self._password = password
+        self.default_headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.default_headers.update(headers)
+        self.keep_alive_interval = keep_alive_interval
+        self.enable_keep_alive = enable_keep_alive
+        self.keep_alive_mode = keep_alive_mode
+        self.pay_period_start_day = pay_period_start_day
+        self.parser = get_parser(parser_backend)
+        self.shift_cache = ShiftCache(
+            ttl_seconds=cache_ttl_seconds,
+            settled_ttl_seconds=cache_settled_ttl_seconds,
+            max_days=cache_max_days,
+            approved_statuses=approved_statuses,
+            merge_gap_days=cache_merge_gap_days,
+            pay_period_start_day=pay_period_start_day,
+        )
+        self.pacer = get_pacer(pacing_policy, rate_per_second=pacing_rate_per_second, burst=pacing_burst)
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio)
+        self.circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=circuit_failure_rate_threshold,
+            window_size=circuit_window_size,
+            min_calls=circuit_min_calls,
+            slow_call_seconds=circuit_slow_call_seconds,
+            open_seconds=circuit_open_seconds,
+        )
+        self.pool_size = max(1, pool_size)
+        self.session_checkout_timeout = session_checkout_timeout
+        self.connections_per_session = connections_per_session
+
+        # Created in start(): aiohttp sessions belong to the running event loop
+        self.slots: List[AsyncPooledSession] = []
+        self._idle: List[AsyncPooledSession] = []
+        self._pool_changed: Optional[asyncio.Condition] = None
+        self.checkouts = 0
+        self.checkout_waits = 0
+
+        # Single-flight: upstream fetches in progress, keyed by (start, end) date range
+        self._inflight: Dict[Tuple[date, date], asyncio.Future] = {}
+        self.coalesced_fetches = 0
+        self.leader_fetches = 0
+
+        self._keep_alive_task: Optional[asyncio.Task] = None
+        self._last_login_at: Optional[datetime] = None
+        self.last_successful_request = datetime.now()
+        self.consecutive_failures = 0
+        self.shared_relogins = 0
+
+        if not (username and password):
+            logger.warning("No USERNAME/PASSWORD in config; login and session refresh disabled")
+
+    async def start(self):
+        """Create the pooled sessions and start keep-alive (call from the running event loop)."""
+        if self.slots:
+            return
+        for index in range(self.pool_size):
+            session = aiohttp.ClientSession(
+                headers=self.default_headers,
+                # unsafe: also keep cookies of IP-address hosts (local stubs)
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                connector=aiohttp.TCPConnector(limit=self.connections_per_session),
+            )
+            self.slots.append(AsyncPooledSession(index, session))
+        self._idle = list(self.slots)
+        self._pool_changed = asyncio.Condition()
+        if self.enable_keep_alive:
+            self.start_keep_alive()
+
+    async def close(self):
+        """Stop keep-alive and close the pooled sessions."""
+        await self.stop_keep_alive()
+        for slot in self.slots:
+            await slot.session.close()
+
+    @property
+    def primary(self) -> AsyncPooledSession:
+        return self.slots[0]
+
+    @asynccontextmanager
+    async def _checkout(self, slot: Optional[AsyncPooledSession] = None, deadline: Optional[Deadline] = None):
+        """
+        Check out a free pooled session (or the given one) for one upstream operation.
+
+        Raises:
+            DeadlineExceeded: If the deadline passes while waiting
+            TimeoutError: If no session frees up within session_checkout_timeout
+        """
+        timeout = self.session_checkout_timeout
+        if deadline is not None:
+            timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+
+        def available():
+            return slot in self._idle if slot is not None else bool(self._idle)
+
+        started = time.monotonic()
+        async with self._pool_changed:
+            if not available():
+                self.checkout_waits += 1
+                try:
+                    await asyncio.wait_for(self._pool_changed.wait_for(available), timeout)
+                except asyncio.TimeoutError:
+                    if deadline is not None and deadline.expired():
+                        self.retry_budget.record_deadline_exceeded()
+                        raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for a free session")
+                    raise TimeoutError(f"No pooled session became free within {time.monotonic() - started:.1f}s")
+            checked_out = slot if slot is not None else self._idle[0]
+            self._idle.remove(checked_out)
+            self.checkouts += 1
+        try:
+            yield checked_out
+        finally:
+            checked_out.last_used_at = time.monotonic()
+            async with self._pool_changed:
+                self._idle.append(checked_out)
+                self._pool_changed.notify_all()
+
+    async def _send(self, slot: AsyncPooledSession, method: str, url: str, referer: Optional[str] = None,
+                    data: Optional[Dict] = None, timeout: float = 30,
+                    deadline: Optional[Deadline] = None) -> UpstreamResponse:
+        """
+        Send one request with its own Referer header and read the whole body (see VinnustundScraper._send).
+
+        Raises:
+            DeadlineExceeded: If the deadline has already passed, or the request timed out
+                              only because its timeout was capped to the deadline
+        """
+        capped = False
+        if deadline is not None:
+            capped_timeout = deadline.cap(timeout)
+            capped = capped_timeout < timeout
+            timeout = capped_timeout
+        headers = {'Referer': referer} if referer else {}
+        try:
+            # A dict body is sent urlencoded with Content-Type application/x-www-form-urlencoded
+            async with slot.session.request(method, url, headers=headers, data=data,
+                                            timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                content = await response.read()
+                # requests' default for text/* without a charset, so both scrapers decode alike
+                encoding = response.charset or ("ISO-8859-1" if response.content_type.startswith("text/") else "utf-8")
+                return UpstreamResponse(response.status, str(response.url), response.headers, content, encoding)
+        except asyncio.TimeoutError:
+            if capped:
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded during {method} {url}")
+            raise
+
+    async def _retry_request(self, request_func: Callable[[], Awaitable[UpstreamResponse]], max_retries: int = 3,
+                             base_delay: float = 1.0, max_delay: float = 10.0,
+                             deadline: Optional[Deadline] = None) -> UpstreamResponse:
+        """
+        Await request_func with the retry policy of VinnustundScraper._retry_request
+        (backoff with jitter, Retry-After, deadline, shared retry budget, circuit breaker).
+        """
+        self.retry_budget.record_call()
+        attempts = 0
+        try:
+            while True:
+                if deadline is not None:
+                    deadline.check()
+                self.circuit_breaker.before_request()
+                attempts += 1
+                response = None
+                started = time.monotonic()
+                try:
+                    response = await request_func()
+                except DeadlineExceeded:
+                    self.circuit_breaker.release()
+                    self.retry_budget.record_deadline_exceeded()
+                    raise
+                except RETRYABLE_EXCEPTIONS as e:
+                    self.circuit_breaker.record_failure(time.monotonic() - started)
+                    failure = f"{type(e).__name__}: {str(e)}"
+                except BaseException as e:
+                    # Non-retryable (including cancellation) - raise immediately
+                    self.circuit_breaker.release()
+                    if not isinstance(e, asyncio.CancelledError):
+                        logger.error(f"Non-retryable error: {type(e).__name__}: {str(e)}")
+                        self.consecutive_failures += 1
+                    raise
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        self.circuit_breaker.record_success(time.monotonic() - started)
+                        self.last_successful_request = datetime.now()
+                        self.consecutive_failures = 0
+                        return response
+                    self.circuit_breaker.record_failure(time.monotonic() - started)
+                    failure = f"HTTP {response.status_code}"
+
+                delay = min(base_delay * (2 ** (attempts - 1)) + random.uniform(0, 1), max_delay)
+                if response is not None:
+                    delay = max(delay, min(retry_after_seconds(response), max_delay))
+
+                if attempts > max_retries:
+                    logger.error(f"All {attempts} attempts failed ({failure})")
+                elif deadline is not None and deadline.remaining() <= delay:
+                    self.retry_budget.record_deadline_exceeded()
+                    raise DeadlineExceeded(
+                        f"Deadline of {deadline.seconds:g}s leaves no time to retry after attempt {attempts} ({failure})"
+                    )
+                elif not self.retry_budget.try_spend():
+                    logger.error(f"Retry budget exhausted; giving up after attempt {attempts} ({failure})")
+                else:
+                    logger.warning(
+                        f"{failure} on attempt {attempts}/{max_retries + 1}. Retrying in {delay:.2f}s..."
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+
+                self.consecutive_failures += 1
+                if response is not None:
+                    return response
+                raise Exception(f"Connection failed after {attempts} attempts: {failure}")
+        finally:
+            if attempts:
+                self.retry_budget.record_attempts(attempts)
+
+    async def login(self, username: Optional[str] = None, password: Optional[str] = None) -> bool:
+        """Log every pooled session in (see VinnustundScraper.login)."""
+        success = True
+        for slot in self.slots:
+            async with self._checkout(slot), slot.login_lock:
+                success = await self._login_attempt(slot, username, password) and success
+        return success
+
+    async def _relogin(self, slot: AsyncPooledSession, observed_generation: int,
+                       deadline: Optional[Deadline] = None) -> bool:
+        """
+        Relogin an expired session once, however many requests saw it expire, within the
+        deadline (see VinnustundScraper._relogin).
+        """
+        try:
+            await asyncio.wait_for(slot.login_lock.acquire(), deadline.remaining() if deadline else None)
+        except asyncio.TimeoutError:
+            self.retry_budget.record_deadline_exceeded()
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for a relogin")
+        try:
+            if slot.login_generation != observed_generation:
+                self.shared_relogins += 1
+                logger.info("Session already renewed by another request; reusing it")
+                return slot.last_login_ok
+            return await self._login_attempt(slot, deadline=deadline)
+        finally:
+            slot.login_lock.release()
+
+    async def _login_attempt(self, slot: AsyncPooledSession, username: Optional[str] = None,
+                             password: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """
+        Run one login on a pooled session and advance its login generation. Caller must hold slot.login_lock.
+        A login cut short by the deadline leaves the generation alone, and one refused by the
+        open circuit leaves the session untouched (see VinnustundScraper._login_attempt).
+        """
+        detail_form_fields, slot.detail_form_fields = slot.detail_form_fields, None
+        try:
+            slot.last_login_ok = await self._perform_login(slot, username, password, deadline=deadline)
+        except DeadlineExceeded:
+            slot.healthy = False
+            raise
+        except CircuitOpenError:
+            slot.detail_form_fields = detail_form_fields
+            raise
+        slot.healthy = slot.last_login_ok
+        if slot.last_login_ok:
+            slot.last_login_at = datetime.now()
+        slot.login_generation += 1
+        return slot.last_login_ok
+
+    async def _perform_login(self, slot: AsyncPooledSession, username: Optional[str] = None,
+                             password: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """Log a pooled session in: GET the login form, POST the credentials (see VinnustundScraper._perform_login)."""
+        u = username or self._username
+        p = password or self._password
+        if not u or not p:
+            logger.error("Login failed: no username or password provided")
+            return False
+
+        # Before the cookies are cleared, so an open circuit never logs a session out
+        self.circuit_breaker.raise_if_open("logging in")
+        try:
+            slot.session.cookie_jar.clear()
+            login_get_url = f"{self.LOGIN_URL}?businessgroup={self.BUSINESS_GROUP}"
+            await self.pacer.pace_async(0.5, 1.5, deadline)
+            get_resp = await self._retry_request(
+                lambda: self._send(slot, "GET", login_get_url, referer=self.BASE_URL, timeout=15, deadline=deadline),
+                max_retries=2, base_delay=0.5, deadline=deadline,
+            )
+            get_resp.raise_for_status()
+
+            soup = BeautifulSoup(get_resp.text, "html.parser")
+            form = soup.find("form", {"name": "search_form"}) or soup.find("form", action=lambda a: a and "VSLoginX" in a)
+            if not form:
+                logger.error("Login failed: could not find login form on page")
+                return False
+
+            post_data = {
+                "action": "search",
+                "businessgroup": self.BUSINESS_GROUP,
+                "notandanafn": u,
+                "lykilord": p,
+            }
+            post_data.update(VinnustundScraper._hidden_form_fields(form))
+            if form.find("button", {"name": "leita"}) or form.find("input", {"name": "leita"}):
+                post_data["leita"] = "Innskrá"
+
+            await self.pacer.pace_async(0.5, 1.5, deadline)
+            post_resp = await self._retry_request(
+                lambda: self._send(slot, "POST", self.LOGIN_URL, referer=login_get_url, data=post_data, timeout=15,
+                                   deadline=deadline),
+                max_retries=2, base_delay=0.5, deadline=deadline,
+            )
+            post_resp.raise_for_status()
+
+            cookie_names = {cookie.key for cookie in slot.session.cookie_jar}
+            if not any(name in cookie_names for name in self.SESSION_COOKIE_NAMES):
+                logger.error("Login failed: no session cookies (check USERNAME/PASSWORD)")
+                return False
+            text = post_resp.text
+            if "notandanafn" in text and "lykilord" in text and "search_form" in text:
+                logger.error("Login failed: wrong credentials (check USERNAME/PASSWORD)")
+                return False
+            if 'detail_form' in text:
+                form = BeautifulSoup(text, "html.parser").find('form', {'name': 'detail_form'})
+                if form:
+                    slot.detail_form_fields = VinnustundScraper._hidden_form_fields(form)
+
+            self._last_login_at = datetime.now()
+            self.last_successful_request = datetime.now()
+            self.consecutive_failures = 0
+            logger.info("Login successful")
+            return True
+        except (asyncio.CancelledError, DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            logger.error("Login failed: %s", e)
+            return False
+
+    async def get_shifts(self, date_from: str, date_to: str, use_cache: bool = True,
+                         deadline: Optional[Deadline] = None) -> List[Dict]:
+        """
+        Retrieve shifts for the given date range (see VinnustundScraper.get_shifts).
+        Cached days are served locally; the missing intervals are fetched concurrently.
+
+        Raises:
+            DeadlineExceeded: If the shifts could not be retrieved before the deadline
+            CircuitOpenError: If the upstream circuit is open and no cached copy covers the range
+        """
+        key = normalize_range(date_from, date_to)
+        if not key:
+            return await self._fetch_shifts(date_from, date_to, deadline=deadline)
+
+        start, end = key
+        days, missing = {}, [key]
+        if use_cache and self.shift_cache.enabled:
+            days, missing = self.shift_cache.lookup(start, end)
+
+        try:
+            tasks = [asyncio.ensure_future(self._fetch_days(gap_start, gap_end, deadline))
+                     for gap_start, gap_end in missing]
+            try:
+                fetched = await asyncio.gather(*tasks)
+            except BaseException:
+                # One gap failed (or the request was cancelled): stop fetching the others
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            for gap_days in fetched:
+                for day, day_shifts in gap_days.items():
+                    if start <= day <= end:
+                        days[day] = day_shifts
+        except CircuitOpenError:
+            stale = self._stale_days(start, end, days) if use_cache else None
+            if stale is None:
+                raise
+            logger.warning("Upstream circuit open; serving cached shifts for %s to %s", date_from, date_to)
+            days = stale
+
+        if missing != [key]:
+            logger.debug("Shift cache: %s to %s served with %d upstream request(s)", date_from, date_to, len(missing))
+        return [shift for day in sorted(days) for shift in days[day]]
+
+    def _stale_days(self, start: date, end: date, days: Dict[date, List[Dict]]) -> Optional[Dict[date, List[Dict]]]:
+        """Complete days with expired cache entries; None if some day of start..end is still missing."""
+        days = dict(days)
+        for day, day_shifts in self.shift_cache.lookup_stale(start, end).items():
+            days.setdefault(day, day_shifts)
+        if find_gaps(start, end, days):
+            return None
+        self.circuit_breaker.record_stale_served()
+        return days
+
+    async def _fetch_days(self, start: date, end: date, deadline: Optional[Deadline] = None) -> Dict[date, List[Dict]]:
+        """
+        Fetch start..end upstream, sharing an in-flight fetch of the same or an enclosing
+        range (see VinnustundScraper._fetch_days). A waiting caller fetches as the new
+        leader if the leader ran out of its own deadline or was cancelled.
+        """
+        while True:
+            for (flight_start, flight_end), flight in self._inflight.items():
+                if flight_start <= start and end <= flight_end:
+                    break
+            else:
+                break
+            self.coalesced_fetches += 1
+            logger.debug("Waiting for in-flight fetch %s to %s", flight_start, flight_end)
+            try:
+                # shield: a caller giving up must not cancel the fetch other callers wait for
+                days = await asyncio.wait_for(asyncio.shield(flight), deadline.remaining() if deadline else None)
+            except asyncio.TimeoutError:
+                self.retry_budget.record_deadline_exceeded()
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for in-flight fetch")
+            except asyncio.CancelledError:
+                # Only the leader was cancelled (its client went away): fetch again
+                if not flight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            except DeadlineExceeded:
+                # The leader ran out of its own deadline; fetch again if this caller has time left
+                if deadline is not None:
+                    deadline.check("fetching shifts")
+            else:
+                return {day: day_shifts for day, day_shifts in days.items() if start <= day <= end}
+            logger.debug("In-flight fetch %s to %s ended with its leader; fetching again", flight_start, flight_end)
+
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[(start, end)] = flight
+        self.leader_fetches += 1
+        try:
+            shifts = await self._fetch_shifts(format_date(start), format_date(end), deadline=deadline)
+            days = self.shift_cache.store(start, end, shifts)
+            flight.set_result(days)
+            return days
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Retrieve it so a fetch nobody else waited for does not log "exception never retrieved"
+            flight.exception()
+            raise
+        finally:
+            del self._inflight[(start, end)]
+
+    def get_coalescing_info(self) -> Dict:
+        """Return single-flight counters for /health."""
+        return {
+            'in_flight': len(self._inflight),
+            'leader_fetches': self.leader_fetches,
+            'coalesced_fetches': self.coalesced_fetches,
+        }
+
+    async def _fetch_shifts(self, date_from: str, date_to: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Fetch shifts for the given date range on a checked-out pooled session."""
+        self.circuit_breaker.raise_if_open("fetching shifts")
+        try:
+            async with self._checkout(deadline=deadline) as slot:
+                shifts = await self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline)
+                slot.healthy = True
+                return shifts
+        except TimeoutError as e:
+            raise Exception(f"Failed to retrieve shifts: {e}")
+
+    async def _ensure_session_valid(self, slot: AsyncPooledSession, deadline: Optional[Deadline] = None) -> bool:
+        """Log a session without cookies in (within deadline) if credentials are configured."""
+        if len(slot.session.cookie_jar) > 0:
+            return True
+        if self._username and self._password:
+            logger.info("Logging in (no session)")
+            return await self._relogin(slot, slot.login_generation, deadline=deadline)
+        logger.warning("No cookies in session and no credentials to login")
+        return False
+
+    async def _fetch_form_fields(self, slot: AsyncPooledSession, deadline: Optional[Deadline] = None) -> Optional[Dict[str, str]]:
+        """
+        GET the timesheet page and return the hidden fields of detail_form, visiting the
+        base URL and retrying once if the form is missing. Returns None if the session has expired.
+        """
+        async def get_timesheet():
+            await self.pacer.pace_async(1.0, 2.0, deadline)
+            return await self._retry_request(
+                lambda: self._send(slot, "GET", self.TIMESHEET_URL + "?sj=true", referer=self.BASE_URL,
+                                   timeout=30, deadline=deadline),
+                max_retries=3, base_delay=1.0, deadline=deadline,
+            )
+
+        response = await get_timesheet()
+        if not VinnustundScraper._check_session_valid(response):
+            return None
+        if response.status_code != 200:
+            raise Exception(f"Initial GET failed with status code {response.status_code}")
+        form = BeautifulSoup(response.text, 'html.parser').find('form', {'name': 'detail_form'})
+        if not form:
+            logger.debug("detail_form not found on initial page; trying refresh")
+            await self._retry_request(
+                lambda: self._send(slot, "GET", self.BASE_URL, referer=self.BASE_URL, timeout=10, deadline=deadline),
+                max_retries=2, base_delay=0.5, deadline=deadline,
+            )
+            await self.pacer.pace_async(3.0, 4.0, deadline)
+            response = await get_timesheet()
+            if not VinnustundScraper._check_session_valid(response):
+                return None
+            form = BeautifulSoup(response.text, 'html.parser').find('form', {'name': 'detail_form'})
+            if not form:
+                return None
+        return VinnustundScraper._hidden_form_fields(form)
+
+    async def _fetch_shifts_on(self, slot: AsyncPooledSession, date_from: str, date_to: str,
+                               deadline: Optional[Deadline] = None, _retry_after_login: bool = False) -> List[Dict]:
+        """
+        Fetch shifts on a checked-out pooled session: one POST with cached detail_form fields,
+        or GET + POST after a login; relogin and retry once if the session has expired
+        (see VinnustundScraper._fetch_shifts_on).
+        """
+        if not await self._ensure_session_valid(slot, deadline=deadline):
+            raise Exception(
+                "Session invalid and login not available or failed. "
+                "Configure USERNAME and PASSWORD in config.py for automatic relogin."
+            )
+        login_generation = slot.login_generation
+
+        async def relogin_and_retry():
+            if not _retry_after_login and self._username and self._password:
+                logger.info("Session expired; relogin and retry")
+                if await self._relogin(slot, login_generation, deadline=deadline):
+                    return await self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline,
+                                                       _retry_after_login=True)
+            raise Exception("Session expired or invalid. Configure USERNAME/PASSWORD in config.py for automatic relogin.")
+
+        cached_fields = slot.detail_form_fields
+        hidden_inputs = dict(cached_fields) if cached_fields is not None else None
+        if hidden_inputs is None:
+            hidden_inputs = await self._fetch_form_fields(slot, deadline)
+            if hidden_inputs is None:
+                return await relogin_and_retry()
+            slot.detail_form_fields = dict(hidden_inputs)
+
+        form_data = hidden_inputs
+        form_data.update({'timabilFra': date_from, 'timabilTil': date_to})
+        form_data.setdefault('sj', 'true')
+        form_data.setdefault('showBak', 'true')
+
+        await self.pacer.pace_async(1.0, 2.0, deadline)
+        response = await self._retry_request(
+            lambda: self._send(slot, "POST", self.TIMESHEET_URL, referer=self.TIMESHEET_URL + "?sj=true",
+                               data=form_data, timeout=30, deadline=deadline),
+            max_retries=3, base_delay=1.0, deadline=deadline,
+        )
+
+        # Stale cached fields: harvest them again with a GET (see VinnustundScraper._fetch_shifts_on)
+        if cached_fields is not None and (
+            response.status_code != 200 or not VinnustundScraper._check_session_valid(response)
+            or 'detail_form' not in response.text
+        ):
+            slot.detail_form_fields = None
+            logger.info("POST with cached form fields failed; retrying with a fresh form")
+            return await self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline,
+                                               _retry_after_login=_retry_after_login)
+
+        if not VinnustundScraper._check_session_valid(response):
+            return await relogin_and_retry()
+        if response.status_code != 200:
+            raise Exception(f"Received status code {response.status_code}")
+
+        shifts = await asyncio.get_running_loop().run_in_executor(None, self.parser.parse_shifts, response.text)
+        logger.info("Retrieved %d shifts (%s to %s)", len(shifts), date_from, date_to)
+        return shifts
+
+    async def test_authentication(self) -> bool:
+        """Return True if the primary session is authenticated."""
+        try:
+            await self.pacer.pace_async(0.5, 1.0)
+            response = await self._retry_request(
+                lambda: self._send(self.primary, "GET", self.TIMESHEET_URL + "?sj=true", referer=self.BASE_URL, timeout=15),
+                max_retries=2, base_delay=0.5,
+            )
+            return VinnustundScraper._check_session_valid(response)
+        except Exception as e:
+            logger.debug("Auth test failed: %s", e)
+            return False
+
+    @staticmethod
+    def _session_idle_seconds(slot: AsyncPooledSession) -> float:
+        if slot.last_used_at is None:
+            return float("inf")
+        return time.monotonic() - slot.last_used_at
+
+    async def keep_alive(self, idle_only: bool = False) -> bool:
+        """
+        Keep every logged-in session alive by visiting a page. In "refresh_shifts" mode the
+        current pay period is refreshed once first, and only the sessions it did not use
+        visit a page (see VinnustundScraper._perform_keep_alive_action).
+
+        Args:
+            idle_only: Skip sessions never used or used within keep_alive_interval (set by the
+                       background task)
+
+        Returns:
+            True if all succeeded
+        """
+        slots = [
+            slot for slot in self.slots
+            if (slot is self.primary or len(slot.session.cookie_jar) > 0)
+            and (not idle_only or (slot.last_used_at is not None
+                                   and self._session_idle_seconds(slot) >= self.keep_alive_interval))
+        ]
+        if not slots:
+            return True
+        success = True
+        if self.keep_alive_mode == "refresh_shifts":
+            refresh_started = time.monotonic()
+            success = await self._refresh_pay_period()
+            slots = [slot for slot in slots if slot.last_used_at is None or slot.last_used_at < refresh_started]
+        results = await asyncio.gather(*(self._keep_alive_session(slot) for slot in slots))
+        return all(results) and success
+
+    async def _refresh_pay_period(self) -> bool:
+        """Fetch the current pay period through the single-flight path, unless it is still cached."""
+        start, end = pay_period(date.today(), self.pay_period_start_day)
+        try:
+            if self.shift_cache.enabled and not self.shift_cache.lookup(start, end)[1]:
+                return True
+            await self._fetch_days(start, end)
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.consecutive_failures += 1
+            logger.debug("Keep-alive refresh failed: %s", e)
+            return False
+
+    async def _keep_alive_session(self, slot: AsyncPooledSession) -> bool:
+        try:
+            await self.pacer.pace_async(0.5, 2.0)
+            url = random.choice([
+                self.TIMESHEET_URL + "?sj=true",
+                self.BASE_URL + "/VS_MX/starfsmadur/starfsmadur_view.jsp?sj=true",
+                self.BASE_URL + "/VS_MX/adalsida.jsp",
+            ])
+            response = await self._retry_request(
+                lambda: self._send(slot, "GET", url, referer=self.BASE_URL, timeout=15),
+                max_retries=2, base_delay=0.5,
+            )
+            slot.healthy = VinnustundScraper._check_session_valid(response)
+            slot.last_used_at = time.monotonic()
+            return slot.healthy
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            slot.healthy = False
+            # A failed attempt counts as use too, so the next one waits a full interval
+            slot.last_used_at = time.monotonic()
+            self.consecutive_failures += 1
+            logger.debug("Keep-alive request failed: %s", e)
+            return False
+
+    async def _keep_alive_loop(self):
+        """Background task: wake up when the longest-idle session reaches keep_alive_interval."""
+        while True:
+            try:
+                idle = max((self._session_idle_seconds(slot) for slot in self.slots
+                            if slot.last_used_at is not None), default=0)
+                await asyncio.sleep(min(max(self.keep_alive_interval - idle, 5), self.keep_alive_interval))
+                if self.circuit_breaker.state == OPEN:
+                    logger.debug("Keep-alive skipped: upstream circuit open")
+                    continue
+                await self.keep_alive(idle_only=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug("Keep-alive task error: %s", e)
+                await asyncio.sleep(60)
+
+    def start_keep_alive(self):
+        """Start the keep-alive task on the running event loop."""
+        if self._keep_alive_task is None or self._keep_alive_task.done():
+            self._keep_alive_task = asyncio.get_running_loop().create_task(self._keep_alive_loop())
+
+    @property
+    def keep_alive_running(self) -> bool:
+        return self._keep_alive_task is not None and not self._keep_alive_task.done()
+
+    async def stop_keep_alive(self):
+        """Cancel the keep-alive task and wait for it to finish."""
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+            try:
+                await self._keep_alive_task
+            except asyncio.CancelledError:
+                pass
+            self._keep_alive_task = None
+
+    def get_pool_info(self) -> Dict:
+        """Return pool size, free sessions and checkout counters for /health."""
+        return {
+            'size': len(self.slots),
+            'idle': len(self._idle),
+            'checkouts': self.checkouts,
+            'checkout_waits': self.checkout_waits,
+            'sessions': [slot.info() for slot in self.slots],
+        }
@@ -0,0 +1,82 @@
+"""
+Leader election for shared background tasks across app worker processes.
+
+Under a multi-process server (gunicorn) every worker builds its own scraper and keeps
+its own sessions alive. Tasks on state shared by all workers (archive sync of the
+shift archive file) run only in the worker holding an exclusive lock on a shared file;
+the others poll the lock and take over when the leader exits, since the OS releases
+the lock with it.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process is its own leader
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLeader:
+    """Calls on_elected once this process holds the lock file."""
+
+    def __init__(self, lock_path: str, on_elected: Callable[[], None], poll_seconds: float = 15):
+        """
+        Args:
+            lock_path: File all worker processes lock (created if missing)
+            on_elected: Called once when this process becomes the leader
+            poll_seconds: How often a follower retries the lock
+        """
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.poll_seconds = poll_seconds
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Try to become the leader now, and keep trying in the background if another process is."""
+        if self._try_acquire():
+            return
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            if self._try_acquire():
+                return
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            self._elect()
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._elect()
+        return True
+
+    def _elect(self):
+        self.is_leader = True
+        logger.info("Process %d runs the background tasks", os.getpid())
+        self.on_elected()
+
+    def stop(self):
+        """Stop polling and release the lock (a follower takes over)."""
+        self._stop.set()
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
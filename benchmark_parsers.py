@@ -0,0 +1,102 @@
+"""
+Benchmark the timesheet parser backends on synthetic multi-month responses.
+Checks that every backend produces byte-identical shifts, then reports parse times.
+
+Usage:
+    python benchmark_parsers.py [months ...]      (default: 1 3 12)
+"""
+
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from parsers import PARSER_BACKENDS, get_parser
+
+DAY_NAMES = ["Mán", "Þri", "Mið", "Fim", "Fös", "Lau", "Sun"]
+
+
+def build_timesheet_html(months: int, start: date = date(2026, 1, 1)) -> str:
+    """Build a timesheet page shaped like starfsm_timafaerslur_view.jsp with one row per day."""
+    rows = []
+    day = start
+    end = start + timedelta(days=30 * months)
+    while day < end:
+        worked = day.weekday() < 5
+        time_entered = (
+            '<a href="#" title="Skráð af starfsmanni">09:00 - 17:00</a>' if worked else "&nbsp;"
+        )
+        status = '<span title="Samþykkt">S</span>' if worked else ""
+        pay = "".join(f"<td>{'8,00' if worked and i == 4 else '&nbsp;'}</td>" for i in range(5))
+        rows.append(
+            "<tr>"
+            f"<td>{DAY_NAMES[day.weekday()]}</td>"
+            f"<td>{day.strftime('%d.%m.%Y')}</td>"
+            "<td>&nbsp;</td><td></td>"
+            "<td><!-- note --></td>"
+            "<td></td>"
+            f"<td>{time_entered}</td>"
+            f"<td>{'09:00 - 17:00' if worked else ''}</td>"
+            f"<td>{'08:00' if worked else ''}</td>"
+            "<td></td><td></td>"
+            f"<td>{'asked by' if day.day == 2 else ''}</td>"
+            f"<td>{status}</td>"
+            f"<td>{status.replace('S<', 'O<')}</td>"
+            f"{pay}"
+            '<td><a href="detail.jsp"><img src="i.gif"></a></td>'
+            "</tr>\n"
+        )
+        day += timedelta(days=1)
+
+    header = (
+        '<tr><td class="vrTableHeader">Vikudagur</td><td class="vrTableHeader">Dags.</td>'
+        '<td class="vrTableHeader" colspan="2">Vinnutími</td></tr>\n'
+        '<tr><td class="vrTableHeader">S</td><td class="vrTableHeader">T</td></tr>\n'
+    )
+    total = "<tr><td>Total</td><td></td><td></td><td>168:00</td></tr>\n"
+    return (
+        "<html><head><title>Timesheet</title><script>var x = '<td>';</script></head><body>"
+        '<form name="detail_form"><input type="hidden" name="sj" value="true"></form>'
+        '<table class="clsTableControl"><tr><td>Síða 1</td></tr></table>'
+        '<table class="clsTableControl vrTable"><tbody>\n'
+        f"{header}{''.join(rows)}{total}"
+        "</tbody></table></body></html>"
+    )
+
+
+def time_backend(backend: str, html: str, repeat: int) -> float:
+    """Return the best-of-repeat wall time (seconds) for parsing html with backend."""
+    parser = get_parser(backend)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parser.parse_shifts(html)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(months_list):
+    for months in months_list:
+        html = build_timesheet_html(months)
+        outputs = {
+            backend: json.dumps(get_parser(backend).parse_shifts(html), ensure_ascii=False)
+            for backend in PARSER_BACKENDS
+        }
+        reference = outputs["bs4"]
+        for backend, output in outputs.items():
+            if output != reference:
+                print(f"✗ {backend} output differs from bs4 for {months} month(s)")
+                sys.exit(1)
+
+        shift_count = len(json.loads(reference))
+        print(f"{months} month(s): {len(html) / 1024:.0f} KiB HTML, {shift_count} shifts, outputs identical")
+        timings = {backend: time_backend(backend, html, repeat=5) for backend in PARSER_BACKENDS}
+        for backend, seconds in timings.items():
+            speedup = timings["bs4"] / seconds
+            print(f"  {backend:5s} {seconds * 1000:8.1f} ms  ({speedup:.1f}x)")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    main([int(arg) for arg in sys.argv[1:]] or [1, 3, 12])
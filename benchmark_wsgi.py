@@ -0,0 +1,181 @@
+"""
+Benchmark /retrieve_shifts throughput of the Flask dev server (python app.py), gunicorn
+(gunicorn.conf.py) and the asyncio server (python async_app.py), all talking to a local
+stub of the upstream site.
+
+The stub answers like kopavogur.vinnustund.is (login page, login POST, timesheet GET
+and POST) after a fixed latency. Each server runs from a temporary directory with a
+generated config.py pointing BASE_URL at the stub, so no real credentials are used.
+
+Usage:
+    python benchmark_wsgi.py [--requests 400] [--concurrency 16] [--latency 0.05]
+                             [--workers 4] [--threads 8] [--cache]
+
+Without --cache every request goes upstream (measures concurrency towards the site);
+with --cache requests are served from the shift cache (measures the server itself).
+"""
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from benchmark_parsers import build_timesheet_html
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOGIN_PAGE = (
+    '<form name="search_form" action="VSLoginX.jsp"><input type="hidden" name="random" value="1">'
+    '<input name="notandanafn"><input name="lykilord"></form>'
+)
+
+
+def start_stub_upstream(latency: float):
+    """Start the stub site on a free port; returns (server, base_url)."""
+    timesheet = build_timesheet_html(1).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, body: bytes, cookies=()):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for cookie in cookies:
+                self.send_header("Set-Cookie", cookie)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            if "VSLoginX" in self.path:
+                return self._reply(LOGIN_PAGE.encode("utf-8"))
+            return self._reply(timesheet)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            if "VSLoginX" in self.path:
+                return self._reply(b"<html>ok</html>", cookies=(
+                    "JSESSIONID=bench; Path=/", "sessionPersist=1; Path=/", "TS01780571=1; Path=/",
+                ))
+            return self._reply(timesheet)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def write_config(directory: str, base_url: str, cache: bool, workers: int, threads: int, port: int):
+    with open(os.path.join(directory, "config.py"), "w") as f:
+        f.write(
+            'USERNAME = "bench"\nPASSWORD = "bench"\nCUSTOM_HEADERS = None\n'
+            "REFRESH_AUTOMATICALLY = False\nAUTOMATIC_REFRESH_PERIOD_HOURS = 8\n"
+            f"BASE_URL = {base_url!r}\n"
+            'PACING_POLICY = "token_bucket"\nPACING_RATE_PER_SECOND = 100000\nPACING_BURST = 100000\n'
+            f"SESSION_POOL_SIZE = {threads}\n"
+            f"SHIFT_CACHE_TTL_SECONDS = {300 if cache else 0}\n"
+            f"WSGI_BIND = '127.0.0.1:{port}'\nWSGI_WORKERS = {workers}\nWSGI_THREADS = {threads}\n"
+            f"BACKGROUND_LOCK_PATH = {os.path.join(directory, 'background.lock')!r}\n"
+        )
+
+
+def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def run_load(base: str, total: int, concurrency: int, cache: bool):
+    """Fire total requests from concurrency client threads; returns (requests/s, latencies)."""
+    days = [date(2026, 1, 1) + timedelta(days=i % 28) for i in range(total)]
+
+    def one(day):
+        # Cached runs repeat one range; upstream runs use a different day per request
+        day = date(2026, 1, 1) if cache else day
+        params = {"dateFrom": day.strftime("%d.%m.%Y"), "dateTo": day.strftime("%d.%m.%Y")}
+        started = time.perf_counter()
+        response = requests.get(f"{base}/retrieve_shifts", params=params, timeout=60)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    one(days[0])  # log in before timing
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, days))
+    return total / (time.perf_counter() - started), latencies
+
+
+def bench_server(name: str, command, base: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        write_config(directory, args.stub_base, args.cache, args.workers, args.threads, args.port)
+        # The generated config.py is imported from the working directory
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([directory, REPO_DIR]))
+        process = subprocess.Popen(command, cwd=directory, env=env, start_new_session=True,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(f"{base}/health")
+            rps, latencies = run_load(base, args.requests, args.concurrency, args.cache)
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=30)
+    latencies.sort()
+    return {
+        "server": name,
+        "rps": rps,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub upstream latency in seconds")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5001, help="gunicorn port (the dev server uses 5000)")
+    parser.add_argument("--cache", action="store_true")
+    args = parser.parse_args()
+
+    server, args.stub_base = start_stub_upstream(args.latency)
+    results = [
+        bench_server("flask dev server", [sys.executable, os.path.join(REPO_DIR, "app.py")],
+                     "http://127.0.0.1:5000", args),
+        bench_server(f"gunicorn {args.workers}x{args.threads}",
+                     [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_DIR, "gunicorn.conf.py"), "app:app"],
+                     f"http://127.0.0.1:{args.port}", args),
+        bench_server("aiohttp (async)", [sys.executable, os.path.join(REPO_DIR, "async_app.py")],
+                     "http://127.0.0.1:5000", args),
+    ]
+    server.shutdown()
+
+    mode = "cached" if args.cache else f"upstream, {args.latency * 1000:.0f} ms stub latency"
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients ({mode})")
+    print(f"{'server':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{r['server']:<20} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
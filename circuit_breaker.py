@@ -0,0 +1,150 @@
+"""
+Circuit breaker for upstream requests.
+
+Every upstream attempt made by _retry_request is recorded as a success or a failure
+(connection error, retryable status, or a response slower than slow_call_seconds).
+When the failure rate over the last window_size attempts reaches failure_rate_threshold,
+the circuit opens: attempts fail immediately with CircuitOpenError for open_seconds.
+After that one probe request is let through (half-open); it closes the circuit on
+success and reopens it on failure.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open breaker driven by failure rate and latency."""
+
+    def __init__(self, failure_rate_threshold: float = 0.5, window_size: int = 20,
+                 min_calls: int = 5, slow_call_seconds: float = 20, open_seconds: float = 60):
+        """
+        Args:
+            failure_rate_threshold: Fraction of failed attempts in the window that opens the circuit
+            window_size: Number of most recent attempts the failure rate is computed over
+            min_calls: Attempts needed in the window before the circuit can open
+            slow_call_seconds: Attempts slower than this count as failures
+            open_seconds: How long the circuit stays open before a probe is let through
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = max(1, min_calls)
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._outcomes = deque(maxlen=max(self.min_calls, window_size))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+        self.stale_served = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self) -> int:
+        """Seconds until the next probe may be sent (for Retry-After headers)."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0
+            return max(1, int(self.open_seconds - (time.monotonic() - self._opened_at)) + 1)
+
+    def raise_if_open(self, what: str = "sending request"):
+        """
+        Fail fast before starting a multi-request operation (does not take the half-open probe).
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        with self._lock:
+            if self._current_state() != OPEN:
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Upstream unavailable (circuit open); not {what}")
+
+    def before_request(self):
+        """
+        Admit one upstream attempt (in half-open state only a single probe at a time).
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a probe is already in flight
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError("Upstream unavailable (circuit open); not sending request")
+
+    def record_success(self, duration: float):
+        if duration > self.slow_call_seconds:
+            self.record_failure(duration)
+            return
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append(True)
+
+    def record_failure(self, duration: float):
+        with self._lock:
+            state = self._current_state()
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if state == HALF_OPEN or (
+                state == CLOSED and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self.times_opened += 1
+
+    def release(self):
+        """Forget an admitted attempt that ended without an outcome (e.g. a local error)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_stale_served(self):
+        with self._lock:
+            self.stale_served += 1
+
+    def stats(self) -> Dict:
+        """Return state and counters for /health."""
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            return {
+                'state': state,
+                'failure_rate': round(failures / calls, 3) if calls else None,
+                'window_calls': calls,
+                'failure_rate_threshold': self.failure_rate_threshold,
+                'slow_call_seconds': self.slow_call_seconds,
+                'open_seconds': self.open_seconds,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'stale_served': self.stale_served,
+            }
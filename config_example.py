@@ -15,6 +15,105 @@ REFRESH_AUTOMATICALLY = False
 # How often to perform automatic relogin (in hours). Only used when REFRESH_AUTOMATICALLY is True.
 AUTOMATIC_REFRESH_PERIOD_HOURS = 8
 
+# HTML parser for timesheet responses: "lxml" (fast, C-based) or "bs4" (pure-Python html.parser)
+PARSER_BACKEND = "lxml"
+
+# Shift cache for /retrieve_shifts, indexed per calendar day (seconds a day stays cached).
+# Overlapping ranges are served from cached days; only missing days are fetched. 0 disables the cache.
+SHIFT_CACHE_TTL_SECONDS = 300
+# Past days whose shifts are all approved are cached this long instead
+SHIFT_CACHE_SETTLED_TTL_SECONDS = 7 * 24 * 3600
+# Maximum number of cached days (least recently used are evicted)
+SHIFT_CACHE_MAX_DAYS = 3660
+# Missing intervals separated by at most this many cached days are fetched in one request
+SHIFT_CACHE_MERGE_GAP_DAYS = 3
+# Persistent SQLite archive of shifts (survives restarts). None disables it.
+SHIFT_ARCHIVE_PATH = "shifts.sqlite3"
+# Seconds between background syncs of recent and unapproved days
+SHIFT_ARCHIVE_SYNC_INTERVAL_SECONDS = 3600
+# Number of days up to today refreshed by every sync
+SHIFT_ARCHIVE_SYNC_RECENT_DAYS = 14
+# Pay periods (the open one included) whose unsettled days every sync refreshes
+SHIFT_ARCHIVE_SYNC_PAY_PERIODS = 2
+# Number of independent upstream sessions (each logged in with its own cookies).
+# Concurrent requests for different ranges are fetched in parallel, one per session.
+SESSION_POOL_SIZE = 1
+# Seconds a request waits for a free session before failing (None waits indefinitely)
+SESSION_CHECKOUT_TIMEOUT_SECONDS = 120
+# Pacing of upstream requests:
+# "random" sleeps 0.5-2 s before every request (human-like, adds latency even when idle);
+# "token_bucket" only waits when more than PACING_BURST requests arrive faster than PACING_RATE_PER_SECOND.
+PACING_POLICY = "token_bucket"
+PACING_RATE_PER_SECOND = 0.5
+PACING_BURST = 5
+# Upper bound in seconds for the upstream work of one /retrieve_shifts call; clients may
+# ask for less with the timeout parameter. Requests that run out of time return 504.
+REQUEST_DEADLINE_SECONDS = 60
+# Retries allowed per upstream call across all threads (caps retry storms during outages)
+RETRY_BUDGET_RATIO = 0.2
+# Circuit breaker: when this fraction of the last CIRCUIT_WINDOW_SIZE upstream requests
+# failed (errors, 429/5xx, or slower than CIRCUIT_SLOW_CALL_SECONDS), requests fail fast
+# (or are served from cache) for CIRCUIT_OPEN_SECONDS before a single probe is sent.
+CIRCUIT_FAILURE_RATE_THRESHOLD = 0.5
+CIRCUIT_WINDOW_SIZE = 20
+CIRCUIT_MIN_CALLS = 5
+CIRCUIT_SLOW_CALL_SECONDS = 20
+CIRCUIT_OPEN_SECONDS = 60
+# File (mode 0600) the session cookies are kept in across restarts, so a restart or
+# rolling deploy reuses the existing login instead of logging in again. None disables it.
+COOKIE_JAR_PATH = "cookies.json"
+# Log in and prime all sessions on a background thread at startup; /ready returns 503
+# (and /health readiness is "warming") until a session is ready for requests
+WARM_UP_ON_STARTUP = True
+# Learn how long a login lasts from observed expiries and relogin in the background
+# PROACTIVE_RELOGIN_MARGIN_SECONDS before the predicted expiry (new session swapped in)
+PROACTIVE_RELOGIN = True
+PROACTIVE_RELOGIN_MARGIN_SECONDS = 300
+# Keep-alive: "page" visits a random page; "refresh_shifts" re-fetches the current pay
+# period into the shift cache/archive once per round (other sessions visit a page). In the
+# background a session is only kept alive after it has been idle for the keep-alive
+# interval (user requests keep it alive too).
+KEEP_ALIVE_MODE = "refresh_shifts"
+# Day of month pay periods start on (1-28), used by "refresh_shifts" and to settle closed periods
+PAY_PERIOD_START_DAY = 1
+# Split upstream fetches longer than FETCH_CHUNK_DAYS days (0 disables) into chunks fetched
+# concurrently over the session pool, at most FETCH_CONCURRENCY at a time (default: SESSION_POOL_SIZE)
+FETCH_CHUNK_DAYS = 31
+FETCH_CONCURRENCY = None
+# Parse responses of at least PARSE_PROCESS_MIN_BYTES in PARSE_PROCESSES worker processes,
+# so a large parse does not block other requests on the GIL (0 parses inline)
+PARSE_PROCESSES = 2
+PARSE_PROCESS_MIN_BYTES = 262144
+# /retrieve_shifts_batch: most ranges per call, and merged ranges retrieved at the same time
+# (None: FETCH_CONCURRENCY)
+BATCH_MAX_RANGES = 100
+BATCH_CONCURRENCY = None
+# Background jobs (POST /jobs): concurrent jobs, jobs allowed to wait, how long finished
+# results are kept, and the time limit of one job
+JOB_WORKERS = 2
+JOB_QUEUE_SIZE = 20
+JOB_RESULT_RETENTION_SECONDS = 3600
+JOB_DEADLINE_SECONDS = 900
+# Most finished jobs kept (the oldest are dropped first)
+JOB_MAX_RETAINED = 100
+# SQLite file jobs are kept in, shared by the gunicorn workers so any worker answers
+# polls for any job. None keeps jobs in the memory of the worker that accepted them.
+JOB_STORE_PATH = "jobs.sqlite3"
+# Production serving (gunicorn -c gunicorn.conf.py app:app); environment variables override these
+WSGI_BIND = "0.0.0.0:5000"
+WSGI_WORKERS = 2
+WSGI_THREADS = 8
+# Lock file shared by the gunicorn workers: only the worker holding it runs archive sync
+# (keep-alive, scheduled refresh and proactive relogin run in every worker, for its own
+# sessions). None runs archive sync in every process.
+BACKGROUND_LOCK_PATH = "/tmp/smastund-background.lock"
+# Site to scrape (override to point at a test stub)
+# BASE_URL = "https://kopavogur.vinnustund.is"
+# Status codes (S/T columns) that mean a shift is approved. A past day is settled when both
+# columns of all its shifts hold one, or once its pay period (PAY_PERIOD_START_DAY) has
+# closed and none of its shifts holds another status
+APPROVED_STATUSES = ("S",)
+
 # Optional: Custom headers (usually default headers work fine)
 CUSTOM_HEADERS = {
     "Referer": "https://kopavogur.vinnustund.is/",
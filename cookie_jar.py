@@ -0,0 +1,133 @@
+"""
+Persistent cookie jar for the pooled upstream sessions.
+
+The cookies of every pooled session (JSESSIONID, sessionPersist, TS01780571, ...) and
+its last login time are written to a JSON file readable only by the owner, so a
+restarted process can reuse the sessions instead of logging in again. Restored
+sessions are not checked at startup; the first request that finds one expired
+relogins as usual.
+
+Each app process has its own session pool, so each process claims a file of its own:
+the configured path for the first process, then path.1, path.2, ... The claim is an
+exclusive lock on a companion .lock file held for the life of the process, so a
+restarted worker takes over a file its predecessor released, and no two processes
+ever write the same file.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process uses the configured path
+    fcntl = None
+
+from requests.cookies import create_cookie
+
+from session_pool import PooledSession
+
+logger = logging.getLogger(__name__)
+
+
+class CookieJarFile:
+    """Saves and restores the cookies of pooled sessions (file mode 0600)."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: JSON file to store the cookies in (created on first save); other processes
+                  using the same path get numbered files next to it
+        """
+        self.configured_path = path
+        self._claim_fd: Optional[int] = None
+        self.path = self._claim(path)
+        self._lock = threading.Lock()
+
+    def _claim(self, path: str) -> str:
+        """Return the first of path, path.1, path.2, ... whose .lock file this process can lock."""
+        if fcntl is None:
+            return path
+        index = 0
+        while True:
+            candidate = path if index == 0 else f"{path}.{index}"
+            fd = os.open(f"{candidate}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                index += 1
+                continue
+            self._claim_fd = fd
+            if candidate != path:
+                logger.info("Cookie jar %s is in use by another process; using %s", path, candidate)
+            return candidate
+
+    def save(self, slots: List[PooledSession]):
+        """Write the cookies and last login time of every pooled session (atomic replace)."""
+        data = {
+            'saved_at': datetime.now().isoformat(),
+            'sessions': [
+                {
+                    'index': slot.index,
+                    'last_login_at': slot.last_login_at.isoformat() if slot.last_login_at else None,
+                    'cookies': [
+                        {
+                            'name': cookie.name,
+                            'value': cookie.value,
+                            'domain': cookie.domain,
+                            'path': cookie.path,
+                            'secure': cookie.secure,
+                            'expires': cookie.expires,
+                        }
+                        for cookie in slot.session.cookies
+                    ],
+                }
+                for slot in slots
+            ],
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                os.chmod(tmp_path, 0o600)
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+    def restore(self, slots: List[PooledSession]) -> int:
+        """
+        Load saved cookies into the pooled sessions with the same index.
+
+        Returns:
+            Number of sessions that got cookies back (0 if the file is missing or unreadable)
+        """
+        with self._lock:
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return 0
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read cookie jar %s: %s", self.path, e)
+                return 0
+
+        by_index = {slot.index: slot for slot in slots}
+        restored = 0
+        for entry in data.get('sessions', []):
+            slot = by_index.get(entry.get('index'))
+            if slot is None or not entry.get('cookies'):
+                continue
+            for cookie in entry['cookies']:
+                slot.session.cookies.set_cookie(create_cookie(
+                    cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                    path=cookie.get('path', '/'), secure=cookie.get('secure', False),
+                    expires=cookie.get('expires'),
+                ))
+            if entry.get('last_login_at'):
+                slot.last_login_at = datetime.fromisoformat(entry['last_login_at'])
+            slot.last_login_ok = True
+            restored += 1
+        return restored
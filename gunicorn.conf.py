@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for production serving:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Settings come from environment variables, falling back to config.py and then to the
+defaults below. Each worker process imports app.py and builds its own scraper and
+session pool (the app is not preloaded: background threads do not survive fork).
+Every worker keeps its own sessions alive; set BACKGROUND_LOCK_PATH in config.py so
+only one worker runs archive sync.
+"""
+
+import os
+
+# Module-level names are read as gunicorn settings, so avoid its own "config" name
+try:
+    import config as app_config
+except ImportError:
+    app_config = None
+
+
+def setting(name, default):
+    return os.environ.get(name) or getattr(app_config, name, default)
+
+
+bind = setting("WSGI_BIND", "0.0.0.0:5000")
+workers = int(setting("WSGI_WORKERS", 2))
+# Requests spend most of their time waiting on the upstream site, so use threads per worker
+worker_class = "gthread"
+threads = int(setting("WSGI_THREADS", 8))
+# Must exceed REQUEST_DEADLINE_SECONDS so deadlines, not worker kills, bound slow requests
+timeout = int(setting("WSGI_TIMEOUT", 120))
+graceful_timeout = int(setting("WSGI_GRACEFUL_TIMEOUT", 30))
+preload_app = False
+accesslog = "-"
+
+
+def worker_exit(server, worker):
+    """Stop the worker's background threads and save its cookies before it exits."""
+    from app import cleanup
+    cleanup()
@@ -0,0 +1,251 @@
+"""
+Background jobs for long-range shift retrieval.
+
+A job fetches one date range through the scraper on a bounded pool of worker threads,
+so the API can answer with a job id right away and the client polls for progress and
+the result instead of holding a connection open. At most queue_size jobs wait for a
+worker; finished jobs (and their results) are kept for retention_seconds, at most
+max_retained of them.
+
+With a JobStore (job_store.py) every job is also written to a SQLite file shared by
+the app's worker processes, so a poll that reaches another process still finds the
+job; finished jobs then live only in the store.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+# error_type of jobs whose process stopped before they finished
+INTERRUPTED = "JobInterrupted"
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while queue_size jobs are already waiting."""
+
+
+class Job:
+    """One shift retrieval job: its range, state, progress and (once done) result."""
+
+    def __init__(self, date_from: str, date_to: str, use_cache: bool = True):
+        self.id = uuid.uuid4().hex
+        # Called with the job after each progress update (JobManager persists it)
+        self.on_progress: Optional[Callable[["Job"], None]] = None
+        self.date_from = date_from
+        self.date_to = date_to
+        self.use_cache = use_cache
+        self.status = QUEUED
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        # time.monotonic() when the job finished, for retention
+        self.finished_monotonic: Optional[float] = None
+        self.chunks_done = 0
+        self.chunks_total = 0
+        self.rows = 0
+        self.result: Optional[List[Dict]] = None
+        self.error: Optional[str] = None
+        self.error_type: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def update_progress(self, chunks_done: int, chunks_total: int, rows: int):
+        self.chunks_done = chunks_done
+        self.chunks_total = chunks_total
+        self.rows = rows
+        if self.on_progress:
+            self.on_progress(self)
+
+    def interrupt(self):
+        """Mark a queued or running job failed because its process is stopping (or has stopped)."""
+        self.status = FAILED
+        self.error = "Job interrupted: the server stopped before it finished"
+        self.error_type = INTERRUPTED
+        self.finished_at = datetime.now()
+        self.finished_monotonic = time.monotonic()
+
+    def info(self) -> Dict:
+        """Status and progress of the job (without the result)."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'dateFrom': self.date_from,
+            'dateTo': self.date_to,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'progress': {
+                'chunks_done': self.chunks_done,
+                'chunks_total': self.chunks_total,
+                'rows': self.rows,
+            },
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps finished jobs for retention_seconds."""
+
+    def __init__(self, run: Callable[[Job], List[Dict]], workers: int = 2, queue_size: int = 20,
+                 retention_seconds: float = 3600, max_retained: int = 100, store=None):
+        """
+        Args:
+            run: Performs a job and returns its shifts (reports progress via job.update_progress)
+            workers: Jobs run at the same time
+            queue_size: Jobs allowed to wait for a worker; further submissions raise JobQueueFull
+            retention_seconds: How long finished jobs and their results stay available
+            max_retained: Most finished jobs kept; the oldest are dropped first
+            store: JobStore shared by the app's worker processes (None keeps jobs in this process)
+        """
+        self.run = run
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.retention_seconds = retention_seconds
+        self.max_retained = max(0, max_retained)
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="shift-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.expired = 0
+        # Jobs marked interrupted at shutdown, or left behind by stopped processes (see JobStore)
+        self.interrupted = store.interrupted if store else 0
+
+    def submit(self, date_from: str, date_to: str, use_cache: bool = True) -> Job:
+        """
+        Queue a job for the range and return it (status "queued").
+
+        Raises:
+            JobQueueFull: If every worker is busy and queue_size jobs are already waiting
+        """
+        job = Job(date_from, date_to, use_cache)
+        with self._lock:
+            self._expire_finished()
+            # The new job has to wait only if the queued and running jobs occupy every worker
+            active = sum(1 for active_job in self._jobs.values() if not active_job.done)
+            if active + 1 - self.workers > self.queue_size:
+                self.rejected += 1
+                raise JobQueueFull(f"{self.queue_size} jobs are already queued; try again later")
+            self._jobs[job.id] = job
+            self.submitted += 1
+        if self.store:
+            self.store.save(job)
+            job.on_progress = self.store.save_progress
+        self._executor.submit(self._run_job, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Return the job, or None if it is unknown or its retention has passed. Jobs of other
+        worker processes, and finished jobs, are read from the store if there is one.
+        """
+        with self._lock:
+            self._expire_finished()
+            job = self._jobs.get(job_id)
+        if job is None and self.store:
+            job = self.store.load(job_id)
+        return job
+
+    def _run_job(self, job: Job):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        if self.store:
+            self.store.save_progress(job)
+        try:
+            job.result = self.run(job)
+            job.rows = len(job.result)
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.error("Job %s (%s to %s) failed: %s", job.id, job.date_from, job.date_to, e)
+            job.error = str(e)
+            job.error_type = type(e).__name__
+            job.status = FAILED
+        job.finished_at = datetime.now()
+        job.finished_monotonic = time.monotonic()
+        if self.store:
+            # Saved before the job leaves this process's memory, so no poll misses it
+            self.store.save(job)
+        with self._lock:
+            if job.status == SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            if self.store:
+                # Already gone if shutdown interrupted the job and it has expired since
+                self._jobs.pop(job.id, None)
+
+    def _expire_finished(self):
+        """
+        Drop finished jobs older than retention_seconds, then the oldest finished jobs beyond
+        max_retained (in the store as well, if there is one). Caller must hold _lock.
+        """
+        cutoff = time.monotonic() - self.retention_seconds
+        finished = sorted((job for job in self._jobs.values() if job.finished_monotonic is not None),
+                          key=lambda job: job.finished_monotonic)
+        excess = len(finished) - self.max_retained
+        for i, job in enumerate(finished):
+            if i < excess or job.finished_monotonic < cutoff:
+                del self._jobs[job.id]
+                self.expired += 1
+        if self.store:
+            self.expired += self.store.expire()
+
+    def shutdown(self):
+        """
+        Stop taking jobs. Queued jobs are cancelled and, like running ones, marked failed as
+        interrupted, so polls do not wait for them forever; a running job that still
+        finishes before the process exits records its real outcome.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            unfinished = [job for job in self._jobs.values() if not job.done]
+            for job in unfinished:
+                job.interrupt()
+            self.interrupted += len(unfinished)
+        if self.store:
+            for job in unfinished:
+                self.store.save(job)
+
+    def stats(self) -> Dict:
+        """Return counters for /health."""
+        with self._lock:
+            self._expire_finished()
+            if self.store:
+                by_status = self.store.counts()
+            else:
+                by_status = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+                for job in self._jobs.values():
+                    by_status[job.status] += 1
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'retention_seconds': self.retention_seconds,
+                'max_retained': self.max_retained,
+                'store': self.store.path if self.store else None,
+                'jobs': by_status,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'expired': self.expired,
+                'interrupted': self.interrupted,
+            }
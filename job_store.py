@@ -0,0 +1,206 @@
+"""
+SQLite store of background jobs shared by the app's worker processes.
+
+A job runs in the worker process that accepted it, but under gunicorn the client's polls
+can reach any worker. Every process writes the status, progress and (once done) result
+of its jobs here, so GET /jobs/<job_id> is answered by whichever worker gets it.
+Finished jobs are deleted once retention_seconds have passed, and beyond max_finished
+the oldest finished jobs are deleted first. Each job records the process running it;
+when a store is opened, unfinished jobs of processes that are gone are marked failed
+as interrupted. Unfinished jobs older than stale_after_seconds are deleted as well.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from job_manager import Job, QUEUED, RUNNING, SUCCEEDED, FAILED, INTERRUPTED
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    date_from TEXT NOT NULL,
+    date_to TEXT NOT NULL,
+    use_cache INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    created_epoch REAL,
+    owner_pid INTEGER,
+    started_at TEXT,
+    finished_at TEXT,
+    finished_epoch REAL,
+    chunks_done INTEGER NOT NULL,
+    chunks_total INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    error_type TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_epoch);
+"""
+
+# Columns added after the first version of the table
+_ADDED_COLUMNS = (("created_epoch", "REAL"), ("owner_pid", "INTEGER"))
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _fromisoformat(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """Thread- and process-safe on-disk store of jobs keyed by job id."""
+
+    def __init__(self, path: str, retention_seconds: float = 3600, max_finished: int = 100,
+                 stale_after_seconds: float = 24 * 3600):
+        """
+        Args:
+            path: SQLite database file (created if missing; may be the shift archive file)
+            retention_seconds: How long finished jobs and their results are kept
+            max_finished: Most finished jobs kept (the oldest are deleted first)
+            stale_after_seconds: Unfinished jobs created longer ago are deleted (no job
+                                 runs that long, so their process is gone)
+        """
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.max_finished = max(0, max_finished)
+        self.stale_after_seconds = stale_after_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _ADDED_COLUMNS:
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self.interrupted = self._interrupt_orphans()
+
+    def _interrupt_orphans(self) -> int:
+        """
+        Mark failed the unfinished jobs whose process has exited (e.g. a worker that was
+        killed), so their clients stop polling.
+
+        Returns:
+            Number of jobs marked
+        """
+        with self._lock:
+            orphans = [
+                job_id for job_id, pid in self._conn.execute(
+                    "SELECT id, owner_pid FROM jobs WHERE finished_epoch IS NULL"
+                )
+                if pid == os.getpid() or not _process_alive(pid)
+            ]
+        for job_id in orphans:
+            job = self.load(job_id)
+            if job is not None and not job.done:
+                job.interrupt()
+                self.save(job)
+        if orphans:
+            logger.warning("Job store: %d unfinished job(s) of stopped processes marked %s",
+                           len(orphans), INTERRUPTED)
+        return len(orphans)
+
+    def save(self, job: Job):
+        """Insert or replace every field of job (the result only once it has succeeded)."""
+        result = json.dumps(job.result, ensure_ascii=False) if job.result is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, date_from, date_to, use_cache, created_at, "
+                "created_epoch, owner_pid, started_at, finished_at, finished_epoch, chunks_done, "
+                "chunks_total, rows, result, error, error_type) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.status, job.date_from, job.date_to, int(job.use_cache),
+                 _isoformat(job.created_at), job.created_at.timestamp(), os.getpid(),
+                 _isoformat(job.started_at), _isoformat(job.finished_at),
+                 job.finished_at.timestamp() if job.finished_at else None,
+                 job.chunks_done, job.chunks_total, job.rows, result, job.error, job.error_type),
+            )
+
+    def save_progress(self, job: Job):
+        """Update status and progress of a queued or running job."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, chunks_done = ?, chunks_total = ?, rows = ? "
+                "WHERE id = ?",
+                (job.status, _isoformat(job.started_at), job.chunks_done, job.chunks_total, job.rows, job.id),
+            )
+
+    def load(self, job_id: str) -> Optional[Job]:
+        """Return a snapshot of the job, or None if it is unknown or has been deleted."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, date_from, date_to, use_cache, created_at, started_at, finished_at, "
+                "chunks_done, chunks_total, rows, result, error, error_type FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        (status, date_from, date_to, use_cache, created_at, started_at, finished_at,
+         chunks_done, chunks_total, rows, result, error, error_type) = row
+        job = Job(date_from, date_to, bool(use_cache))
+        job.id = job_id
+        job.status = status
+        job.created_at = _fromisoformat(created_at)
+        job.started_at = _fromisoformat(started_at)
+        job.finished_at = _fromisoformat(finished_at)
+        job.update_progress(chunks_done, chunks_total, rows)
+        job.result = json.loads(result) if result is not None else None
+        job.error = error
+        job.error_type = error_type
+        return job
+
+    def expire(self) -> int:
+        """
+        Delete finished jobs older than retention_seconds and unfinished jobs created more
+        than stale_after_seconds ago, then the oldest finished jobs beyond max_finished.
+
+        Returns:
+            Number of jobs deleted
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_epoch < ? OR (finished_epoch IS NULL AND created_epoch < ?)",
+                (now - self.retention_seconds, now - self.stale_after_seconds),
+            ).rowcount
+            deleted += self._conn.execute(
+                "DELETE FROM jobs WHERE finished_epoch IS NOT NULL AND id NOT IN "
+                "(SELECT id FROM jobs WHERE finished_epoch IS NOT NULL ORDER BY finished_epoch DESC LIMIT ?)",
+                (self.max_finished,),
+            ).rowcount
+        return deleted
+
+    def counts(self) -> Dict[str, int]:
+        """Number of stored jobs per status, across all worker processes."""
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        with self._lock:
+            for status, count in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[status] = count
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
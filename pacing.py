@@ -0,0 +1,177 @@
+"""
+Pacing policies for upstream requests.
+
+The scraper calls pace() before every upstream request. A policy decides how long to
+wait so traffic stays polite to the upstream site.
+
+- "random":       sleep a random delay every time (original human-like behaviour)
+- "token_bucket": shared rate limiter; only waits when the recent request rate
+                  exceeds the configured budget, so idle-time requests go out immediately
+
+A wait that would outlast the caller's deadline is not started: pace() raises
+DeadlineExceeded right away and the reserved slot is given back.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from retry_policy import Deadline, DeadlineExceeded
+
+
+class Pacer:
+    """Base class for pacing policies."""
+
+    name = None
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.delayed = 0
+        self.total_delay_seconds = 0.0
+        self.deadline_rejected = 0
+
+    def pace(self, min_seconds: float = 1.0, max_seconds: float = 3.0, deadline: Optional[Deadline] = None):
+        """
+        Wait (if needed) before an upstream request.
+
+        Args:
+            min_seconds: Lower bound of the human-like delay at this call site
+            max_seconds: Upper bound of the human-like delay at this call site
+            deadline: Deadline of the API request the upstream request belongs to
+
+        Raises:
+            DeadlineExceeded: If the wait would not end before the deadline
+        """
+        delay = self.reserve(min_seconds, max_seconds, deadline)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def pace_async(self, min_seconds: float = 1.0, max_seconds: float = 3.0,
+                         deadline: Optional[Deadline] = None):
+        """Like pace(), but waits with asyncio.sleep so the event loop keeps running."""
+        delay = self.reserve(min_seconds, max_seconds, deadline)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def reserve(self, min_seconds: float, max_seconds: float, deadline: Optional[Deadline] = None) -> float:
+        """
+        Count one upstream request and return the seconds the caller must wait before it.
+
+        Raises:
+            DeadlineExceeded: If the wait would not end before the deadline (the
+                              reservation is refunded and the request is not counted)
+        """
+        delay = self.delay_for(min_seconds, max_seconds)
+        if deadline is not None and delay > 0 and delay >= deadline.remaining():
+            self.refund()
+            with self._stats_lock:
+                self.deadline_rejected += 1
+            raise DeadlineExceeded(
+                f"Deadline of {deadline.seconds:g}s leaves no time for a pacing delay of {delay:.1f}s"
+            )
+        with self._stats_lock:
+            self.requests += 1
+            if delay > 0:
+                self.delayed += 1
+                self.total_delay_seconds += delay
+        return delay
+
+    def delay_for(self, min_seconds: float, max_seconds: float) -> float:
+        """Return the number of seconds to wait before this request."""
+        raise NotImplementedError
+
+    def refund(self):
+        """Give back a reservation made by delay_for() whose request will not be sent."""
+
+    def stats(self) -> Dict:
+        """Return counters for /health."""
+        with self._stats_lock:
+            return {
+                'policy': self.name,
+                'requests': self.requests,
+                'delayed': self.delayed,
+                'total_delay_seconds': round(self.total_delay_seconds, 2),
+                'deadline_rejected': self.deadline_rejected,
+            }
+
+
+class RandomDelayPacer(Pacer):
+    """Sleep a uniformly random delay between min_seconds and max_seconds before every request."""
+
+    name = "random"
+
+    def delay_for(self, min_seconds: float, max_seconds: float) -> float:
+        return random.uniform(min_seconds, max_seconds)
+
+
+class TokenBucketPacer(Pacer):
+    """
+    Token bucket shared by all sessions: up to burst requests go out immediately, after
+    which requests are spaced at rate_per_second. Waiting callers reserve their token
+    up front, so concurrent callers queue in arrival order instead of all waking at once.
+    The per-call-site min/max delays are ignored.
+    """
+
+    name = "token_bucket"
+
+    def __init__(self, rate_per_second: float = 0.5, burst: int = 5):
+        """
+        Args:
+            rate_per_second: Sustained upstream request budget
+            burst: Requests allowed back-to-back after an idle period
+        """
+        super().__init__()
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def delay_for(self, min_seconds: float, max_seconds: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    def refund(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def stats(self) -> Dict:
+        info = super().stats()
+        with self._lock:
+            info.update({
+                'rate_per_second': self.rate_per_second,
+                'burst': self.burst,
+                'tokens': round(self._tokens, 2),
+            })
+        return info
+
+
+PACING_POLICIES = {
+    RandomDelayPacer.name: RandomDelayPacer,
+    TokenBucketPacer.name: TokenBucketPacer,
+}
+
+
+def get_pacer(policy: str, rate_per_second: float = 0.5, burst: int = 5) -> Pacer:
+    """
+    Return a pacer for the given policy name ("random" or "token_bucket").
+
+    Raises:
+        ValueError: If the policy name is unknown
+    """
+    if policy == TokenBucketPacer.name:
+        return TokenBucketPacer(rate_per_second=rate_per_second, burst=burst)
+    if policy == RandomDelayPacer.name:
+        return RandomDelayPacer()
+    raise ValueError(f"Unknown pacing policy {policy!r}; expected one of {', '.join(PACING_POLICIES)}")
@@ -0,0 +1,380 @@
+"""
+HTML parsing backends for the Vinnustund timesheet page.
+
+Both backends locate the shifts table (class 'clsTableControl') and turn its rows
+into shift dictionaries. The row-to-dict mapping lives in ShiftParser, so every
+backend produces identical output; backends only supply tree navigation.
+
+- "bs4":  BeautifulSoup with the pure-Python html.parser (original behaviour)
+- "lxml": lxml.html with XPath lookups; much faster on large multi-month responses
+"""
+
+import logging
+from typing import Dict, Iterator, List, Optional, Any
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Strings inside these elements are not part of BeautifulSoup's get_text() output
+# (Script, Stylesheet, TemplateString, Ruby*String), so the lxml backend skips them too.
+_NON_TEXT_TAGS = frozenset(("script", "style", "template", "rt", "rp"))
+
+
+class ShiftParser:
+    """
+    Base class for timesheet parsers.
+    Subclasses implement the tree primitives (find_tables, table_rows, ...);
+    table selection and shift extraction are shared.
+    """
+
+    name = None
+
+    def parse_shifts(self, html: str) -> List[Dict]:
+        """
+        Parse a timesheet response and return its shifts.
+
+        Args:
+            html: Response body of the timesheet POST
+
+        Returns:
+            List of shift dictionaries (empty if no shifts table is present)
+        """
+        return list(self.iter_shifts(html))
+
+    def iter_shifts(self, html: str) -> Iterator[Dict]:
+        """
+        Parse a timesheet response and yield its shifts one row at a time, so callers can
+        stream them without holding the whole list (see parse_shifts).
+        """
+        rows = self.select_rows(self.find_tables(html))
+        return self.iter_table(rows)
+
+    def select_rows(self, tables: List[Any]) -> List[Any]:
+        """
+        Pick the data table: the one with the most rows (tbody rows if it has a tbody).
+        Each table is walked once; its rows are returned so parse_table need not walk it again.
+
+        Args:
+            tables: Candidate 'clsTableControl' tables
+
+        Returns:
+            Row elements of the selected table (empty if there are no tables)
+        """
+        selected = []
+        for i, tbl in enumerate(tables, 1):
+            rows = self.table_rows(tbl)
+            logger.debug("  Table %d: %d rows found", i, len(rows))
+            if len(rows) > len(selected):
+                selected = rows
+                logger.debug("  → Using table %d with %d rows", i, len(rows))
+        return selected
+
+    def parse_table(self, rows: List[Any]) -> List[Dict]:
+        """
+        Parse the rows of the shifts table and extract shift information.
+
+        Args:
+            rows: Row elements of the selected table (see select_rows)
+
+        Returns:
+            List of shift dictionaries
+        """
+        return list(self.iter_table(rows))
+
+    def iter_table(self, rows: List[Any]) -> Iterator[Dict]:
+        """
+        Yield the shifts of the shifts table as its rows are parsed (see parse_table).
+        Header rows, total/summary rows and rows with fewer than 3 columns are skipped.
+
+        Args:
+            rows: Row elements of the selected table (see select_rows)
+        """
+        parsed = 0
+        data_rows = 0
+
+        for i, row in enumerate(rows, 1):
+            # Check if this is a data row (not a header row)
+            if self.has_header_cell(row):
+                continue
+
+            # Check if this is a total/summary row
+            row_text = self.text(row)
+            if 'Total' in row_text or 'total' in row_text.lower():
+                continue
+
+            # Check if row has meaningful data (has date column)
+            tds = self.row_cells(row)
+            if len(tds) < 3:
+                logger.debug(f"  Row {i}: Skipped - only {len(tds)} columns")
+                continue
+
+            # Cells already collected and header rows already skipped
+            data_rows += 1
+            shift = self.parse_shift_row(row, tds)
+            if shift:
+                parsed += 1
+                logger.debug(f"  Parsed shift {parsed}")
+                yield shift
+            else:
+                logger.debug(f"  Row {i}: Failed to parse")
+
+        if rows:
+            logger.info(f"Successfully parsed {parsed} shifts from {data_rows} data rows")
+
+    def parse_shift_row(self, row: Any, tds: Optional[List[Any]] = None) -> Optional[Dict]:
+        """
+        Parse a single shift row from the table.
+
+        Table structure (based on HTML analysis):
+        0: Day of week (Vikudagur)
+        1: Date
+        2-3: Work Hours (colspan 2)
+        4: Note
+        5: Clock-in
+        6: Time entered
+        7: Calculation method
+        8: Total hours
+        9: Absence/Supplement
+        10: Hours/Units
+        11: Remark
+        12: Status Shift (S)
+        13: Status Time (T)
+        14-18: Pay elements (5 columns)
+        19: Detail link
+
+        Args:
+            row: Table row element of this backend
+            tds: Cells of row when the caller has already collected them and checked
+                 that the row is not a header row
+
+        Returns:
+            Dictionary with shift data or None if invalid
+        """
+        if tds is None:
+            tds = self.row_cells(row)
+            # Skip if this looks like a header or summary row
+            if self.has_header_cell(row):
+                return None
+
+        # Need at least day, date, and some basic info
+        if len(tds) < 3:
+            return None
+
+        try:
+            shift = {}
+
+            # Column 0: Day of week
+            day_of_week = self.text(tds[0], strip=True)
+            if not day_of_week or day_of_week in ['', '&nbsp;']:
+                return None  # Skip empty rows
+            shift['dayOfWeek'] = day_of_week
+
+            # Column 1: Date
+            if len(tds) > 1:
+                shift['date'] = self.text(tds[1], strip=True)
+
+            # Columns 2-3: Work Hours (colspan 2, but we get both)
+            if len(tds) > 2:
+                shift['workHours'] = self.text(tds[2], strip=True)
+                # Also check if there's a link or additional info in column 3
+                if len(tds) > 3:
+                    work_hours_extra = self.text(tds[3], strip=True)
+                    if work_hours_extra:
+                        shift['workHoursExtra'] = work_hours_extra
+
+            # Columns 4-13: plain text columns
+            for index, key in (
+                (4, 'note'),
+                (5, 'clockIn'),
+                (6, 'timeEntered'),
+                (7, 'calculationMethod'),
+                (8, 'totalHours'),
+                (9, 'absenceSupplement'),
+                (10, 'hoursUnits'),
+                (11, 'remark'),
+                (12, 'statusShift'),
+                (13, 'statusTime'),
+            ):
+                if len(tds) > index:
+                    shift[key] = self.text(tds[index], strip=True)
+
+            # Columns 14-18: Pay elements (5 columns)
+            pay_elements = []
+            if len(tds) > 14:
+                for i in range(14, min(19, len(tds))):
+                    pay_text = self.text(tds[i], strip=True)
+                    if pay_text and pay_text not in ['', '&nbsp;']:
+                        pay_elements.append(pay_text)
+            shift['payElements'] = pay_elements
+
+            # Look for links in time entered column and status titles
+            for index, tag, key in (
+                (6, 'a', 'timeEnteredTitle'),
+                (12, 'span', 'statusShiftTitle'),
+                (13, 'span', 'statusTimeTitle'),
+            ):
+                if len(tds) > index:
+                    title = self.child_title(tds[index], tag)
+                    if title:
+                        shift[key] = title
+
+            # Get full row text for debugging
+            shift['rawText'] = self.text(row, separator=' | ', strip=True)
+
+            return shift
+
+        except Exception as e:
+            logger.warning(f"Error parsing row: {str(e)}")
+            return None
+
+    # Tree primitives implemented by each backend
+
+    def find_tables(self, html: str) -> List[Any]:
+        """Return all tables with class 'clsTableControl', in document order."""
+        raise NotImplementedError
+
+    def table_rows(self, table: Any) -> List[Any]:
+        """Return the tr elements of the first tbody, or of the whole table if it has none."""
+        raise NotImplementedError
+
+    def row_cells(self, row: Any) -> List[Any]:
+        """Return every td element below row."""
+        raise NotImplementedError
+
+    def has_header_cell(self, row: Any) -> bool:
+        """Return True if row contains a td with class 'vrTableHeader'."""
+        raise NotImplementedError
+
+    def text(self, node: Any, separator: str = '', strip: bool = False) -> str:
+        """Return the text of node with BeautifulSoup get_text() semantics."""
+        raise NotImplementedError
+
+    def child_title(self, node: Any, tag: str) -> Optional[str]:
+        """Return the title attribute of the first tag element below node, if any."""
+        raise NotImplementedError
+
+
+class Bs4ShiftParser(ShiftParser):
+    """BeautifulSoup + html.parser backend."""
+
+    name = "bs4"
+
+    def find_tables(self, html: str) -> List[Any]:
+        soup = BeautifulSoup(html, 'html.parser')
+        return soup.find_all('table', class_='clsTableControl')
+
+    def table_rows(self, table: Any) -> List[Any]:
+        tbody = table.find('tbody')
+        if tbody:
+            return tbody.find_all('tr')
+        return table.find_all('tr')
+
+    def row_cells(self, row: Any) -> List[Any]:
+        return row.find_all('td')
+
+    def has_header_cell(self, row: Any) -> bool:
+        return row.find('td', class_='vrTableHeader') is not None
+
+    def text(self, node: Any, separator: str = '', strip: bool = False) -> str:
+        return node.get_text(separator=separator, strip=strip)
+
+    def child_title(self, node: Any, tag: str) -> Optional[str]:
+        child = node.find(tag)
+        if child:
+            return child.get('title')
+        return None
+
+
+class LxmlShiftParser(ShiftParser):
+    """
+    lxml.html backend using XPath lookups.
+    Output matches Bs4ShiftParser for well-formed markup; for badly nested HTML the
+    two parsers may repair the tree differently.
+    """
+
+    name = "lxml"
+
+    _TABLES_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' clsTableControl ')]"
+    _HEADER_CELL_XPATH = ".//td[contains(concat(' ', normalize-space(@class), ' '), ' vrTableHeader ')]"
+
+    def __init__(self):
+        import lxml.html
+        self._lxml_html = lxml.html
+
+    def find_tables(self, html: str) -> List[Any]:
+        if not html or not html.strip():
+            return []
+        try:
+            document = self._lxml_html.document_fromstring(html)
+        except ValueError:
+            # str input with an XML encoding declaration is rejected; parse the bytes instead
+            parser = self._lxml_html.HTMLParser(encoding='utf-8')
+            document = self._lxml_html.document_fromstring(html.encode('utf-8'), parser=parser)
+        return document.xpath(self._TABLES_XPATH)
+
+    def table_rows(self, table: Any) -> List[Any]:
+        tbody = table.xpath('.//tbody')
+        if tbody:
+            return tbody[0].xpath('.//tr')
+        return table.xpath('.//tr')
+
+    def row_cells(self, row: Any) -> List[Any]:
+        return row.xpath('.//td')
+
+    def has_header_cell(self, row: Any) -> bool:
+        return bool(row.xpath(self._HEADER_CELL_XPATH))
+
+    def text(self, node: Any, separator: str = '', strip: bool = False) -> str:
+        strings = self._iter_strings(node)
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+    def child_title(self, node: Any, tag: str) -> Optional[str]:
+        children = node.xpath('.//' + tag)
+        if children:
+            return children[0].get('title')
+        return None
+
+    def _iter_strings(self, node: Any):
+        """Yield text nodes below node in document order, skipping comments and script-like content."""
+        if not isinstance(node.tag, str) or node.tag in _NON_TEXT_TAGS:
+            return
+        if node.text:
+            yield node.text
+        for child in node:
+            yield from self._iter_strings(child)
+            if child.tail:
+                yield child.tail
+
+
+PARSER_BACKENDS = {
+    Bs4ShiftParser.name: Bs4ShiftParser,
+    LxmlShiftParser.name: LxmlShiftParser,
+}
+
+
+def get_parser(backend: str) -> ShiftParser:
+    """
+    Return a parser instance for the given backend name ("bs4" or "lxml").
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    try:
+        return PARSER_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser backend {backend!r}; expected one of {', '.join(PARSER_BACKENDS)}"
+        )
+
+
+def parse_shifts_bytes(backend: str, content: bytes, encoding: str = "utf-8") -> List[Dict]:
+    """
+    Decode a timesheet response body and parse its shifts with the given backend.
+    Module-level so it can run in a ProcessPoolExecutor worker (arguments and result
+    are plain picklable values).
+    """
+    return get_parser(backend).parse_shifts(content.decode(encoding, errors="replace"))
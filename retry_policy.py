@@ -0,0 +1,121 @@
+"""
+Deadlines and a shared retry budget for upstream requests.
+
+_retry_request is the only retry layer (the HTTP adapter does not retry on its own), so
+the number of attempts per call is bounded by max_retries + 1. On top of that:
+
+- A Deadline is created per incoming API request and passed down to every upstream
+  call; per-request timeouts are capped to the time left and no retry is started
+  that could not finish before the deadline.
+- The RetryBudget caps retries to a ratio of calls across all threads, so retries
+  cannot multiply traffic while the upstream site is down.
+"""
+
+import threading
+import time
+from typing import Dict
+
+import requests
+
+# Status codes retried like connection errors (the former urllib3 Retry status_forcelist)
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an API request runs out of time before its upstream work is done."""
+
+
+class Deadline:
+    """Point in time (monotonic clock) by which an API request must be answered."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, what: str = "the upstream request"):
+        """
+        Raises:
+            DeadlineExceeded: If the deadline has passed
+        """
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded before {what}")
+
+    def cap(self, timeout: float) -> float:
+        """Return timeout shortened to the time left (raises DeadlineExceeded if none is left)."""
+        self.check()
+        return min(timeout, self.remaining())
+
+
+def retry_after_seconds(response: requests.Response) -> float:
+    """Return the Retry-After header of a 429/503 response in seconds (0 if absent or a date)."""
+    value = response.headers.get('Retry-After', '')
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return 0.0
+
+
+class RetryBudget:
+    """
+    Token bucket of retries shared by all upstream calls: every call deposits ratio
+    tokens and every retry spends one, so at most about ratio retries are made per call
+    over time (plus min_tokens for low-traffic periods).
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: int = 10):
+        """
+        Args:
+            ratio: Retries allowed per upstream call
+            min_tokens: Retries available when the service starts (also the minimum bucket size)
+        """
+        self.ratio = ratio
+        self.max_tokens = float(max(min_tokens, 1))
+        self._tokens = float(min_tokens)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.retries_denied = 0
+        self.deadline_exceeded = 0
+        self.attempts: Dict[int, int] = {}
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False if the budget is spent."""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.retries_denied += 1
+            return False
+
+    def record_deadline_exceeded(self):
+        with self._lock:
+            self.deadline_exceeded += 1
+
+    def record_attempts(self, attempts: int):
+        with self._lock:
+            self.attempts[attempts] = self.attempts.get(attempts, 0) + 1
+
+    def stats(self) -> Dict:
+        """Return counters for /health (attempts maps attempts per call to number of calls)."""
+        with self._lock:
+            return {
+                'ratio': self.ratio,
+                'tokens': round(self._tokens, 2),
+                'calls': self.calls,
+                'retries': self.retries,
+                'retries_denied': self.retries_denied,
+                'deadline_exceeded': self.deadline_exceeded,
+                'attempts': {str(n): count for n, count in sorted(self.attempts.items())},
+            }
@@ -2,16 +2,50 @@ import requests
 from bs4 import BeautifulSoup
 import time
 import logging
-from typing import List, Dict, Optional, Callable, Any
+from typing import List, Dict, Iterator, Optional, Callable, Any, Tuple
 import random
 import threading
-from datetime import datetime, timedelta
+from collections import deque
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 from http.cookiejar import Cookie
 from requests.exceptions import ConnectionError, Timeout, RequestException
 from urllib3.exceptions import ProtocolError
 
+from parsers import get_parser, parse_shifts_bytes
+from shift_cache import (ShiftCache, DateRange, normalize_range, format_date, find_gaps, merge_ranges, pay_period,
+                         split_range, group_by_day, iter_dated, iter_days)
+from shift_archive import ShiftArchive
+from session_pool import SessionPool, PooledSession, SessionLifetimeEstimator
+from pacing import get_pacer
+from cookie_jar import CookieJarFile
+from circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN
+from retry_policy import Deadline, DeadlineExceeded, RetryBudget, RETRY_STATUS_CODES, retry_after_seconds
+
 logger = logging.getLogger(__name__)
 
+KEEP_ALIVE_MODES = ("page", "refresh_shifts")
+
+# Readiness reported by /health and /ready (see start_warm_up)
+NOT_READY = "not_ready"
+WARMING = "warming"
+READY = "ready"
+
+# Browser-like headers sent with every upstream request (CUSTOM_HEADERS override them)
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0',
+}
+
 class VinnustundScraper:
     """
     Scraper for kopavogur.vinnustund.is attendance system.
@@ -31,7 +65,40 @@ class VinnustundScraper:
                  keep_alive_interval: int = 180, enable_keep_alive: bool = True,
                  cookie_expiration_years: int = 70,
                  refresh_automatically: bool = False,
-                 automatic_refresh_period_hours: float = 8):
+                 automatic_refresh_period_hours: float = 8,
+                 parser_backend: str = "bs4",
+                 cache_ttl_seconds: float = 0,
+                 cache_settled_ttl_seconds: float = 7 * 24 * 3600,
+                 cache_max_days: int = 3660,
+                 approved_statuses: tuple = ("S",),
+                 cache_merge_gap_days: int = 3,
+                 archive_path: Optional[str] = None,
+                 archive_sync_interval_seconds: float = 3600,
+                 archive_sync_recent_days: int = 14,
+                 archive_sync_pay_periods: int = 2,
+                 pool_size: int = 1,
+                 session_checkout_timeout: Optional[float] = 120,
+                 pacing_policy: str = "random",
+                 pacing_rate_per_second: float = 0.5,
+                 pacing_burst: int = 5,
+                 retry_budget_ratio: float = 0.2,
+                 circuit_failure_rate_threshold: float = 0.5,
+                 circuit_window_size: int = 20,
+                 circuit_min_calls: int = 5,
+                 circuit_slow_call_seconds: float = 20,
+                 circuit_open_seconds: float = 60,
+                 cookie_jar_path: Optional[str] = None,
+                 proactive_relogin: bool = False,
+                 proactive_relogin_margin_seconds: float = 300,
+                 keep_alive_mode: str = "page",
+                 pay_period_start_day: int = 1,
+                 fetch_chunk_days: int = 0,
+                 fetch_concurrency: Optional[int] = None,
+                 parse_processes: int = 0,
+                 parse_process_min_bytes: int = 256 * 1024,
+                 base_url: Optional[str] = None,
+                 background_tasks: bool = True,
+                 shared_tasks: bool = True):
         """
         Initialize the scraper with optional credentials for login-based session.
         
@@ -44,8 +111,56 @@ class VinnustundScraper:
             cookie_expiration_years: Number of years to extend cookie expiration (default: 70)
             refresh_automatically: If True, relogin every automatic_refresh_period_hours
             automatic_refresh_period_hours: Hours between automatic relogin (only if refresh_automatically)
+            parser_backend: HTML parser for timesheet responses, "bs4" or "lxml" (default: "bs4")
+            cache_ttl_seconds: Seconds to cache shifts per calendar day; 0 disables (default: 0)
+            cache_settled_ttl_seconds: Cache lifetime for past days whose shifts are all approved (default: 7 days)
+            cache_max_days: Maximum number of cached days (default: 3660)
+            approved_statuses: Status codes that mark a shift as approved (default: ("S",))
+            cache_merge_gap_days: Missing intervals at most this many cached days apart are fetched
+                                  in one request (default: 3)
+            archive_path: SQLite file for the persistent shift archive; None disables it (default: None)
+            archive_sync_interval_seconds: Seconds between background syncs of recent/unapproved days;
+                                           unsettled days are served from the archive for this long (default: 3600)
+            archive_sync_recent_days: Number of days up to today that every sync refreshes (default: 14)
+            archive_sync_pay_periods: Pay periods (the open one included) whose unsettled days
+                                      every sync refreshes (default: 2)
+            pool_size: Number of independent upstream sessions, each with its own cookie jar (default: 1)
+            session_checkout_timeout: Seconds a request waits for a free session; None waits indefinitely (default: 120)
+            pacing_policy: Delay policy before upstream requests, "random" or "token_bucket" (default: "random")
+            pacing_rate_per_second: Sustained request budget for "token_bucket" (default: 0.5)
+            pacing_burst: Requests allowed back-to-back after idle time for "token_bucket" (default: 5)
+            retry_budget_ratio: Retries allowed per upstream call across all threads (default: 0.2)
+            circuit_failure_rate_threshold: Failure rate of recent upstream attempts that opens the circuit (default: 0.5)
+            circuit_window_size: Number of recent upstream attempts the failure rate is computed over (default: 20)
+            circuit_min_calls: Attempts needed before the circuit can open (default: 5)
+            circuit_slow_call_seconds: Attempts slower than this count as failures (default: 20)
+            circuit_open_seconds: Seconds requests fail fast before a probe request is sent (default: 60)
+            cookie_jar_path: File the session cookies are saved to after each login and restored
+                             from at startup; None disables it (default: None)
+            proactive_relogin: Learn the session lifetime from observed expiries and relogin in the
+                               background before it runs out (default: False)
+            proactive_relogin_margin_seconds: How long before the predicted expiry to relogin (default: 300)
+            keep_alive_mode: "page" visits a random page; "refresh_shifts" re-fetches the current pay
+                             period into the shift cache (default: "page")
+            pay_period_start_day: Day of month pay periods start on, for "refresh_shifts" and for
+                                  settling the days of closed periods (default: 1)
+            fetch_chunk_days: Split upstream fetches longer than this many days into chunks that are
+                              fetched concurrently; 0 disables (default: 0)
+            fetch_concurrency: Maximum chunks fetched at once (default: pool_size)
+            parse_processes: Worker processes for parsing large responses outside the GIL; 0 parses
+                             inline (default: 0)
+            parse_process_min_bytes: Responses smaller than this are parsed inline (default: 256 KiB)
+            base_url: Site root to scrape, e.g. a local stub for benchmarks (default: BASE_URL)
+            background_tasks: Start keep-alive, scheduled refresh, archive sync and proactive relogin
+                              threads now; False defers them to start_background_tasks() (default: True)
+            shared_tasks: Include the tasks on state shared by all app processes (archive sync);
+                          False leaves them to start_shared_tasks(), e.g. for one elected
+                          process only (default: True)
         """
-        self.session = requests.Session()
+        if base_url:
+            self.BASE_URL = base_url.rstrip("/")
+            self.TIMESHEET_URL = f"{self.BASE_URL}/VS_MX/starfsmadur/starfsm_timafaerslur_view.jsp"
+            self.LOGIN_URL = f"{self.BASE_URL}/VS_MX/VSLoginX.jsp"
         self._username = username
         self._password = password
         self.refresh_automatically = refresh_automatically
@@ -53,25 +168,83 @@ class VinnustundScraper:
         self._last_login_at: Optional[datetime] = None
         self._refresh_thread = None
         self._refresh_running = False
-        
-        # Configure connection pooling and retries
-        from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
-        
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"]
+        self.parser = get_parser(parser_backend)
+        # Shared by all pooled sessions
+        self.pacer = get_pacer(pacing_policy, rate_per_second=pacing_rate_per_second, burst=pacing_burst)
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio)
+        self.circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=circuit_failure_rate_threshold,
+            window_size=circuit_window_size,
+            min_calls=circuit_min_calls,
+            slow_call_seconds=circuit_slow_call_seconds,
+            open_seconds=circuit_open_seconds,
         )
-        adapter = HTTPAdapter(
-            max_retries=retry_strategy,
-            pool_connections=10,
-            pool_maxsize=10
+        self.shift_cache = ShiftCache(
+            ttl_seconds=cache_ttl_seconds,
+            settled_ttl_seconds=cache_settled_ttl_seconds,
+            max_days=cache_max_days,
+            approved_statuses=approved_statuses,
+            merge_gap_days=cache_merge_gap_days,
+            pay_period_start_day=pay_period_start_day,
         )
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        self.shift_archive = None
+        if archive_path:
+            self.shift_archive = ShiftArchive(
+                archive_path,
+                max_age_seconds=archive_sync_interval_seconds,
+                approved_statuses=approved_statuses,
+                pay_period_start_day=pay_period_start_day,
+            )
+        self.archive_sync_interval_seconds = archive_sync_interval_seconds
+        self.archive_sync_recent_days = archive_sync_recent_days
+        self.archive_sync_pay_periods = archive_sync_pay_periods
+        self._archive_sync_thread = None
+        self._archive_sync_running = False
+        # Without start_warm_up the service takes traffic immediately (sessions log in on demand)
+        self.readiness = READY
+        self._warm_up_thread = None
+        self._warm_up_running = False
+        self.session_lifetime = SessionLifetimeEstimator()
+        self.proactive_relogin = proactive_relogin
+        self.proactive_relogin_margin_seconds = proactive_relogin_margin_seconds
+        self.proactive_relogins = 0
+        self._proactive_relogin_thread = None
+        self._proactive_relogin_running = False
         
+        # Single-flight: upstream fetches in progress, keyed by (start, end) date range
+        self._inflight: Dict[Tuple[date, date], Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesced_fetches = 0
+        self.leader_fetches = 0
+        
+        # Chunked fetching of long ranges over the session pool
+        self.fetch_chunk_days = max(0, fetch_chunk_days)
+        self.fetch_concurrency = max(1, fetch_concurrency or pool_size)
+        self._chunk_executor = None
+        if self.fetch_chunk_days and self.fetch_concurrency > 1:
+            self._chunk_executor = ThreadPoolExecutor(max_workers=self.fetch_concurrency,
+                                                      thread_name_prefix="shift-chunk")
+        self._chunk_timings = deque(maxlen=100)
+        self._chunk_lock = threading.Lock()
+        
+        # Large responses are parsed in worker processes so they do not hold this process's GIL
+        self.parse_processes = max(0, parse_processes)
+        self.parse_process_min_bytes = parse_process_min_bytes
+        self._parse_executor = None
+        if self.parse_processes:
+            # Fork the workers now, before any background thread exists ("spawn" would re-run
+            # app.py in every worker); fall back to spawn where fork is unavailable
+            start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            self._parse_executor = ProcessPoolExecutor(max_workers=self.parse_processes,
+                                                       mp_context=multiprocessing.get_context(start_method))
+            self._parse_executor.submit(int).result()
+        self.parsed_inline = 0
+        self.parsed_in_process = 0
+        
+        if keep_alive_mode not in KEEP_ALIVE_MODES:
+            raise ValueError(f"Unknown keep-alive mode {keep_alive_mode!r}; expected one of {', '.join(KEEP_ALIVE_MODES)}")
+        self.keep_alive_mode = keep_alive_mode
+        self.pay_period_start_day = pay_period_start_day
         self.keep_alive_interval = keep_alive_interval
         self.enable_keep_alive = enable_keep_alive
         self.cookie_expiration_years = cookie_expiration_years
@@ -81,39 +254,129 @@ class VinnustundScraper:
         self.last_successful_request = datetime.now()
         self.consecutive_failures = 0
         self._lock = threading.Lock()
+        self.shared_relogins = 0
         
-        self.default_headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0',
-        }
+        self.default_headers = dict(DEFAULT_HEADERS)
         if headers:
             self.default_headers.update(headers)
-        self.session.headers.update(self.default_headers)
+        
+        # Independent sessions checked out per upstream operation; the first is the primary
+        # session used by keep-alive, cookie management and test_authentication
+        self.session_pool = SessionPool(
+            [self._new_session() for _ in range(max(1, pool_size))],
+            checkout_timeout=session_checkout_timeout,
+        )
+        
+        # Reuse the sessions of the previous process; they are validated on first use
+        self.cookie_jar = CookieJarFile(cookie_jar_path) if cookie_jar_path else None
+        if self.cookie_jar:
+            restored = self.cookie_jar.restore(self.session_pool.slots)
+            if restored:
+                login_times = [slot.last_login_at for slot in self.session_pool.slots if slot.last_login_at]
+                self._last_login_at = max(login_times) if login_times else None
+                logger.info("Restored cookies of %d session(s) from %s", restored, cookie_jar_path)
         
         if not (username and password):
             logger.warning("No USERNAME/PASSWORD in config; login and session refresh disabled")
         
+        if background_tasks:
+            self.start_background_tasks(shared=shared_tasks)
+    
+    def start_background_tasks(self, shared: bool = True):
+        """
+        Start the enabled background threads. Session maintenance (keep-alive, scheduled
+        refresh, proactive relogin) acts on this process's own session pool, so every app
+        process runs it; shared=False leaves the tasks on shared state to start_shared_tasks().
+        """
+        credentials = self._username and self._password
         if self.enable_keep_alive:
             self.start_keep_alive()
-        if self.refresh_automatically and username and password:
+        if self.refresh_automatically and credentials:
             self._start_automatic_refresh()
+        if self.proactive_relogin and credentials:
+            self._start_proactive_relogin()
+        if shared:
+            self.start_shared_tasks()
+    
+    def start_shared_tasks(self):
+        """
+        Start the background threads that act on state shared by all app processes (archive
+        sync of the shift archive file). With several app processes only one should run them.
+        """
+        if self.shift_archive and self._username and self._password:
+            self._start_archive_sync()
+    
+    @property
+    def session(self) -> requests.Session:
+        """The primary pooled session (replaced when it is relogged in proactively)."""
+        return self.session_pool.primary.session
+    
+    def _new_session(self) -> requests.Session:
+        """
+        Create a requests.Session with connection pooling and the default headers.
+        The adapter does not retry: all retries go through _retry_request.
+        """
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            max_retries=0,
+            pool_connections=10,
+            pool_maxsize=10
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self.default_headers)
+        return session
     
-    def _extend_cookie_expiration(self, expiration_years: int = 70):
+    def _send(self, session: requests.Session, method: str, url: str, referer: Optional[str] = None,
+              data: Optional[Dict] = None, timeout: float = 30,
+              deadline: Optional[Deadline] = None) -> requests.Response:
+        """
+        Send one request with its own Referer/Content-Type headers.
+        session.headers is never modified, so a session can be used from several threads.
+        
+        Args:
+            session: Session to send on (supplies cookies and the default headers)
+            method: "GET" or "POST"
+            url: Request URL
+            referer: Referer header for this request (default: session default)
+            data: Form fields; sent urlencoded with Content-Type application/x-www-form-urlencoded
+            timeout: Request timeout in seconds
+            deadline: Deadline of the API request; the timeout is capped to the time left
+        
+        Raises:
+            DeadlineExceeded: If the deadline has already passed, or the request timed out
+                              only because its timeout was capped to the deadline (the
+                              upstream site was not too slow, so this is not a failure)
+        """
+        capped = False
+        if deadline is not None:
+            capped_timeout = deadline.cap(timeout)
+            capped = capped_timeout < timeout
+            timeout = capped_timeout
+        headers = {}
+        if referer:
+            headers['Referer'] = referer
+        if data is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            return session.request(method, url, headers=headers, data=data, timeout=timeout, allow_redirects=True)
+        except Timeout:
+            if capped:
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded during {method} {url}")
+            raise
+    
+    def _extend_cookie_expiration(self, expiration_years: int = 70, session: Optional[requests.Session] = None):
         """
         Extend expiration dates for session cookies (especially JSESSIONID).
         Sets expiration to a far future date (default: 70 years = ~2096).
         
         Args:
             expiration_years: Number of years in the future to set expiration (default: 70)
+            session: Session whose cookies to extend (default: the primary session)
         """
+        session = session or self.session
         try:
             future_date = datetime.now() + timedelta(days=expiration_years * 365)
             future_timestamp = int(future_date.timestamp())
@@ -121,7 +384,7 @@ class VinnustundScraper:
             extended_count = 0
             
             # Get all cookies and update their expiration
-            for cookie in list(self.session.cookies):
+            for cookie in list(session.cookies):
                 try:
                     # Extend expiration for:
                     # 1. JSESSIONID (most important)
@@ -138,7 +401,7 @@ class VinnustundScraper:
                         # Update the cookie's expiration
                         cookie.expires = future_timestamp
                         # Also update the cookie in the jar
-                        self.session.cookies.set_cookie(cookie)
+                        session.cookies.set_cookie(cookie)
                         extended_count += 1
                         logger.debug(f"Extended expiration for cookie: {cookie.name} to {future_date.strftime('%Y-%m-%d')}")
                         
@@ -159,25 +422,124 @@ class VinnustundScraper:
         """
         Log in and obtain a new session. Updates JSESSIONID, sessionPersist, TS01780571 from response.
         Uses instance username/password if arguments not provided.
+        Every pooled session is logged in; logins on the same session are serialized.
+        
+        Returns:
+            True if login succeeded for every session (session has valid cookies), False otherwise.
+        
+        Raises:
+            CircuitOpenError: If the upstream circuit is open (the sessions are left as they are)
+        """
+        success = True
+        for slot in self.session_pool.slots:
+            with self.session_pool.checkout(slot), slot.login_lock:
+                success = self._login_attempt(slot, username, password) and success
+        return success
+    
+    def _relogin(self, slot: PooledSession, observed_generation: int,
+                 deadline: Optional[Deadline] = None, expired: bool = False) -> bool:
+        """
+        Relogin a pooled session after a request found it expired.
+        If another thread has logged it in since observed_generation was read, that login is
+        reused instead, so one expiry causes one relogin regardless of how many requests saw it.
+        
+        Args:
+            slot: The pooled session whose login expired
+            observed_generation: Value of slot.login_generation read before the failed request
+            deadline: Deadline of the API request that needs the session; bounds the wait for
+                      another thread's login as well as the login itself
+            expired: True if the caller got the login page back (a confirmed expiry); only
+                     those are recorded as session lifetimes
         
         Returns:
-            True if login succeeded (session has valid cookies), False otherwise.
+            True if a usable session is available, False otherwise.
+        
+        Raises:
+            DeadlineExceeded: If the deadline passes before the login is done
+            CircuitOpenError: If the upstream circuit is open (the session is left as it is)
+        """
+        if not slot.login_lock.acquire(timeout=deadline.remaining() if deadline else -1):
+            self.retry_budget.record_deadline_exceeded()
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for a relogin")
+        try:
+            if slot.login_generation != observed_generation:
+                self.shared_relogins += 1
+                logger.info("Session already renewed by another request; reusing it")
+                return slot.last_login_ok
+            if expired and slot.last_login_at and len(slot.session.cookies) > 0:
+                lifetime = (datetime.now() - slot.last_login_at).total_seconds()
+                self.session_lifetime.observe(lifetime)
+                logger.info("Session %d expired %.0f s after login", slot.index, lifetime)
+            return self._login_attempt(slot, deadline=deadline)
+        finally:
+            slot.login_lock.release()
+    
+    def _login_attempt(self, slot: PooledSession, username: Optional[str] = None,
+                       password: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """
+        Run one login on a pooled session and advance its login generation. Caller must hold slot.login_lock.
+        A login cut short by the deadline leaves the generation alone, so the next request logs in again;
+        one refused by the open circuit leaves the session untouched.
+        """
+        detail_form_fields, slot.detail_form_fields = slot.detail_form_fields, None
+        try:
+            slot.last_login_ok = self._perform_login(slot, username, password, deadline=deadline)
+        except DeadlineExceeded:
+            slot.healthy = False
+            raise
+        except CircuitOpenError:
+            slot.detail_form_fields = detail_form_fields
+            raise
+        slot.healthy = slot.last_login_ok
+        if slot.last_login_ok:
+            slot.last_login_at = datetime.now()
+        slot.login_generation += 1
+        if slot.last_login_ok:
+            self.save_cookie_jar()
+        return slot.last_login_ok
+    
+    def save_cookie_jar(self):
+        """Write the cookies of all pooled sessions to cookie_jar_path (if configured)."""
+        if not self.cookie_jar:
+            return
+        try:
+            self.cookie_jar.save(self.session_pool.slots)
+        except OSError as e:
+            logger.warning("Could not save cookie jar %s: %s", self.cookie_jar.path, e)
+    
+    def _perform_login(self, slot: PooledSession, username: Optional[str] = None,
+                       password: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
         """
+        Log a pooled session in with the given or configured credentials (see login).
+        Success is verified from the login POST response; if that page carries detail_form,
+        its hidden fields are kept for the next fetch.
+        
+        Raises:
+            DeadlineExceeded: If deadline is given and passes before the login is done
+            CircuitOpenError: If the upstream circuit is open; checked before the session's
+                              cookies are cleared, so an open circuit never logs a session out
+        """
+        session = slot.session
         u = username or self._username
         p = password or self._password
         if not u or not p:
             logger.error("Login failed: no username or password provided")
             return False
         
+        self.circuit_breaker.raise_if_open("logging in")
         try:
             # Clear existing session cookies so we get a fresh session
-            self.session.cookies.clear()
-            self.session.headers["Referer"] = self.BASE_URL
+            session.cookies.clear()
             
             # Step 1: GET login page to obtain form (including "random" hidden field)
             login_get_url = f"{self.LOGIN_URL}?businessgroup={self.BUSINESS_GROUP}"
-            self._add_delay(0.5, 1.5)
-            get_resp = self.session.get(login_get_url, timeout=15)
+            self._add_delay(0.5, 1.5, deadline=deadline)
+            
+            def get_login_page():
+                return self._send(session, "GET", login_get_url, referer=self.BASE_URL, timeout=15,
+                                  deadline=deadline)
+            
+            get_resp = self._retry_request(get_login_page, max_retries=2, base_delay=0.5, deadline=deadline)
             get_resp.raise_for_status()
             
             soup = BeautifulSoup(get_resp.text, "html.parser")
@@ -204,18 +566,16 @@ class VinnustundScraper:
                 post_data["leita"] = "Innskrá"  # submit button value from reference page
             
             # Step 2: POST login
-            self._add_delay(0.5, 1.5)
-            self.session.headers["Referer"] = login_get_url
-            self.session.headers["Content-Type"] = "application/x-www-form-urlencoded"
-            post_resp = self.session.post(
-                self.LOGIN_URL,
-                data=post_data,
-                allow_redirects=True,
-                timeout=15,
-            )
+            self._add_delay(0.5, 1.5, deadline=deadline)
+            
+            def post_login():
+                return self._send(session, "POST", self.LOGIN_URL, referer=login_get_url, data=post_data, timeout=15,
+                                  deadline=deadline)
+            
+            post_resp = self._retry_request(post_login, max_retries=2, base_delay=0.5, deadline=deadline)
             post_resp.raise_for_status()
             
-            cookie_names = {c.name for c in self.session.cookies}
+            cookie_names = {c.name for c in session.cookies}
             has_session_cookies = any(name in cookie_names for name in self.SESSION_COOKIE_NAMES)
             # Response body contains the login form = login failed (wrong credentials or validation)
             body_has_login_form = (
@@ -228,29 +588,41 @@ class VinnustundScraper:
             if body_has_login_form:
                 logger.error("Login failed: wrong credentials (check USERNAME/PASSWORD)")
                 return False
-            try:
-                check_resp = self.session.get(self.TIMESHEET_URL + "?sj=true", timeout=10)
-                if not self._check_session_valid(check_resp):
-                    logger.error("Login failed: session not authenticated")
-                    return False
-            except Exception as check_e:
-                logger.debug("Login verify request failed: %s", check_e)
+            # Session cookies plus a response that is not the login form verify the login;
+            # no separate request is needed
+            if 'detail_form' in post_resp.text:
+                form = BeautifulSoup(post_resp.text, "html.parser").find('form', {'name': 'detail_form'})
+                if form:
+                    slot.detail_form_fields = self._hidden_form_fields(form)
             
             for name in self.SESSION_COOKIE_NAMES:
                 if name not in cookie_names:
                     logger.debug("Login: cookie %s not in session", name)
             
-            self._extend_cookie_expiration(self.cookie_expiration_years)
+            self._extend_cookie_expiration(self.cookie_expiration_years, session)
             with self._lock:
                 self._last_login_at = datetime.now()
                 self.last_successful_request = datetime.now()
                 self.consecutive_failures = 0
             logger.info("Login successful")
             return True
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error("Login failed: %s", e)
             return False
     
+    @staticmethod
+    def _hidden_form_fields(form) -> Dict[str, str]:
+        """Return the name/value pairs of the hidden inputs of a parsed form."""
+        hidden_inputs = {}
+        for input_field in form.find_all('input', type='hidden'):
+            name = input_field.get('name')
+            value = input_field.get('value', '')
+            if name:
+                hidden_inputs[name] = value
+        return hidden_inputs
+    
     def _start_automatic_refresh(self):
         """Start background thread that relogins every automatic_refresh_period_hours."""
         if self._refresh_thread and self._refresh_thread.is_alive():
@@ -269,13 +641,194 @@ class VinnustundScraper:
             if not (self._username and self._password):
                 continue
             logger.info("Scheduled relogin (every %.1f h)", self.automatic_refresh_period_hours)
-            self.login()
+            try:
+                self.login()
+            except CircuitOpenError as e:
+                logger.warning("Scheduled relogin skipped: %s", e)
     
     def _stop_automatic_refresh(self):
         self._refresh_running = False
         if self._refresh_thread:
             self._refresh_thread.join(timeout=5)
     
+    def _start_archive_sync(self):
+        """Start background thread that refreshes recent and unapproved days in the shift archive."""
+        if self._archive_sync_thread and self._archive_sync_thread.is_alive():
+            return
+        self._archive_sync_running = True
+        self._archive_sync_thread = threading.Thread(target=self._archive_sync_worker, daemon=True)
+        self._archive_sync_thread.start()
+        logger.info("Archive sync: every %.0f s", self.archive_sync_interval_seconds)
+    
+    def _archive_sync_worker(self):
+        interval_seconds = max(60, self.archive_sync_interval_seconds)
+        while self._archive_sync_running:
+            try:
+                self.sync_archive()
+            except Exception as e:
+                logger.warning("Archive sync failed: %s", e)
+            deadline = time.time() + interval_seconds
+            while self._archive_sync_running and time.time() < deadline:
+                time.sleep(1)
+    
+    def _stop_archive_sync(self):
+        self._archive_sync_running = False
+        if self._archive_sync_thread:
+            self._archive_sync_thread.join(timeout=5)
+    
+    def _start_proactive_relogin(self):
+        """Start background thread that relogins sessions shortly before their predicted expiry."""
+        if self._proactive_relogin_thread and self._proactive_relogin_thread.is_alive():
+            return
+        self._proactive_relogin_running = True
+        self._proactive_relogin_thread = threading.Thread(target=self._proactive_relogin_worker, daemon=True)
+        self._proactive_relogin_thread.start()
+    
+    def _proactive_relogin_worker(self):
+        while self._proactive_relogin_running:
+            lifetime = self.session_lifetime.predicted()
+            if lifetime is not None:
+                relogin_after = max(60, lifetime - self.proactive_relogin_margin_seconds)
+                for slot in self.session_pool.slots:
+                    if not self._proactive_relogin_running:
+                        break
+                    if slot.last_login_at and (datetime.now() - slot.last_login_at).total_seconds() >= relogin_after:
+                        try:
+                            self._swap_in_new_session(slot)
+                        except Exception as e:
+                            logger.warning("Proactive relogin of session %d failed: %s", slot.index, e)
+            deadline = time.time() + 30
+            while self._proactive_relogin_running and time.time() < deadline:
+                time.sleep(1)
+    
+    def _stop_proactive_relogin(self):
+        self._proactive_relogin_running = False
+        if self._proactive_relogin_thread:
+            self._proactive_relogin_thread.join(timeout=5)
+    
+    def _swap_in_new_session(self, slot: PooledSession) -> bool:
+        """
+        Log a fresh requests.Session in next to the pooled one, then swap it into the slot.
+        Requests in progress finish on the old session; later ones get the new one.
+        """
+        candidate = PooledSession(slot.index, self._new_session())
+        if not self._perform_login(candidate):
+            return False
+        with self.session_pool.checkout(slot), slot.login_lock:
+            old_session = slot.session
+            slot.session = candidate.session
+            slot.detail_form_fields = candidate.detail_form_fields
+            slot.last_login_ok = True
+            slot.healthy = True
+            slot.last_login_at = datetime.now()
+            slot.login_generation += 1
+        old_session.close()
+        with self._lock:
+            self.proactive_relogins += 1
+        logger.info("Session %d relogged in ahead of predicted expiry", slot.index)
+        self.save_cookie_jar()
+        return True
+    
+    def start_warm_up(self):
+        """
+        Log in and prime every pooled session on a background thread. readiness is
+        "warming" until at least one session is ready; failed warm-ups are retried.
+        """
+        if self._warm_up_thread and self._warm_up_thread.is_alive():
+            return
+        self.readiness = WARMING
+        self._warm_up_running = True
+        self._warm_up_thread = threading.Thread(target=self._warm_up_worker, daemon=True)
+        self._warm_up_thread.start()
+    
+    def _warm_up_worker(self):
+        retry_seconds = 5
+        while self._warm_up_running:
+            if self.warm_up():
+                break
+            logger.warning("Warm-up failed; retrying in %d s", retry_seconds)
+            deadline = time.time() + retry_seconds
+            while self._warm_up_running and time.time() < deadline:
+                time.sleep(1)
+            retry_seconds = min(retry_seconds * 2, 300)
+        self._warm_up_running = False
+    
+    def _stop_warm_up(self):
+        self._warm_up_running = False
+        if self._warm_up_thread:
+            self._warm_up_thread.join(timeout=5)
+    
+    def warm_up(self) -> bool:
+        """
+        Make every pooled session ready for a fetch: logged in (restored cookies are
+        checked) and with detail_form hidden fields cached.
+        
+        Returns:
+            True if at least one session is ready (readiness becomes "ready" as soon as
+            the first one is, while the others are still warming up)
+        """
+        self.readiness = WARMING
+        warm = 0
+        for slot in self.session_pool.slots:
+            try:
+                with self.session_pool.checkout(slot):
+                    if self._warm_up_session(slot):
+                        warm += 1
+                        self.readiness = READY
+            except Exception as e:
+                logger.warning("Warm-up of session %d failed: %s", slot.index, e)
+        logger.info("Warm-up: %d of %d session(s) ready", warm, len(self.session_pool.slots))
+        if not warm:
+            self.readiness = NOT_READY
+        return warm > 0
+    
+    def _warm_up_session(self, slot: PooledSession) -> bool:
+        """Log a checked-out session in if needed and cache its detail_form hidden fields."""
+        if not self._ensure_session_valid(slot):
+            return False
+        if slot.detail_form_fields is not None:
+            return True
+        login_generation = slot.login_generation
+        
+        def get_timesheet():
+            return self._send(slot.session, "GET", self.TIMESHEET_URL + "?sj=true", referer=self.BASE_URL, timeout=30)
+        
+        self._add_delay(0.5, 1.5)
+        response = self._retry_request(get_timesheet, max_retries=2, base_delay=1.0)
+        if not self._check_session_valid(response):
+            # Restored cookies had expired
+            if not self._relogin(slot, login_generation, expired=True):
+                return False
+            if slot.detail_form_fields is not None:
+                return True
+            self._add_delay(0.5, 1.5)
+            response = self._retry_request(get_timesheet, max_retries=2, base_delay=1.0)
+        form = BeautifulSoup(response.text, 'html.parser').find('form', {'name': 'detail_form'})
+        if response.status_code != 200 or not form:
+            return False
+        slot.detail_form_fields = self._hidden_form_fields(form)
+        slot.healthy = True
+        return True
+    
+    def sync_archive(self) -> int:
+        """
+        Refresh the days of the shift archive that may still change upstream
+        (the last archive_sync_recent_days days and the unsettled days of the last
+        archive_sync_pay_periods pay periods).
+        
+        Returns:
+            Number of days refreshed
+        """
+        if not self.shift_archive:
+            return 0
+        refreshed = 0
+        for start, end in self.shift_archive.days_to_sync(self.archive_sync_recent_days,
+                                                             self.archive_sync_pay_periods):
+            self._fetch_days(start, end)
+            refreshed += (end - start).days + 1
+        logger.info("Archive sync: refreshed %d day(s)", refreshed)
+        return refreshed
+    
     def set_cookies(self, cookies: Dict[str, str]):
         """Update cookies in the session and extend their expiration"""
         self.session.cookies.update(cookies)
@@ -318,16 +871,22 @@ class VinnustundScraper:
         
         return info
     
-    def _add_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
-        """Add random delay to simulate human behavior"""
-        delay = random.uniform(min_seconds, max_seconds)
-        time.sleep(delay)
+    def _add_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0, deadline: Optional[Deadline] = None):
+        """
+        Wait before an upstream request as decided by the pacing policy (random delay by default).
+        Raises DeadlineExceeded instead of waiting past the deadline.
+        """
+        self.pacer.pace(min_seconds, max_seconds, deadline)
     
     def _retry_request(self, request_func: Callable, max_retries: int = 3, 
                       base_delay: float = 1.0, max_delay: float = 10.0,
-                      retryable_exceptions: tuple = (ConnectionError, Timeout, ProtocolError, RequestException)) -> Any:
+                      retryable_exceptions: tuple = (ConnectionError, Timeout, ProtocolError, RequestException),
+                      deadline: Optional[Deadline] = None) -> Any:
         """
-        Retry a request function with exponential backoff on connection errors.
+        Retry a request function with exponential backoff on connection errors and on
+        retryable status codes (429/5xx). This is the only retry layer; a retry is only
+        made if it fits before the deadline and the shared retry budget allows it.
+        Every attempt passes through (and is recorded by) the circuit breaker.
         
         Args:
             request_func: Function that performs the request (should return response)
@@ -335,55 +894,85 @@ class VinnustundScraper:
             base_delay: Base delay in seconds for exponential backoff (default: 1.0)
             max_delay: Maximum delay in seconds (default: 10.0)
             retryable_exceptions: Tuple of exceptions that should trigger retry
+            deadline: Deadline of the API request this call belongs to
         
         Returns:
-            Response from request_func
+            Response from request_func (the last one if retries of a retryable status ran out)
         
         Raises:
+            DeadlineExceeded: If the deadline passed or leaves no time for the next attempt
+            CircuitOpenError: If the circuit breaker rejects an attempt
             Exception: If all retries fail
         """
-        last_exception = None
-        
-        for attempt in range(max_retries + 1):
-            try:
-                response = request_func()
-                # If we got a response, update success tracking
-                with self._lock:
-                    self.last_successful_request = datetime.now()
-                    self.consecutive_failures = 0
-                return response
+        self.retry_budget.record_call()
+        attempts = 0
+        try:
+            while True:
+                if deadline is not None:
+                    deadline.check()
+                self.circuit_breaker.before_request()
+                attempts += 1
+                response = None
+                started = time.monotonic()
+                try:
+                    response = request_func()
+                except DeadlineExceeded:
+                    self.circuit_breaker.release()
+                    self.retry_budget.record_deadline_exceeded()
+                    raise
+                except retryable_exceptions as e:
+                    self.circuit_breaker.record_failure(time.monotonic() - started)
+                    failure = f"{type(e).__name__}: {str(e)}"
+                except Exception as e:
+                    # Non-retryable exceptions - raise immediately
+                    self.circuit_breaker.release()
+                    logger.error(f"Non-retryable error: {type(e).__name__}: {str(e)}")
+                    with self._lock:
+                        self.consecutive_failures += 1
+                    raise
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        self.circuit_breaker.record_success(time.monotonic() - started)
+                        # If we got a response, update success tracking
+                        with self._lock:
+                            self.last_successful_request = datetime.now()
+                            self.consecutive_failures = 0
+                        return response
+                    self.circuit_breaker.record_failure(time.monotonic() - started)
+                    failure = f"HTTP {response.status_code}"
                 
-            except retryable_exceptions as e:
-                last_exception = e
+                # Calculate exponential backoff with jitter (at least Retry-After, if sent)
+                delay = min(base_delay * (2 ** (attempts - 1)) + random.uniform(0, 1), max_delay)
+                if response is not None:
+                    delay = max(delay, min(retry_after_seconds(response), max_delay))
                 
-                if attempt < max_retries:
-                    # Calculate exponential backoff with jitter
-                    delay = min(base_delay * (2 ** attempt) + random.uniform(0, 1), max_delay)
+                if attempts > max_retries:
+                    logger.error(f"All {attempts} attempts failed ({failure})")
+                elif deadline is not None and deadline.remaining() <= delay:
+                    self.retry_budget.record_deadline_exceeded()
+                    raise DeadlineExceeded(
+                        f"Deadline of {deadline.seconds:g}s leaves no time to retry after attempt {attempts} ({failure})"
+                    )
+                elif not self.retry_budget.try_spend():
+                    logger.error(f"Retry budget exhausted; giving up after attempt {attempts} ({failure})")
+                else:
                     logger.warning(
-                        f"Connection error on attempt {attempt + 1}/{max_retries + 1}: {type(e).__name__}. "
-                        f"Retrying in {delay:.2f}s..."
+                        f"{failure} on attempt {attempts}/{max_retries + 1}. Retrying in {delay:.2f}s..."
                     )
                     time.sleep(delay)
-                else:
-                    logger.error(f"All {max_retries + 1} retry attempts failed")
-                    with self._lock:
-                        self.consecutive_failures += 1
-                    raise Exception(f"Connection failed after {max_retries + 1} attempts: {str(e)}")
-            
-            except Exception as e:
-                # Non-retryable exceptions - raise immediately
-                logger.error(f"Non-retryable error: {type(e).__name__}: {str(e)}")
+                    continue
+                
                 with self._lock:
                     self.consecutive_failures += 1
-                raise
-        
-        # Should never reach here, but just in case
-        if last_exception:
-            with self._lock:
-                self.consecutive_failures += 1
-            raise Exception(f"Request failed: {str(last_exception)}")
+                if response is not None:
+                    return response
+                raise Exception(f"Connection failed after {attempts} attempts: {failure}")
+        finally:
+            if attempts:
+                self.retry_budget.record_attempts(attempts)
     
-    def _check_session_valid(self, response: requests.Response) -> bool:
+    @staticmethod
+    def _check_session_valid(response: requests.Response) -> bool:
         """
         Return False only when the response clearly indicates session expired (login redirect or login form).
         Small responses or sessionError.jsp are not treated as expiry; only definitive login signals are.
@@ -414,11 +1003,71 @@ class VinnustundScraper:
         return True
     
     
-    def _perform_keep_alive_action(self) -> bool:
+    def _perform_keep_alive_action(self, idle_only: bool = False) -> bool:
         """
-        Perform a random keep-alive action to simulate user activity.
+        Perform a keep-alive action on the primary session and on every other logged-in pooled
+        session. In "refresh_shifts" mode the current pay period is refreshed once, and the
+        sessions that refresh did not use visit a page.
+        
+        Args:
+            idle_only: Skip sessions never used or used within keep_alive_interval (user
+                       requests already keep them alive); set by the background worker
+        
+        Returns:
+            True if all succeeded, False otherwise
+        """
+        def due(slot: PooledSession) -> bool:
+            if slot is not self.session_pool.primary and len(slot.session.cookies) == 0:
+                return False
+            if not idle_only:
+                return True
+            return slot.last_used_at is not None and self._session_idle_seconds(slot) >= self.keep_alive_interval
+        
+        slots = [slot for slot in self.session_pool.slots if due(slot)]
+        if not slots:
+            return True
+        success = True
+        if self.keep_alive_mode == "refresh_shifts":
+            refresh_started = time.monotonic()
+            success = self._refresh_pay_period()
+            slots = [slot for slot in slots if slot.last_used_at is None or slot.last_used_at < refresh_started]
+        for slot in slots:
+            # No checkout needed: requests carry their own headers, so a session busy with a fetch can be shared
+            success = self._keep_alive_session(slot) and success
+        return success
+    
+    @staticmethod
+    def _session_idle_seconds(slot: PooledSession) -> float:
+        if slot.last_used_at is None:
+            return float("inf")
+        return time.monotonic() - slot.last_used_at
+    
+    def _refresh_pay_period(self) -> bool:
+        """
+        Keep a session alive by fetching the current pay period and writing the result to the
+        shift cache and archive, so the keep-alive request also keeps them fresh. Shares an
+        in-flight fetch of the period, and skips the fetch while the period is still cached.
+        """
+        start, end = pay_period(date.today(), self.pay_period_start_day)
+        try:
+            if self.shift_cache.enabled and not self.shift_cache.lookup(start, end)[1]:
+                logger.debug("Keep-alive refresh skipped: %s to %s is cached", start, end)
+                return True
+            self._fetch_days(start, end)
+            logger.debug("Keep-alive refreshed %s to %s", start, end)
+            return True
+        except Exception as e:
+            with self._lock:
+                self.consecutive_failures += 1
+            logger.debug("Keep-alive refresh failed: %s", e)
+            return False
+    
+    def _keep_alive_session(self, slot: PooledSession) -> bool:
+        """
+        Perform a random keep-alive action on one pooled session to simulate user activity.
         Returns True if successful, False otherwise.
         """
+        session = slot.session
         try:
             # Random delay to simulate human behavior
             self._add_delay(0.5, 2.0)
@@ -433,20 +1082,20 @@ class VinnustundScraper:
             # Randomly select a URL
             url = random.choice(keep_alive_urls)
             
-            self.session.headers['Referer'] = self.BASE_URL
-            
             def get_url():
-                return self.session.get(url, timeout=15)
+                return self._send(session, "GET", url, referer=self.BASE_URL, timeout=15)
             
             # Use retry logic for keep-alive requests
             response = self._retry_request(get_url, max_retries=2, base_delay=0.5)
             
             # Update state after successful request (outside lock during request)
             with self._lock:
-                self._extend_cookie_expiration(self.cookie_expiration_years)
+                self._extend_cookie_expiration(self.cookie_expiration_years, session)
                 self.last_activity = datetime.now()
             
-            if self._check_session_valid(response):
+            slot.healthy = self._check_session_valid(response)
+            slot.last_used_at = time.monotonic()
+            if slot.healthy:
                 with self._lock:
                     self.last_successful_request = datetime.now()
                     self.consecutive_failures = 0
@@ -455,6 +1104,9 @@ class VinnustundScraper:
                 self.consecutive_failures += 1
             return False
         except Exception as e:
+            slot.healthy = False
+            # A failed attempt counts as use too, so the next one waits a full interval
+            slot.last_used_at = time.monotonic()
             with self._lock:
                 self.consecutive_failures += 1
             logger.debug("Keep-alive request failed: %s", e)
@@ -464,12 +1116,18 @@ class VinnustundScraper:
         """Background worker thread for keep-alive actions."""
         while self.keep_alive_running:
             try:
-                time.sleep(self.keep_alive_interval)
+                # Wake up when the longest-idle session reaches keep_alive_interval, so user
+                # traffic postpones keep-alive instead of adding to it (sessions never used
+                # have nothing to keep alive)
+                idle = max((self._session_idle_seconds(slot) for slot in self.session_pool.slots
+                            if slot.last_used_at is not None), default=0)
+                time.sleep(min(max(self.keep_alive_interval - idle, 5), self.keep_alive_interval))
                 if not self.keep_alive_running:
                     break
-                time_since_activity = (datetime.now() - self.last_activity).total_seconds()
-                if time_since_activity >= self.keep_alive_interval:
-                    self._perform_keep_alive_action()
+                if self.circuit_breaker.state == OPEN:
+                    logger.debug("Keep-alive skipped: upstream circuit open")
+                    continue
+                self._perform_keep_alive_action(idle_only=True)
             except Exception as e:
                 logger.debug("Keep-alive worker error: %s", e)
                 time.sleep(60)
@@ -491,122 +1149,487 @@ class VinnustundScraper:
             if self.keep_alive_thread:
                 self.keep_alive_thread.join(timeout=5)
     
-    def _ensure_session_valid(self) -> bool:
+    def _ensure_session_valid(self, slot: PooledSession, deadline: Optional[Deadline] = None) -> bool:
         """
-        Ensure session is valid before making requests.
-        If we have no cookies but have credentials, attempt login.
+        Ensure a pooled session is valid before making requests.
+        If it has no cookies but we have credentials, attempt login (within deadline).
         """
         try:
             with self._lock:
                 self.last_activity = datetime.now()
-            if len(self.session.cookies) == 0 and self._username and self._password:
+            login_generation = slot.login_generation
+            if len(slot.session.cookies) == 0 and self._username and self._password:
                 logger.info("Logging in (no session)")
-                return self.login()
-            if len(self.session.cookies) == 0:
+                return self._relogin(slot, login_generation, deadline=deadline)
+            if len(slot.session.cookies) == 0:
                 logger.warning("No cookies in session and no credentials to login")
                 return False
             return True
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error ensuring session validity: {str(e)}")
             return False
     
-    def get_shifts(self, date_from: str, date_to: str, _retry_after_login: bool = False) -> List[Dict]:
+    def get_shifts(self, date_from: str, date_to: str, use_cache: bool = True,
+                   deadline: Optional[Deadline] = None,
+                   progress: Optional[Callable[[int, int, int], None]] = None,
+                   on_upstream_fetch: Optional[Callable[[], None]] = None) -> List[Dict]:
         """
         Retrieve shifts for the given date range.
+        Days already in the shift cache (or the shift archive) are served locally;
+        only the missing intervals are fetched.
+        
+        Args:
+            date_from: Start date in format dd.MM.yyyy (e.g., "01.01.2026")
+            date_to: End date in format dd.MM.yyyy (e.g., "25.01.2026")
+            use_cache: If False, fetch the whole range upstream (the result is still cached)
+            deadline: Time limit for all upstream work of this call (None: no limit)
+            progress: Called as progress(chunks_done, chunks_total, rows) after each upstream
+                      fetch, rows counting the shifts of the range retrieved so far
+            on_upstream_fetch: Called for each upstream fetch this call makes itself (not for
+                               chunks served by another caller's in-flight fetch)
+        
+        Returns:
+            List of dictionaries containing shift information
+        
+        Raises:
+            DeadlineExceeded: If the shifts could not be retrieved before the deadline
+            CircuitOpenError: If the upstream circuit is open and no cached copy covers the range
+        """
+        key = normalize_range(date_from, date_to)
+        if not key:
+            return self._fetch_shifts(date_from, date_to, deadline=deadline)
+        
+        start, end = key
+        days, missing = self._local_days(start, end, use_cache)
+        
+        try:
+            chunks = [chunk for gap in missing for chunk in split_range(*gap, self.fetch_chunk_days)]
+            rows = sum(len(day_shifts) for day_shifts in days.values())
+            
+            def chunk_done(done, chunk_days):
+                nonlocal rows
+                rows += sum(len(day_shifts) for day, day_shifts in chunk_days.items() if start <= day <= end)
+                progress(done, len(chunks), rows)
+            
+            if progress:
+                progress(0, len(chunks), rows)
+            for day, day_shifts in self._fetch_chunks(chunks, deadline, chunk_done if progress else None,
+                                                      on_upstream_fetch).items():
+                if start <= day <= end:
+                    days[day] = day_shifts
+        except CircuitOpenError:
+            stale = self._stale_days(start, end, days) if use_cache else None
+            if stale is None:
+                raise
+            logger.warning("Upstream circuit open; serving cached shifts for %s to %s", date_from, date_to)
+            days = stale
+        
+        if missing != [key] or len(chunks) > 1:
+            logger.debug("Shift cache: %s to %s served with %d upstream request(s)", date_from, date_to, len(chunks))
+        return [shift for day in sorted(days) for shift in days[day]]
+    
+    def iter_shifts(self, date_from: str, date_to: str, use_cache: bool = True,
+                    deadline: Optional[Deadline] = None) -> Iterator[Dict]:
+        """
+        Yield the shifts of get_shifts one at a time in date order, for streaming responses.
+        Cached days are yielded from the shift cache (or archive); each missing interval is
+        fetched fetch_chunk_days at a time and its rows are yielded as they are parsed, so
+        the range is never held as one list. Fetched days are still written to the shift
+        cache and archive. Unlike get_shifts, chunks are fetched one after another, without
+        coalescing with in-flight fetches and without worker processes for parsing.
+        
+        Args:
+            date_from, date_to, use_cache, deadline: As for get_shifts
+        
+        Raises:
+            DeadlineExceeded, CircuitOpenError: As for get_shifts; once the first shift
+            has been yielded they are raised from the middle of the iteration
+        """
+        key = normalize_range(date_from, date_to)
+        if not key:
+            yield from self.parser.iter_shifts(self._fetch_shifts(date_from, date_to, deadline, raw=True).text)
+            return
+        
+        start, end = key
+        days, missing = self._local_days(start, end, use_cache)
+        chunks = [chunk for gap in missing for chunk in split_range(*gap, self.fetch_chunk_days)]
+        if chunks:
+            try:
+                self.circuit_breaker.raise_if_open("fetching shifts")
+            except CircuitOpenError:
+                stale = self._stale_days(start, end, days) if use_cache else None
+                if stale is None:
+                    raise
+                logger.warning("Upstream circuit open; serving cached shifts for %s to %s", date_from, date_to)
+                days, chunks = stale, []
+        
+        day = start
+        for chunk_start, chunk_end in chunks:
+            for cached_day in iter_days(day, chunk_start - timedelta(days=1)):
+                yield from days[cached_day]
+            yield from self._iter_fetched_chunk(chunk_start, chunk_end, deadline)
+            day = chunk_end + timedelta(days=1)
+        for cached_day in iter_days(day, end):
+            yield from days[cached_day]
+    
+    def _iter_fetched_chunk(self, start: date, end: date, deadline: Optional[Deadline] = None) -> Iterator[Dict]:
+        """Fetch start..end upstream, yield its shifts as they are parsed, then store them (see _store_fetched)."""
+        response = self._fetch_shifts(format_date(start), format_date(end), deadline, raw=True)
+        keep = self.shift_cache.enabled or self.shift_archive is not None
+        fetched = []
+        for _, shift in iter_dated(start, end, self.parser.iter_shifts(response.text)):
+            if keep:
+                fetched.append(shift)
+            yield shift
+        if keep:
+            self._store_fetched(start, end, fetched)
+    
+    def get_shifts_batch(self, ranges: List[DateRange], use_cache: bool = True,
+                         deadline: Optional[Deadline] = None,
+                         concurrency: Optional[int] = None) -> Tuple[List[List[Dict]], int, int]:
+        """
+        Retrieve shifts for many date ranges with as few upstream fetches as possible.
+        Overlapping and adjacent ranges (and ranges at most cache_merge_gap_days apart)
+        are merged, the merged ranges are retrieved with get_shifts (up to concurrency at
+        a time), and the shifts are split back out per requested range.
+        
+        Args:
+            ranges: Inclusive (start, end) date ranges, in any order and possibly overlapping
+            use_cache: As for get_shifts
+            deadline: Time limit for the whole batch (None: no limit)
+            concurrency: Merged ranges retrieved at the same time (default: fetch_concurrency)
+        
+        Returns:
+            (shifts per requested range in request order, number of merged ranges,
+            number of upstream fetches made by this batch, not counting chunks served by
+            another caller's in-flight fetch)
+        
+        Raises:
+            DeadlineExceeded, CircuitOpenError: As for get_shifts
+        """
+        merged = merge_ranges(ranges, self.shift_cache.merge_gap_days)
+        upstream_fetches = 0
+        fetches_lock = threading.Lock()
+        
+        def count_fetch():
+            nonlocal upstream_fetches
+            with fetches_lock:
+                upstream_fetches += 1
+        
+        def retrieve(index: int) -> Dict[date, List[Dict]]:
+            start, end = merged[index]
+            shifts = self.get_shifts(format_date(start), format_date(end), use_cache=use_cache,
+                                     deadline=deadline, on_upstream_fetch=count_fetch)
+            return group_by_day(start, end, shifts)
+        
+        workers = min(len(merged), concurrency or self.fetch_concurrency)
+        days: Dict[date, List[Dict]] = {}
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shift-batch") as executor:
+                for merged_days in executor.map(retrieve, range(len(merged))):
+                    days.update(merged_days)
+        else:
+            for index in range(len(merged)):
+                days.update(retrieve(index))
+        
+        per_range = [[shift for day in iter_days(start, end) for shift in days[day]] for start, end in ranges]
+        return per_range, len(merged), upstream_fetches
+    
+    def _fetch_chunks(self, chunks: List[Tuple[date, date]], deadline: Optional[Deadline] = None,
+                      on_chunk_done: Optional[Callable[[int, Dict[date, List[Dict]]], None]] = None,
+                      on_upstream_fetch: Optional[Callable[[], None]] = None) -> Dict[date, List[Dict]]:
+        """
+        Fetch date ranges upstream, concurrently (up to fetch_concurrency at a time) when
+        chunked fetching is enabled. Chunks are disjoint, so merging by date de-duplicates.
+        on_chunk_done(chunks_done, chunk_days) is called as each chunk completes, and
+        on_upstream_fetch() for each chunk fetched by this call (see _fetch_days).
+        
+        Returns:
+            Shifts of every fetched day, keyed by date
+        """
+        days: Dict[date, List[Dict]] = {}
+        if len(chunks) > 1 and self._chunk_executor:
+            futures = [self._chunk_executor.submit(self._fetch_chunk, chunk_start, chunk_end, deadline,
+                                                   on_upstream_fetch)
+                       for chunk_start, chunk_end in chunks]
+            for done, future in enumerate(as_completed(futures), 1):
+                chunk_days = future.result()
+                days.update(chunk_days)
+                if on_chunk_done:
+                    on_chunk_done(done, chunk_days)
+        else:
+            for done, (chunk_start, chunk_end) in enumerate(chunks, 1):
+                chunk_days = self._fetch_chunk(chunk_start, chunk_end, deadline, on_upstream_fetch)
+                days.update(chunk_days)
+                if on_chunk_done:
+                    on_chunk_done(done, chunk_days)
+        return days
+    
+    def _fetch_chunk(self, start: date, end: date, deadline: Optional[Deadline] = None,
+                     on_upstream_fetch: Optional[Callable[[], None]] = None) -> Dict[date, List[Dict]]:
+        """Fetch one range (see _fetch_days) and record how long it took."""
+        started = time.monotonic()
+        days = self._fetch_days(start, end, deadline=deadline, on_upstream_fetch=on_upstream_fetch)
+        elapsed = time.monotonic() - started
+        with self._chunk_lock:
+            self._chunk_timings.append(((end - start).days + 1, elapsed))
+        return days
+    
+    def get_chunk_info(self) -> Dict:
+        """Return chunking settings and timings of the most recent upstream fetches for /health."""
+        with self._chunk_lock:
+            timings = list(self._chunk_timings)
+        total_days = sum(days for days, _ in timings)
+        total_seconds = sum(seconds for _, seconds in timings)
+        return {
+            'chunk_days': self.fetch_chunk_days,
+            'concurrency': self.fetch_concurrency if self._chunk_executor else 1,
+            'recent_fetches': len(timings),
+            'avg_fetch_ms': round(total_seconds / len(timings) * 1000, 1) if timings else None,
+            'max_fetch_ms': round(max(seconds for _, seconds in timings) * 1000, 1) if timings else None,
+            'avg_ms_per_day': round(total_seconds / total_days * 1000, 1) if total_days else None,
+        }
+    
+    def _local_days(self, start: date, end: date,
+                    use_cache: bool = True) -> Tuple[Dict[date, List[Dict]], List[DateRange]]:
+        """
+        Split start..end into the days served from the shift cache or archive and the
+        intervals still to fetch upstream (merged per cache_merge_gap_days).
+        """
+        days, missing = {}, [(start, end)]
+        if use_cache and self.shift_cache.enabled:
+            days, missing = self.shift_cache.lookup(start, end)
+        if use_cache and self.shift_archive and missing:
+            for gap_start, gap_end in missing:
+                archived = self.shift_archive.load(gap_start, gap_end)
+                self.shift_cache.store_days(archived)
+                days.update(archived)
+            missing = merge_ranges(find_gaps(start, end, days), self.shift_cache.merge_gap_days)
+        return days, missing
+    
+    def _stale_days(self, start: date, end: date, days: Dict[date, List[Dict]]) -> Optional[Dict[date, List[Dict]]]:
+        """
+        Complete days with expired cache entries and archived days of any age.
+        Returns None if some day of start..end is still missing.
+        """
+        days = dict(days)
+        for day, day_shifts in self.shift_cache.lookup_stale(start, end).items():
+            days.setdefault(day, day_shifts)
+        if self.shift_archive:
+            for gap_start, gap_end in find_gaps(start, end, days):
+                for day, day_shifts in self.shift_archive.load(gap_start, gap_end, include_stale=True).items():
+                    days.setdefault(day, day_shifts)
+        if find_gaps(start, end, days):
+            return None
+        self.circuit_breaker.record_stale_served()
+        return days
+    
+    def _fetch_days(self, start: date, end: date, deadline: Optional[Deadline] = None,
+                    on_upstream_fetch: Optional[Callable[[], None]] = None) -> Dict[date, List[Dict]]:
+        """
+        Fetch start..end upstream, coalescing with an in-flight fetch of the same or an
+        enclosing range: concurrent callers wait for that fetch (at most until their own
+        deadline) instead of issuing their own. If the fetch fails only because its
+        leader's deadline ran out, a waiting caller with time left fetches as the new leader.
+        on_upstream_fetch() is called when this caller fetched the range itself, as the leader.
+        
+        Returns:
+            Shifts of every day in start..end, keyed by date
+        """
+        while True:
+            with self._inflight_lock:
+                for (flight_start, flight_end), flight in self._inflight.items():
+                    if flight_start <= start and end <= flight_end and not flight.done():
+                        self.coalesced_fetches += 1
+                        break
+                else:
+                    flight = Future()
+                    self._inflight[(start, end)] = flight
+                    self.leader_fetches += 1
+                    flight_start = None
+            
+            if flight_start is None:
+                break
+            logger.debug("Waiting for in-flight fetch %s to %s", flight_start, flight_end)
+            try:
+                days = flight.result(timeout=deadline.remaining() if deadline else None)
+            except TimeoutError:
+                self.retry_budget.record_deadline_exceeded()
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for in-flight fetch")
+            except DeadlineExceeded:
+                # The leader ran out of its own deadline; fetch again if this caller has time left
+                if deadline is not None:
+                    deadline.check("fetching shifts")
+                logger.debug("In-flight fetch %s to %s hit its leader's deadline; fetching again",
+                             flight_start, flight_end)
+                continue
+            return {day: day_shifts for day, day_shifts in days.items() if start <= day <= end}
+        
+        try:
+            days = self._fetch_and_store(start, end, deadline)
+            if on_upstream_fetch:
+                on_upstream_fetch()
+            flight.set_result(days)
+            return days
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                # A failed flight may already have been replaced by a new leader for the same range
+                if self._inflight.get((start, end)) is flight:
+                    del self._inflight[(start, end)]
+    
+    def get_coalescing_info(self) -> Dict:
+        """Return single-flight counters for /health."""
+        with self._inflight_lock:
+            return {
+                'in_flight': len(self._inflight),
+                'leader_fetches': self.leader_fetches,
+                'coalesced_fetches': self.coalesced_fetches,
+            }
+    
+    def _fetch_and_store(self, start: date, end: date, deadline: Optional[Deadline] = None) -> Dict[date, List[Dict]]:
+        """Fetch start..end upstream and write the result through to the shift cache and archive."""
+        fetched = self._fetch_shifts(format_date(start), format_date(end), deadline=deadline)
+        return self._store_fetched(start, end, fetched)
+    
+    def _store_fetched(self, start: date, end: date, shifts: List[Dict]) -> Dict[date, List[Dict]]:
+        """Index shifts fetched for start..end per day and write them to the shift cache and archive."""
+        days = self.shift_cache.store(start, end, shifts)
+        if self.shift_archive:
+            self.shift_archive.save(days)
+        return days
+    
+    def _fetch_shifts(self, date_from: str, date_to: str, deadline: Optional[Deadline] = None,
+                      raw: bool = False) -> Any:
+        """
+        Fetch shifts for the given date range from the timesheet page on a pooled session.
+        
+        Args:
+            date_from: Start date in format dd.MM.yyyy (e.g., "01.01.2026")
+            date_to: End date in format dd.MM.yyyy (e.g., "25.01.2026")
+            deadline: Deadline of the API request (also bounds the wait for a free session)
+            raw: Return the timesheet response unparsed, so the caller can parse it after
+                 the session is back in the pool
+        
+        Returns:
+            List of dictionaries containing shift information (the response if raw)
+        """
+        self.circuit_breaker.raise_if_open("fetching shifts")
+        try:
+            with self.session_pool.checkout(deadline=deadline.expires_at if deadline else None) as slot:
+                shifts = self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline, raw=raw)
+                slot.healthy = True
+                return shifts
+        except TimeoutError as e:
+            if deadline is not None and deadline.expired():
+                self.retry_budget.record_deadline_exceeded()
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for a free session")
+            raise Exception(f"Failed to retrieve shifts: {e}")
+    
+    def _fetch_shifts_on(self, slot: PooledSession, date_from: str, date_to: str,
+                         deadline: Optional[Deadline] = None, raw: bool = False,
+                         _retry_after_login: bool = False) -> Any:
+        """
+        Fetch shifts for the given date range using a checked-out pooled session.
         If session is expired and credentials are configured, relogin and retry once.
         
         Args:
+            slot: Pooled session checked out by the caller
             date_from: Start date in format dd.MM.yyyy (e.g., "01.01.2026")
             date_to: End date in format dd.MM.yyyy (e.g., "25.01.2026")
+            deadline: Deadline of the API request; caps request timeouts and retries
+            raw: Return the timesheet response unparsed (see _fetch_shifts)
             _retry_after_login: Internal flag to avoid infinite recursion on retry
         
         Returns:
-            List of dictionaries containing shift information
+            List of dictionaries containing shift information (the response if raw)
         """
-        if not self._ensure_session_valid():
+        if not self._ensure_session_valid(slot, deadline=deadline):
             raise Exception(
                 "Session invalid and login not available or failed. "
                 "Configure USERNAME and PASSWORD in config.py for automatic relogin."
             )
+        login_generation = slot.login_generation
+        session = slot.session
         
         try:
-            self._add_delay(1.0, 2.0)
-            
-            self.session.headers['Referer'] = self.BASE_URL
-            
-            def get_initial_page():
-                return self.session.get(
-                    self.TIMESHEET_URL + "?sj=true",
-                    timeout=30
-                )
-            
-            # Use retry logic for initial GET
-            initial_response = self._retry_request(get_initial_page, max_retries=3, base_delay=1.0)
-            
-            # Update state after successful request (outside lock during request)
-            with self._lock:
-                self._extend_cookie_expiration(self.cookie_expiration_years)
-                self.last_activity = datetime.now()
-            
-            if not self._check_session_valid(initial_response):
-                if not _retry_after_login and self._username and self._password:
-                    logger.info("Session expired; relogin and retry")
-                    if self.login():
-                        return self.get_shifts(date_from, date_to, _retry_after_login=True)
-                raise Exception("Session expired or invalid. Configure USERNAME/PASSWORD in config.py for automatic relogin.")
-            
-            if initial_response.status_code != 200:
-                raise Exception(f"Initial GET failed with status code {initial_response.status_code}")
-            
-            # Parse the initial page to extract form fields
-            initial_soup = BeautifulSoup(initial_response.text, 'html.parser')
-            form = initial_soup.find('form', {'name': 'detail_form'})
-            
-            if not form:
-                logger.debug("detail_form not found on initial page; trying refresh")
+            # Hidden fields of detail_form harvested by an earlier call on this session
+            cached_fields = slot.detail_form_fields
+            hidden_inputs = dict(cached_fields) if cached_fields is not None else None
+            if hidden_inputs is None:
+                self._add_delay(1.0, 2.0, deadline=deadline)
                 
-                # Try to refresh session by visiting base URL and then retrying
-                try:
-                    def get_base_refresh():
-                        return self.session.get(self.BASE_URL, timeout=10)
-                    
-                    self._retry_request(get_base_refresh, max_retries=2, base_delay=0.5)
-                    time.sleep(2)
-                    self._add_delay(1.0, 2.0)
-                    
-                    def get_retry_page():
-                        return self.session.get(
-                            self.TIMESHEET_URL + "?sj=true",
-                            timeout=30
-                        )
-                    
-                    retry_response = self._retry_request(get_retry_page, max_retries=3, base_delay=1.0)
-                    
-                    # Update state after successful request
-                    with self._lock:
-                        self._extend_cookie_expiration(self.cookie_expiration_years)
-                        self.last_activity = datetime.now()
-                    
-                    if not self._check_session_valid(retry_response):
-                        raise Exception("Session expired or invalid after refresh.")
-                    
-                    initial_soup = BeautifulSoup(retry_response.text, 'html.parser')
-                    form = initial_soup.find('form', {'name': 'detail_form'})
+                def get_initial_page():
+                    return self._send(session, "GET", self.TIMESHEET_URL + "?sj=true", referer=self.BASE_URL, timeout=30,
+                                      deadline=deadline)
+                
+                # Use retry logic for initial GET
+                initial_response = self._retry_request(get_initial_page, max_retries=3, base_delay=1.0, deadline=deadline)
+                
+                # Update state after successful request (outside lock during request)
+                with self._lock:
+                    self._extend_cookie_expiration(self.cookie_expiration_years, session)
+                    self.last_activity = datetime.now()
+                
+                if not self._check_session_valid(initial_response):
+                    if not _retry_after_login and self._username and self._password:
+                        logger.info("Session expired; relogin and retry")
+                        if self._relogin(slot, login_generation, deadline=deadline, expired=True):
+                            return self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline, raw=raw, _retry_after_login=True)
+                    raise Exception("Session expired or invalid. Configure USERNAME/PASSWORD in config.py for automatic relogin.")
+                
+                if initial_response.status_code != 200:
+                    raise Exception(f"Initial GET failed with status code {initial_response.status_code}")
+                
+                # Parse the initial page to extract form fields
+                initial_soup = BeautifulSoup(initial_response.text, 'html.parser')
+                form = initial_soup.find('form', {'name': 'detail_form'})
+                
+                if not form:
+                    logger.debug("detail_form not found on initial page; trying refresh")
                     
-                    if not form:
-                        raise Exception("Could not find form on page even after refresh. Session may be invalid.")
-                    initial_response = retry_response
-                except Exception as refresh_error:
-                    raise Exception("Could not find form on page. Session may be invalid.")
-            
-            # Extract all hidden input fields from the form
-            hidden_inputs = {}
-            for input_field in form.find_all('input', type='hidden'):
-                name = input_field.get('name')
-                value = input_field.get('value', '')
-                if name:
-                    hidden_inputs[name] = value
-            
+                    # Try to refresh session by visiting base URL and then retrying
+                    try:
+                        def get_base_refresh():
+                            return self._send(session, "GET", self.BASE_URL, referer=self.BASE_URL, timeout=10,
+                                              deadline=deadline)
+                        
+                        self._retry_request(get_base_refresh, max_retries=2, base_delay=0.5, deadline=deadline)
+                        self._add_delay(3.0, 4.0, deadline=deadline)
+                        
+                        def get_retry_page():
+                            return self._send(session, "GET", self.TIMESHEET_URL + "?sj=true", referer=self.BASE_URL, timeout=30,
+                                              deadline=deadline)
+                        
+                        retry_response = self._retry_request(get_retry_page, max_retries=3, base_delay=1.0, deadline=deadline)
+                        
+                        # Update state after successful request
+                        with self._lock:
+                            self._extend_cookie_expiration(self.cookie_expiration_years, session)
+                            self.last_activity = datetime.now()
+                        
+                        if not self._check_session_valid(retry_response):
+                            raise Exception("Session expired or invalid after refresh.")
+                        
+                        initial_soup = BeautifulSoup(retry_response.text, 'html.parser')
+                        form = initial_soup.find('form', {'name': 'detail_form'})
+                        
+                        if not form:
+                            raise Exception("Could not find form on page even after refresh. Session may be invalid.")
+                        initial_response = retry_response
+                    except (DeadlineExceeded, CircuitOpenError):
+                        raise
+                    except Exception as refresh_error:
+                        raise Exception("Could not find form on page. Session may be invalid.")
+                
+                # Extract all hidden input fields from the form
+                hidden_inputs = self._hidden_form_fields(form)
+                slot.detail_form_fields = dict(hidden_inputs)
+                
             # Prepare form data with all hidden fields + our date range
             form_data = hidden_inputs.copy()
             form_data.update({
@@ -621,290 +1644,84 @@ class VinnustundScraper:
                 form_data['showBak'] = 'true'
             
             # Submit the form
-            self._add_delay(1.0, 2.0)
-            
-            self.session.headers['Referer'] = self.TIMESHEET_URL + "?sj=true"
-            self.session.headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            self._add_delay(1.0, 2.0, deadline=deadline)
             
             def post_form():
-                return self.session.post(
-                    self.TIMESHEET_URL,
-                    data=form_data,
-                    allow_redirects=True,
-                    timeout=30
-                )
+                return self._send(session, "POST", self.TIMESHEET_URL, referer=self.TIMESHEET_URL + "?sj=true",
+                                  data=form_data, timeout=30, deadline=deadline)
             
             # Use retry logic for POST request
-            response = self._retry_request(post_form, max_retries=3, base_delay=1.0)
+            response = self._retry_request(post_form, max_retries=3, base_delay=1.0, deadline=deadline)
             
             # Update state after successful request (outside lock during request)
             with self._lock:
-                self._extend_cookie_expiration(self.cookie_expiration_years)
+                self._extend_cookie_expiration(self.cookie_expiration_years, session)
                 self.last_activity = datetime.now()
                 self.last_successful_request = datetime.now()
                 self.consecutive_failures = 0
             
+            # The timesheet view always renders detail_form; without it (or on an error or
+            # login page) the cached fields may be stale, so harvest them again with a GET
+            if cached_fields is not None and (
+                response.status_code != 200 or not self._check_session_valid(response)
+                or 'detail_form' not in response.text
+            ):
+                slot.detail_form_fields = None
+                logger.info("POST with cached form fields failed; retrying with a fresh form")
+                return self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline, raw=raw,
+                                             _retry_after_login=_retry_after_login)
+            
             if not self._check_session_valid(response):
                 if not _retry_after_login and self._username and self._password:
                     logger.info("Session expired; relogin and retry")
-                    if self.login():
-                        return self.get_shifts(date_from, date_to, _retry_after_login=True)
+                    if self._relogin(slot, login_generation, deadline=deadline, expired=True):
+                        return self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline, raw=raw, _retry_after_login=True)
                 raise Exception("Session expired or invalid. Configure USERNAME/PASSWORD in config.py for automatic relogin.")
             
             if response.status_code != 200:
                 raise Exception(f"Received status code {response.status_code}")
             
-            # Check for common indicators in the response
-            has_timesheet = 'Timesheet' in response.text or 'timesheet' in response.text.lower()
-            has_table_control = 'clsTableControl' in response.text
-            has_detail_form = 'detail_form' in response.text
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            all_tables = soup.find_all('table', class_='clsTableControl')
-            
-            if not all_tables:
-                return []
-            
-            # Find the table that actually has data (rows)
-            table = None
-            for i, tbl in enumerate(all_tables, 1):
-                rows = tbl.find_all('tr')
-                tbody = tbl.find('tbody')
-                if tbody:
-                    rows = tbody.find_all('tr')
-                
-                logger.debug(f"  Table {i}: {len(rows)} rows found")
-                
-                # Use the table with the most rows (should be the data table)
-                if not table or len(rows) > len(table.find_all('tr')):
-                    table = tbl
-                    logger.debug(f"  → Using table {i} with {len(rows)} rows")
-            
-            if not table:
-                return []
-            shifts = self._parse_table(table)
+            if raw:
+                return response
+            shifts = self._parse_shifts(response)
             logger.info("Retrieved %d shifts (%s to %s)", len(shifts), date_from, date_to)
             return shifts
             
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to retrieve shifts: {str(e)}")
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             error_msg = str(e)
             if not _retry_after_login and self._username and self._password:
                 if "Session expired" in error_msg or "Session may be invalid" in error_msg or "Could not find form" in error_msg or "invalid" in error_msg.lower():
                     logger.info("Session expired; relogin and retry")
-                    if self.login():
-                        return self.get_shifts(date_from, date_to, _retry_after_login=True)
+                    if self._relogin(slot, login_generation, deadline=deadline):
+                        return self._fetch_shifts_on(slot, date_from, date_to, deadline=deadline, raw=raw, _retry_after_login=True)
             raise
     
-    def _parse_table(self, table: BeautifulSoup) -> List[Dict]:
-        """
-        Parse the shifts table and extract shift information.
-        
-        Args:
-            table: BeautifulSoup table element
-        
-        Returns:
-            List of shift dictionaries
-        """
-        shifts = []
-        
-        # Try to find rows in tbody first, then fall back to all rows
-        tbody = table.find('tbody')
-        if tbody:
-            rows = tbody.find_all('tr')
-            logger.debug(f"Using rows from tbody: {len(rows)} rows")
-        else:
-            rows = table.find_all('tr')
-            logger.debug(f"Using all rows from table: {len(rows)} rows")
-        
-        if len(rows) == 0:
-            return []
-        
-        # Skip header rows (first two rows are usually headers)
-        data_rows = []
-        header_count = 0
-        total_count = 0
-        
-        for i, row in enumerate(rows):
-            # Check if this is a data row (not a header row)
-            if row.find('td', class_='vrTableHeader'):
-                header_count += 1
-                continue
-            
-            # Check if this is a total/summary row
-            row_text = row.get_text()
-            if 'Total' in row_text or 'total' in row_text.lower():
-                total_count += 1
-                continue
-            
-            # Check if row has meaningful data (has date column)
-            tds = row.find_all('td')
-            if len(tds) < 3:
-                logger.debug(f"  Row {i+1}: Skipped - only {len(tds)} columns")
-                continue
-            
-            data_rows.append(row)
-            logger.debug(f"  Row {i+1}: Added as data row with {len(tds)} columns")
-        
-        # Parse each data row
-        for i, row in enumerate(data_rows, 1):
-            shift = self._parse_shift_row(row)
-            if shift:
-                shifts.append(shift)
-                logger.debug(f"  Parsed shift {i}")
-            else:
-                logger.debug(f"  Row {i}: Failed to parse")
-        
-        logger.info(f"Successfully parsed {len(shifts)} shifts from {len(data_rows)} data rows")
-        return shifts
-    
-    def _parse_shift_row(self, row: BeautifulSoup) -> Optional[Dict]:
-        """
-        Parse a single shift row from the table.
-        
-        Table structure (based on HTML analysis):
-        0: Day of week (Vikudagur)
-        1: Date
-        2-3: Work Hours (colspan 2)
-        4: Note
-        5: Clock-in
-        6: Time entered
-        7: Calculation method
-        8: Total hours
-        9: Absence/Supplement
-        10: Hours/Units
-        11: Remark
-        12: Status Shift (S)
-        13: Status Time (T)
-        14-18: Pay elements (5 columns)
-        19: Detail link
-        
-        Args:
-            row: BeautifulSoup tr element
-        
-        Returns:
-            Dictionary with shift data or None if invalid
-        """
-        tds = row.find_all('td')
-        
-        # Need at least day, date, and some basic info
-        if len(tds) < 3:
-            return None
-        
-        # Skip if this looks like a header or summary row
-        if row.find('td', class_='vrTableHeader'):
-            return None
-        
-        try:
-            shift = {}
-            
-            # Column 0: Day of week
-            day_of_week = tds[0].get_text(strip=True)
-            if not day_of_week or day_of_week in ['', '&nbsp;']:
-                return None  # Skip empty rows
-            shift['dayOfWeek'] = day_of_week
-            
-            # Column 1: Date
-            if len(tds) > 1:
-                date_text = tds[1].get_text(strip=True)
-                shift['date'] = date_text
-            
-            # Columns 2-3: Work Hours (colspan 2, but we get both)
-            if len(tds) > 2:
-                work_hours = tds[2].get_text(strip=True)
-                shift['workHours'] = work_hours
-                # Also check if there's a link or additional info in column 3
-                if len(tds) > 3:
-                    work_hours_extra = tds[3].get_text(strip=True)
-                    if work_hours_extra:
-                        shift['workHoursExtra'] = work_hours_extra
-            
-            # Column 4: Note
-            if len(tds) > 4:
-                note = tds[4].get_text(strip=True)
-                shift['note'] = note
-            
-            # Column 5: Clock-in
-            if len(tds) > 5:
-                clock_in = tds[5].get_text(strip=True)
-                shift['clockIn'] = clock_in
-            
-            # Column 6: Time entered
-            if len(tds) > 6:
-                time_entered = tds[6].get_text(strip=True)
-                shift['timeEntered'] = time_entered
-            
-            # Column 7: Calculation method
-            if len(tds) > 7:
-                calc_method = tds[7].get_text(strip=True)
-                shift['calculationMethod'] = calc_method
-            
-            # Column 8: Total hours
-            if len(tds) > 8:
-                total_hours = tds[8].get_text(strip=True)
-                shift['totalHours'] = total_hours
-            
-            # Column 9: Absence/Supplement
-            if len(tds) > 9:
-                absence = tds[9].get_text(strip=True)
-                shift['absenceSupplement'] = absence
-            
-            # Column 10: Hours/Units
-            if len(tds) > 10:
-                hours_units = tds[10].get_text(strip=True)
-                shift['hoursUnits'] = hours_units
-            
-            # Column 11: Remark
-            if len(tds) > 11:
-                remark = tds[11].get_text(strip=True)
-                shift['remark'] = remark
-            
-            # Column 12: Status Shift (S)
-            if len(tds) > 12:
-                status_shift = tds[12].get_text(strip=True)
-                shift['statusShift'] = status_shift
-            
-            # Column 13: Status Time (T)
-            if len(tds) > 13:
-                status_time = tds[13].get_text(strip=True)
-                shift['statusTime'] = status_time
-            
-            # Columns 14-18: Pay elements (5 columns)
-            pay_elements = []
-            if len(tds) > 14:
-                for i in range(14, min(19, len(tds))):
-                    pay_text = tds[i].get_text(strip=True)
-                    if pay_text and pay_text not in ['', '&nbsp;']:
-                        pay_elements.append(pay_text)
-            shift['payElements'] = pay_elements
-            
-            # Try to extract links and additional metadata
-            # Look for links in time entered column
-            if len(tds) > 6:
-                link = tds[6].find('a')
-                if link and link.get('title'):
-                    shift['timeEnteredTitle'] = link.get('title')
-            
-            # Look for status titles
-            if len(tds) > 12:
-                status_span = tds[12].find('span')
-                if status_span and status_span.get('title'):
-                    shift['statusShiftTitle'] = status_span.get('title')
-            
-            if len(tds) > 13:
-                status_span = tds[13].find('span')
-                if status_span and status_span.get('title'):
-                    shift['statusTimeTitle'] = status_span.get('title')
-            
-            # Get full row text for debugging
-            shift['rawText'] = row.get_text(separator=' | ', strip=True)
-            
-            return shift
-            
-        except Exception as e:
-            logger.warning(f"Error parsing row: {str(e)}")
-            return None
+    def _parse_shifts(self, response: requests.Response) -> List[Dict]:
+        """Parse a timesheet response inline, or in a worker process if it is large enough."""
+        if self._parse_executor is None or len(response.content) < self.parse_process_min_bytes:
+            with self._lock:
+                self.parsed_inline += 1
+            return self.parser.parse_shifts(response.text)
+        with self._lock:
+            self.parsed_in_process += 1
+        future = self._parse_executor.submit(parse_shifts_bytes, self.parser.name, response.content,
+                                             response.encoding or "utf-8")
+        return future.result()
+    
+    def get_parse_info(self) -> Dict:
+        """Return parser settings and inline/process parse counts for /health."""
+        with self._lock:
+            return {
+                'backend': self.parser.name,
+                'processes': self.parse_processes,
+                'process_min_bytes': self.parse_process_min_bytes,
+                'parsed_inline': self.parsed_inline,
+                'parsed_in_process': self.parsed_in_process,
+            }
     
     def test_authentication(self) -> bool:
         """
@@ -917,12 +1734,9 @@ class VinnustundScraper:
             self._add_delay(0.5, 1.0)
             
             def get_auth_test():
-                return self.session.get(
-                    self.TIMESHEET_URL + "?sj=true",
-                    timeout=15
-                )
+                return self._send(self.session, "GET", self.TIMESHEET_URL + "?sj=true", referer=self.BASE_URL, timeout=15)
             
-            # Use retry logic for auth test
+            # Use retry logic for auth test (per-request headers make the shared primary session safe here)
             response = self._retry_request(get_auth_test, max_retries=2, base_delay=0.5)
             
             return self._check_session_valid(response)
@@ -932,7 +1746,7 @@ class VinnustundScraper:
     
     def keep_alive(self):
         """
-        Send a keep-alive request to maintain session.
+        Send a keep-alive request on every logged-in session, recently used or not.
         Call this periodically (e.g., every 10 minutes) to avoid timeout.
         Note: If enable_keep_alive=True, this is handled automatically in the background.
         """
@@ -942,3 +1756,14 @@ class VinnustundScraper:
         """Cleanup when object is destroyed"""
         self.stop_keep_alive()
         self._stop_automatic_refresh()
+        self._stop_archive_sync()
+        self._stop_warm_up()
+        self._stop_proactive_relogin()
+        self._stop_executors()
+    
+    def _stop_executors(self):
+        """Shut down the chunk fetch threads and parse worker processes."""
+        if self._chunk_executor:
+            self._chunk_executor.shutdown(wait=False)
+        if self._parse_executor:
+            self._parse_executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,179 @@
+"""
+Pool of independent upstream sessions.
+
+Each pooled session has its own requests.Session (and therefore its own cookie jar and
+login state). A caller checks a session out for the duration of one upstream operation,
+so concurrent get_shifts calls never share a session's mutable state.
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+
+class PooledSession:
+    """A requests.Session plus the login state that belongs to it."""
+
+    def __init__(self, index: int, session: requests.Session):
+        self.index = index
+        self.session = session
+        # Login serialization: the generation advances on every login attempt
+        self.login_lock = threading.Lock()
+        self.login_generation = 0
+        self.last_login_ok = False
+        self.last_login_at: Optional[datetime] = None
+        # Outcome of the most recent login or fetch on this session
+        self.healthy = True
+        # Hidden inputs of the timesheet detail_form, reused until the next login or a failed POST
+        self.detail_form_fields: Optional[Dict[str, str]] = None
+        # time.monotonic() of the last request on this session (user fetch, login or keep-alive)
+        self.last_used_at: Optional[float] = None
+
+    def info(self) -> Dict:
+        return {
+            'index': self.index,
+            'logged_in': len(self.session.cookies) > 0,
+            'healthy': self.healthy,
+            'form_fields_cached': self.detail_form_fields is not None,
+            'login_attempts': self.login_generation,
+            'last_login_at': self.last_login_at.isoformat() if self.last_login_at else None,
+        }
+
+
+class SessionLifetimeEstimator:
+    """
+    Learns how long an upstream login lasts from confirmed expiries (time from login to the
+    request that got the login page back). The prediction is the median of the recent
+    observations, so a single unusually short one does not shorten it. Observations older
+    than max_age_seconds are dropped, except the newest: while proactive relogin works no
+    session expires, so there is nothing new to learn and the last prediction stays in
+    force. A real expiry (the estimate was too long) still updates it.
+    """
+
+    def __init__(self, max_samples: int = 10, max_age_seconds: float = 24 * 3600):
+        """
+        Args:
+            max_samples: Most recent observations kept
+            max_age_seconds: How long an observation counts towards the prediction (the newest
+                             always counts)
+        """
+        self.max_age_seconds = max_age_seconds
+        # (time.monotonic() when observed, lifetime in seconds)
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def observe(self, lifetime_seconds: float):
+        with self._lock:
+            self._samples.append((time.monotonic(), lifetime_seconds))
+
+    def _lifetimes(self) -> List[float]:
+        """Lifetimes of the observations that have not aged out, and the newest. Caller must hold _lock."""
+        cutoff = time.monotonic() - self.max_age_seconds
+        while len(self._samples) > 1 and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return [lifetime for _, lifetime in self._samples]
+
+    def predicted(self) -> Optional[float]:
+        """Predicted session lifetime in seconds, or None before the first confirmed expiry."""
+        with self._lock:
+            lifetimes = self._lifetimes()
+        return statistics.median(lifetimes) if lifetimes else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lifetimes = self._lifetimes()
+        return {
+            'observed_expiries': len(lifetimes),
+            'predicted_lifetime_seconds': round(statistics.median(lifetimes)) if lifetimes else None,
+            'last_observed_seconds': round(lifetimes[-1]) if lifetimes else None,
+            'max_age_seconds': self.max_age_seconds,
+        }
+
+
+class SessionPool:
+    """Fixed-size pool of PooledSession objects handed out round-robin."""
+
+    def __init__(self, sessions: List[requests.Session], checkout_timeout: Optional[float] = None):
+        """
+        Args:
+            sessions: The sessions to pool (the first one is the primary session)
+            checkout_timeout: Seconds to wait for a free session; None waits indefinitely
+        """
+        self.slots = [PooledSession(i, session) for i, session in enumerate(sessions)]
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque(self.slots)
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def primary(self) -> PooledSession:
+        return self.slots[0]
+
+    @contextmanager
+    def checkout(self, slot: Optional[PooledSession] = None, deadline: Optional[float] = None):
+        """
+        Check out a session for exclusive use.
+
+        Args:
+            slot: A specific pooled session to wait for; None takes the least recently used one
+            deadline: time.monotonic() value after which to stop waiting, if earlier than checkout_timeout
+
+        Raises:
+            TimeoutError: If no session becomes available within checkout_timeout (or by deadline)
+        """
+        started = time.monotonic()
+        if self.checkout_timeout is not None:
+            deadline = started + self.checkout_timeout if deadline is None else min(deadline, started + self.checkout_timeout)
+        with self._cond:
+            while True:
+                if slot is None and self._idle:
+                    chosen = self._idle.popleft()
+                    break
+                if slot is not None and slot in self._idle:
+                    self._idle.remove(slot)
+                    chosen = slot
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(
+                        f"No upstream session available after {time.monotonic() - started:.0f}s "
+                        f"(pool size {len(self.slots)})"
+                    )
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            yield chosen
+        finally:
+            with self._cond:
+                chosen.last_used_at = time.monotonic()
+                self._idle.append(chosen)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Return pool size, health and checkout wait times for /health."""
+        with self._cond:
+            idle = len(self._idle)
+            checkouts = self.checkouts
+            total_wait = self.total_wait_seconds
+            max_wait = self.max_wait_seconds
+        return {
+            'size': len(self.slots),
+            'idle': idle,
+            'in_use': len(self.slots) - idle,
+            'healthy': sum(1 for slot in self.slots if slot.healthy),
+            'checkouts': checkouts,
+            'avg_wait_ms': round(total_wait / checkouts * 1000, 1) if checkouts else 0.0,
+            'max_wait_ms': round(max_wait * 1000, 1),
+            'sessions': [slot.info() for slot in self.slots],
+        }
@@ -0,0 +1,175 @@
+"""
+Persistent SQLite archive of parsed shifts.
+
+Each archived day records when it was last fetched and whether it is settled (see
+shift_cache.is_settled_day). Settled days are served from disk indefinitely; other days
+only while their last sync is younger than max_age_seconds. The scraper's background
+sync job keeps recent days and the unsettled days of the last few pay periods fresh;
+older unsettled days are refetched when requested.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Iterable
+
+from shift_cache import DateRange, is_settled_day, iter_days, merge_ranges, pay_period
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    settled INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shifts (
+    day TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (day, row_index)
+);
+"""
+
+# Bumped when the rule deciding whether a day is settled changes; archives written
+# under an older rule have every day re-checked on open
+_SETTLED_RULE_VERSION = 2
+
+
+class ShiftArchive:
+    """Thread-safe on-disk store of shifts keyed by (day, row index within the day)."""
+
+    def __init__(self, path: str, max_age_seconds: float = 3600,
+                 approved_statuses: Iterable[str] = ("S",), pay_period_start_day: int = 1):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            max_age_seconds: How long an unsettled day may be served from the archive
+            approved_statuses: Status codes (statusShift/statusTime) that mean the entry is approved
+            pay_period_start_day: Day of month pay periods start on (days of closed periods settle)
+        """
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.approved_statuses = frozenset(approved_statuses)
+        self.pay_period_start_day = pay_period_start_day
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._recheck_settled()
+        self.days_served = 0
+        self.days_written = 0
+
+    def _recheck_settled(self):
+        """
+        Re-evaluate every day archived under an older settled rule. Caller must hold _lock
+        inside a transaction.
+        """
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version >= _SETTLED_RULE_VERSION:
+            return
+        days: Dict[str, List[Dict]] = {day: [] for (day,) in self._conn.execute("SELECT day FROM days")}
+        for day, data in self._conn.execute("SELECT day, data FROM shifts ORDER BY day, row_index"):
+            if day in days:
+                days[day].append(json.loads(data))
+        settled = [
+            (int(is_settled_day(date.fromisoformat(day), shifts, self.approved_statuses, self.pay_period_start_day)), day)
+            for day, shifts in days.items()
+        ]
+        self._conn.executemany("UPDATE days SET settled = ? WHERE day = ?", settled)
+        self._conn.execute(f"PRAGMA user_version = {_SETTLED_RULE_VERSION}")
+        logger.info("Shift archive: re-checked %d days, %d settled", len(settled), sum(s for s, _ in settled))
+
+    def load(self, start: date, end: date, include_stale: bool = False) -> Dict[date, List[Dict]]:
+        """
+        Return the archived days of start..end that can be served without a network request.
+
+        Args:
+            include_stale: Also return unsettled days older than max_age_seconds (used while
+                           the upstream site is unavailable)
+
+        Returns:
+            Shifts keyed by date, for settled days and days synced within max_age_seconds
+        """
+        fresh_after = float("-inf") if include_stale else time.time() - self.max_age_seconds
+        with self._lock:
+            fresh_days = [
+                row[0] for row in self._conn.execute(
+                    "SELECT day FROM days WHERE day BETWEEN ? AND ? AND (settled = 1 OR fetched_at > ?)",
+                    (start.isoformat(), end.isoformat(), fresh_after),
+                )
+            ]
+            days: Dict[date, List[Dict]] = {date.fromisoformat(day): [] for day in fresh_days}
+            for day, data in self._conn.execute(
+                "SELECT shifts.day, shifts.data FROM shifts JOIN days ON days.day = shifts.day "
+                "WHERE shifts.day BETWEEN ? AND ? AND (days.settled = 1 OR days.fetched_at > ?) "
+                "ORDER BY shifts.day, shifts.row_index",
+                (start.isoformat(), end.isoformat(), fresh_after),
+            ):
+                days[date.fromisoformat(day)].append(json.loads(data))
+            self.days_served += len(days)
+        return days
+
+    def save(self, days: Dict[date, List[Dict]]):
+        """Replace the archived shifts of each given day (write-through after an upstream fetch)."""
+        if not days:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            for day, shifts in days.items():
+                key = day.isoformat()
+                settled = is_settled_day(day, shifts, self.approved_statuses, self.pay_period_start_day)
+                self._conn.execute("DELETE FROM shifts WHERE day = ?", (key,))
+                self._conn.executemany(
+                    "INSERT INTO shifts (day, row_index, data) VALUES (?, ?, ?)",
+                    [(key, i, json.dumps(shift, ensure_ascii=False)) for i, shift in enumerate(shifts)],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO days (day, fetched_at, settled) VALUES (?, ?, ?)",
+                    (key, now, int(settled)),
+                )
+            self.days_written += len(days)
+
+    def days_to_sync(self, recent_days: int, pay_periods: int = 2) -> List[DateRange]:
+        """
+        Return the intervals the sync job should refresh: the last recent_days days up to
+        today, plus the archived days of the last pay_periods pay periods (the open one
+        included) that are not settled yet. Older unsettled days are refetched on request,
+        so the sync does not grow with the archive.
+        """
+        today = date.today()
+        wanted = set(iter_days(today - timedelta(days=max(recent_days - 1, 0)), today))
+        since = pay_period(today, self.pay_period_start_day)[0]
+        for _ in range(max(pay_periods, 1) - 1):
+            since = pay_period(since - timedelta(days=1), self.pay_period_start_day)[0]
+        with self._lock:
+            for (day,) in self._conn.execute(
+                "SELECT day FROM days WHERE settled = 0 AND day >= ?", (since.isoformat(),)
+            ):
+                wanted.add(date.fromisoformat(day))
+        return merge_ranges([(day, day) for day in wanted])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict:
+        """Return counters for /health."""
+        with self._lock:
+            day_count, settled_count = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(settled), 0) FROM days"
+            ).fetchone()
+            (shift_count,) = self._conn.execute("SELECT COUNT(*) FROM shifts").fetchone()
+            return {
+                'path': self.path,
+                'days': day_count,
+                'settled_days': settled_count,
+                'shifts': shift_count,
+                'max_age_seconds': self.max_age_seconds,
+                'days_served': self.days_served,
+                'days_written': self.days_written,
+            }
@@ -0,0 +1,295 @@
+"""
+In-process per-day cache for get_shifts results.
+
+Shifts are indexed by calendar date, so a new range is served from the days already
+cached and only the missing sub-intervals are fetched upstream. Each day expires after
+a TTL; settled days (see is_settled_day) no longer change upstream, so they are kept
+for the (much longer) settled TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple, Iterable
+
+DATE_FORMAT = "%d.%m.%Y"
+
+DateRange = Tuple[date, date]
+
+
+def parse_date(value: str) -> date:
+    """
+    Parse a dd.MM.yyyy date string (e.g. "01.01.2026").
+
+    Raises:
+        ValueError: If value is not a valid dd.MM.yyyy date
+    """
+    return datetime.strptime(value.strip(), DATE_FORMAT).date()
+
+
+def format_date(value: date) -> str:
+    """Format a date as dd.MM.yyyy."""
+    return value.strftime(DATE_FORMAT)
+
+
+def normalize_range(date_from: str, date_to: str) -> Optional[DateRange]:
+    """
+    Return (start, end) dates for a dd.MM.yyyy range, or None if either date does not parse
+    or the range is reversed (such requests are passed upstream unchanged and never cached).
+    """
+    try:
+        start, end = parse_date(date_from), parse_date(date_to)
+    except (ValueError, AttributeError):
+        return None
+    if start > end:
+        return None
+    return start, end
+
+
+def iter_days(start: date, end: date):
+    """Yield every date from start to end, inclusive."""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def merge_ranges(ranges: List[DateRange], max_gap_days: int = 0) -> List[DateRange]:
+    """
+    Merge ranges that overlap or are separated by at most max_gap_days days.
+
+    Args:
+        ranges: Inclusive (start, end) ranges in any order
+        max_gap_days: Largest number of days between two ranges that still merges them
+
+    Returns:
+        Sorted, non-overlapping ranges
+    """
+    merged: List[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and (start - merged[-1][1]).days <= max_gap_days + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def split_range(start: date, end: date, chunk_days: int) -> List[DateRange]:
+    """Split start..end into consecutive ranges of at most chunk_days days (0: no split)."""
+    if chunk_days <= 0:
+        return [(start, end)]
+    chunks: List[DateRange] = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def find_gaps(start: date, end: date, present) -> List[DateRange]:
+    """Return the maximal intervals of start..end whose days are not in present."""
+    gaps: List[DateRange] = []
+    for day in iter_days(start, end):
+        if day in present:
+            continue
+        if gaps and (day - gaps[-1][1]).days == 1:
+            gaps[-1] = (gaps[-1][0], day)
+        else:
+            gaps.append((day, day))
+    return gaps
+
+
+def pay_period(today: date, start_day: int = 1) -> DateRange:
+    """
+    Return the pay period containing today, for periods that start on start_day of each
+    month (1-28) and end the day before start_day of the next month.
+    """
+    start_day = min(max(start_day, 1), 28)
+    if today.day >= start_day:
+        start = today.replace(day=start_day)
+    else:
+        start = (today.replace(day=1) - timedelta(days=1)).replace(day=start_day)
+    next_start = (start.replace(day=28) + timedelta(days=4)).replace(day=start_day)
+    return start, next_start - timedelta(days=1)
+
+
+def iter_dated(start: date, end: date, shifts: Iterable[Dict]) -> Iterator[Tuple[date, Dict]]:
+    """
+    Yield (day, shift) for the shifts of the range start..end by their 'date' column.
+    A row whose date does not parse belongs to the day of the row before it; rows dated
+    outside the range are dropped.
+    """
+    current = start
+    for shift in shifts:
+        try:
+            current = parse_date(shift.get('date') or '')
+        except ValueError:
+            pass
+        if start <= current <= end:
+            yield current, shift
+
+
+def group_by_day(start: date, end: date, shifts: List[Dict]) -> Dict[date, List[Dict]]:
+    """
+    Index shifts of the range start..end by their 'date' column (see iter_dated).
+    Every day of the range gets an entry (empty if it has no rows).
+    """
+    days: Dict[date, List[Dict]] = {day: [] for day in iter_days(start, end)}
+    for day, shift in iter_dated(start, end, shifts):
+        days[day].append(shift)
+    return days
+
+
+def is_approved(shift: Dict, approved_statuses: Iterable[str]) -> bool:
+    """Return True if both status columns of shift hold an approved status (blank is not approved)."""
+    return all(shift.get(key) in approved_statuses for key in ("statusShift", "statusTime"))
+
+
+def is_pending(shift: Dict, approved_statuses: Iterable[str]) -> bool:
+    """Return True if a status column of shift holds a status other than an approved one."""
+    for key in ("statusShift", "statusTime"):
+        status = shift.get(key)
+        if status and status not in approved_statuses:
+            return True
+    return False
+
+
+def is_settled_day(day: date, shifts: List[Dict], approved_statuses: Iterable[str],
+                   pay_period_start_day: int = 1) -> bool:
+    """
+    A day is settled (no longer changes upstream) when it is before today and either all
+    of its shifts are approved, or its pay period has closed and none of its shifts is
+    pending. Rows with blank statuses (such as days off) and days without shifts thus
+    settle once their pay period is over, not before.
+    """
+    today = date.today()
+    if day >= today:
+        return False
+    if day < pay_period(today, pay_period_start_day)[0]:
+        return not any(is_pending(s, approved_statuses) for s in shifts)
+    return bool(shifts) and all(is_approved(s, approved_statuses) for s in shifts)
+
+
+class ShiftCache:
+    """Thread-safe LRU cache of shifts indexed per calendar day."""
+
+    def __init__(self, ttl_seconds: float = 0, settled_ttl_seconds: float = 0,
+                 max_days: int = 3660, approved_statuses: Iterable[str] = ("S",),
+                 merge_gap_days: int = 3, pay_period_start_day: int = 1):
+        """
+        Args:
+            ttl_seconds: Lifetime of a cached day; 0 disables the cache
+            settled_ttl_seconds: Lifetime of a settled day (see is_settled_day)
+            max_days: Maximum number of cached days (least recently used are evicted)
+            approved_statuses: Status codes (statusShift/statusTime) that mean the entry is approved
+            merge_gap_days: Missing intervals separated by at most this many cached days are
+                            fetched with one upstream request
+            pay_period_start_day: Day of month pay periods start on (days of closed periods settle)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.settled_ttl_seconds = max(settled_ttl_seconds, ttl_seconds)
+        self.max_days = max_days
+        self.approved_statuses = frozenset(approved_statuses)
+        self.merge_gap_days = merge_gap_days
+        self.pay_period_start_day = pay_period_start_day
+        self._days: "OrderedDict[date, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.days_served = 0
+        self.days_fetched = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_days > 0
+
+    def lookup(self, start: date, end: date) -> Tuple[Dict[date, List[Dict]], List[DateRange]]:
+        """
+        Split a range into cached days and missing intervals.
+
+        Returns:
+            (cached, missing): shifts of every fresh cached day, and the intervals to fetch
+            upstream (already merged per merge_gap_days)
+        """
+        cached: Dict[date, List[Dict]] = {}
+        now = time.monotonic()
+        with self._lock:
+            for day in iter_days(start, end):
+                entry = self._days.get(day)
+                if entry is not None and entry[0] > now:
+                    self._days.move_to_end(day)
+                    cached[day] = entry[1]
+            missing = find_gaps(start, end, cached)
+
+            if not missing:
+                self.hits += 1
+            elif cached:
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+            self.days_served += len(cached)
+        return cached, merge_ranges(missing, self.merge_gap_days)
+
+    def lookup_stale(self, start: date, end: date) -> Dict[date, List[Dict]]:
+        """
+        Return every cached day of start..end, expired or not. Expired days stay cached
+        until evicted so they can be served while the upstream site is unavailable.
+        """
+        with self._lock:
+            return {day: self._days[day][1] for day in iter_days(start, end) if day in self._days}
+
+    def store(self, start: date, end: date, shifts: List[Dict]) -> Dict[date, List[Dict]]:
+        """
+        Index the shifts fetched for start..end per day and cache them.
+
+        Returns:
+            The shifts of every day in the range, keyed by date
+        """
+        days = group_by_day(start, end, shifts)
+        self.store_days(days)
+        with self._lock:
+            self.days_fetched += len(days)
+        return days
+
+    def store_days(self, days: Dict[date, List[Dict]]):
+        """Cache already indexed days (e.g. loaded from the shift archive)."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for day, day_shifts in days.items():
+                settled = is_settled_day(day, day_shifts, self.approved_statuses, self.pay_period_start_day)
+                ttl = self.settled_ttl_seconds if settled else self.ttl_seconds
+                self._days[day] = (now + ttl, day_shifts)
+                self._days.move_to_end(day)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+    def stats(self) -> Dict:
+        """Return counters for /health."""
+        with self._lock:
+            lookups = self.hits + self.partial_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'days': len(self._days),
+                'max_days': self.max_days,
+                'ttl_seconds': self.ttl_seconds,
+                'settled_ttl_seconds': self.settled_ttl_seconds,
+                'merge_gap_days': self.merge_gap_days,
+                'hits': self.hits,
+                'partial_hits': self.partial_hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'days_served': self.days_served,
+                'days_fetched': self.days_fetched,
+                'evictions': self.evictions,
+            }